@@ -1,51 +1,568 @@
 # modules/chroma_client.py
-# Simpler, robuster HTTP-Client für Chroma 0.6.x – ohne Telemetrie & ohne Legacy-Settings.
+# Simpler, robuster Client für Chroma 0.6.x – ohne Telemetrie & ohne Legacy-Settings.
+# - chroma.mode: "http" (HttpClient, eigener Chroma-Container), "persistent" (PersistentClient im Prozess,
+#   Daten unter chroma.path) oder "ephemeral" (EphemeralClient, nur im Speicher – Tests/Benchmarks);
+#   gleiche Wrapper-API in allen Modi
+# - prozessweit ein Client je Server bzw. Pfad (Konstruktion kostet Round Trips: Heartbeat/Tenant/Datenbank)
+# - prozessweiter Cache der Collection-Handles je Server + Name (get_or_create_collection nur beim ersten Zugriff);
+#   invalidate(name) / invalidate() nach Löschen/Neuanlage; veraltete Handles (Collection extern gelöscht)
+#   werden bei der nächsten Operation einmalig neu aufgelöst
+# - upsert() in Batches: Größe aus Konfiguration bzw. client.get_max_batch_size(), zusätzlich begrenzt durch
+#   die geschätzte Request-Größe; optional parallel, Retry mit Backoff je Batch
+# - Index-Profile je Collection (model_config.json "index"): neue Collections mit hnsw:space/M/construction_ef/
+#   search_ef/batch_size/sync_threshold; vorhandene bleiben unverändert (Änderung nur per rebuild_collection)
+# - rebuild_collection: Kopie <name>__rebuild, Original -> <name>__backup, Kopie -> <name>, Backup erst danach
+#   gelöscht; Reste eines abgebrochenen Laufs räumt recover_rebuild auf (beim Client-Start nur Warnung)
+# Konfiguration (app_config.json):
+#   "chroma": {"mode": "http", "server_url": "http://chroma:8000", "path": "data/chroma", "upsert": {"batch_size": 0, "max_request_mb": 16, "concurrency": 2,
+#                              "retries": 2, "backoff_seconds": 0.5}}   batch_size 0 = Server-Maximum
 
-from typing import List, Dict, Any
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatchcase
 from urllib.parse import urlparse
+import json
+import os
+import threading
+import time
 import chromadb
 
+from app.modules.logging_setup import get_logger
+
 try:
     from chromadb import HttpClient as _HttpClient
 except Exception:
     _HttpClient = None
 
+MODES = ("http", "persistent", "ephemeral")
+
+log = get_logger("chroma_client")
+
+# Schlüssel je Client: (mode, Ort) – Ort = "host:port" (http), absoluter Pfad (persistent), "" (ephemeral)
+_CLIENTS: Dict[Tuple[str, str], Any] = {}
+_HANDLES: Dict[Tuple[str, str, str], Any] = {}
+_MAX_BATCH: Dict[Tuple[str, str], int] = {}
+_LOCK = threading.Lock()
+
+_UPSERT_DEFAULTS: Dict[str, Any] = {
+    "batch_size": 0, "max_request_mb": 16, "concurrency": 2, "retries": 2, "backoff_seconds": 0.5,
+}
+# Index-Profil ohne Konfiguration: Kosinus (Embeddings sind normalisiert), sonst Chroma-Defaults
+DEFAULT_INDEX_PROFILE: Dict[str, Any] = {"space": "cosine"}
+SPACES = ("cosine", "ip", "l2")
+_HNSW_KEYS = {
+    "space": "hnsw:space", "M": "hnsw:M", "construction_ef": "hnsw:construction_ef",
+    "search_ef": "hnsw:search_ef", "batch_size": "hnsw:batch_size", "sync_threshold": "hnsw:sync_threshold",
+    "num_threads": "hnsw:num_threads",
+}
+
+_FALLBACK_MAX_BATCH = 5000   # falls der Server get_max_batch_size nicht beantwortet
+_BYTES_PER_FLOAT = 20        # JSON-Darstellung eines float32 im Request (geschätzt)
+
+
+def _client_key(chroma_cfg: Dict[str, Any]) -> Tuple[str, str]:
+    mode = str(chroma_cfg.get("mode") or "http").lower()
+    if mode not in MODES:
+        raise ValueError(f"Unbekannter chroma.mode '{mode}' (erlaubt: {', '.join(MODES)})")
+    if mode == "persistent":
+        return mode, os.path.abspath(chroma_cfg.get("path") or "data/chroma")
+    if mode == "ephemeral":
+        return mode, ""
+    parsed = urlparse(chroma_cfg.get("server_url", "http://chroma:8000"))
+    return mode, f"{parsed.hostname or 'chroma'}:{parsed.port or 8000}"
+
+
+def _make_embedded_client(mode: str, path: str):
+    from chromadb.config import Settings
+    settings = Settings(anonymized_telemetry=False)
+    if mode == "persistent":
+        os.makedirs(path, exist_ok=True)
+        return chromadb.PersistentClient(path=path, settings=settings)
+    return chromadb.EphemeralClient(settings=settings)
+
+
+def _make_client(host: str, port: int):
+    if _HttpClient:
+        # HttpClient nutzt die neuen Defaults; Telemetrie ist serverseitig bereits aus
+        return _HttpClient(host=host, port=port)
+    # Fallback (sollte bei 0.6.x selten nötig sein)
+    from chromadb.config import Settings
+    return chromadb.Client(Settings(
+        chroma_api_impl="rest",
+        chroma_server_host=host,
+        chroma_server_http_port=port,
+        anonymized_telemetry=False,
+    ))
+
+
+def hnsw_metadata(profile: Dict[str, Any]) -> Dict[str, Any]:
+    """Profil {space, M, construction_ef, ...} -> Collection-Metadaten {"hnsw:space": ..., ...}."""
+    out: Dict[str, Any] = {}
+    for k, v in (profile or {}).items():
+        if k in _HNSW_KEYS and v is not None:
+            out[_HNSW_KEYS[k]] = str(v).lower() if k == "space" else int(v)
+    if out.get("hnsw:space", "l2") not in SPACES:
+        raise ValueError(f"Unbekannter Distanzraum '{out['hnsw:space']}' (erlaubt: {', '.join(SPACES)})")
+    return out
+
+
+def profile_of(metadata: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Gespeicherte Collection-Metadaten -> Profil (ohne hnsw:space gilt Chromas Default l2)."""
+    md = metadata or {}
+    out = {k: md[h] for k, h in _HNSW_KEYS.items() if h in md}
+    out.setdefault("space", "l2")
+    return out
+
+
+def resolve_profile(index_cfg: Optional[Dict[str, Any]], collection_name: str) -> Tuple[str, Dict[str, Any]]:
+    """(Profilname, Profil) für eine Collection: erstes passendes Muster aus index.collections
+    (fnmatch, z.B. "*_parents"), sonst DEFAULT_INDEX_PROFILE."""
+    cfg = index_cfg or {}
+    profiles = cfg.get("profiles") or {}
+    for pattern, pname in (cfg.get("collections") or {}).items():
+        if fnmatchcase(collection_name, pattern):
+            if pname not in profiles:
+                raise ValueError(f"Index-Profil '{pname}' (für '{pattern}') nicht in index.profiles definiert")
+            return pname, {**DEFAULT_INDEX_PROFILE, **profiles[pname]}
+    return "default", dict(DEFAULT_INDEX_PROFILE)
+
+
+def _item_bytes(doc: str, md: Dict[str, Any], vec: Optional[List[float]]) -> int:
+    return (len((doc or "").encode("utf-8")) + len(json.dumps(md or {}, ensure_ascii=False, default=str))
+            + len(vec or []) * _BYTES_PER_FLOAT + 64)
+
+
+def _batches(documents: List[str], metadatas: List[Dict[str, Any]], embeddings: Optional[List[List[float]]],
+             max_items: int, max_bytes: int) -> List[Tuple[int, int]]:
+    """[(start, end)]: höchstens max_items Einträge und (ab dem zweiten Eintrag) max_bytes je Batch."""
+    out: List[Tuple[int, int]] = []
+    start, size = 0, 0
+    for n in range(len(documents)):
+        b = _item_bytes(documents[n], metadatas[n], embeddings[n] if embeddings is not None else None)
+        if n > start and (n - start >= max_items or size + b > max_bytes):
+            out.append((start, n))
+            start, size = n, 0
+        size += b
+    if start < len(documents):
+        out.append((start, len(documents)))
+    return out
+
+
+_REBUILD_SUFFIX = "__rebuild"
+_BACKUP_SUFFIX = "__backup"
+
+
+def _rebuild_names(name: str) -> Tuple[str, str]:
+    """(Kopie, Backup) für rebuild_collection; Chroma erlaubt max. 63 Zeichen."""
+    return (f"{name[:63 - len(_REBUILD_SUFFIX)]}{_REBUILD_SUFFIX}",
+            f"{name[:63 - len(_BACKUP_SUFFIX)]}{_BACKUP_SUFFIX}")
+
+
+def _is_stale_handle(e: Exception) -> bool:
+    """Collection wurde seit dem Caching gelöscht/neu angelegt (andere ID)."""
+    msg = str(e).lower()
+    return type(e).__name__ in ("InvalidCollectionException", "NotFoundError") or "does not exist" in msg
+
+
 class ChromaWrapper:
-    def __init__(self, chroma_cfg: Dict[str, Any]):
-        url = chroma_cfg.get("server_url", "http://chroma:8000")
-        parsed = urlparse(url)
-        host = parsed.hostname or "chroma"
-        port = parsed.port or 8000
-
-        if _HttpClient:
-            # HttpClient nutzt die neuen Defaults; Telemetrie ist serverseitig bereits aus
-            self.client = _HttpClient(host=host, port=port)
-        else:
-            # Fallback (sollte bei 0.6.x selten nötig sein)
-            from chromadb.config import Settings
-            self.client = chromadb.Client(Settings(
-                chroma_api_impl="rest",
-                chroma_server_host=host,
-                chroma_server_http_port=port,
-                anonymized_telemetry=False,
-            ))
+    def __init__(self, chroma_cfg: Dict[str, Any], index_cfg: Optional[Dict[str, Any]] = None):
+        """index_cfg: model_config.json "index" (ModelRegistry.index()) – Profile für neu angelegte Collections."""
+        self._key = _client_key(chroma_cfg)
+        self.mode = self._key[0]
+        self.upsert_cfg = {**_UPSERT_DEFAULTS, **(chroma_cfg.get("upsert") or {})}
+        self.index_cfg = index_cfg or {}
+        with _LOCK:
+            client = _CLIENTS.get(self._key)
+            if client is None:
+                if self.mode == "http":
+                    host, port = self._key[1].rsplit(":", 1)
+                    client = _make_client(host, int(port))
+                else:
+                    client = _make_embedded_client(*self._key)
+                _CLIENTS[self._key] = client
+                log.info("chroma_client_init", extra={"extra_fields": {"mode": self.mode, "location": self._key[1]}})
+                fresh = True
+            else:
+                fresh = False
+        self.client = client
+        if fresh:
+            self._warn_rebuild_leftovers()
+
+    def _warn_rebuild_leftovers(self) -> None:
+        """Einmal je Client: Reste abgebrochener Rebuilds melden (Aufräumen nur per recover_rebuild/index_admin,
+        ein laufender Rebuild in einem anderen Prozess darf nicht gestört werden)."""
+        try:
+            leftovers = self.rebuild_leftovers()
+        except Exception as e:
+            log.warning("chroma_rebuild_check_failed", extra={"extra_fields": {"err": str(e)[:200]}})
+            return
+        if leftovers:
+            log.warning("chroma_rebuild_leftover", extra={"extra_fields": {
+                "collections": leftovers, "hint": "app.tools.index_admin recover"
+            }})
+
+    def profile_for(self, name: str) -> Tuple[str, Dict[str, Any]]:
+        return resolve_profile(self.index_cfg, name)
+
+    def _open_or_create(self, name: str):
+        """Vorhandene Collection unverändert öffnen; fehlende mit dem Index-Profil anlegen."""
+        try:
+            col = self.client.get_collection(name=name)
+        except Exception:
+            pname, profile = self.profile_for(name)
+            try:
+                col = self.client.create_collection(name=name, metadata=hnsw_metadata(profile))
+                log.info("chroma_collection_created", extra={"extra_fields": {"collection": name, "profile": pname, **profile}})
+                return col
+            except Exception:
+                return self.client.get_collection(name=name)  # parallel angelegt
+        pname, profile = self.profile_for(name)
+        stored = profile_of(getattr(col, "metadata", None))
+        diff = {k: (stored.get(k), v) for k, v in profile.items() if k in _HNSW_KEYS and stored.get(k) != v}
+        if diff:
+            log.warning("chroma_profile_mismatch", extra={"extra_fields": {
+                "collection": name, "profile": pname, "diff": diff, "hint": "app.tools.index_admin migrate"
+            }})
+        return col
 
     def get_or_create_collection(self, name: str):
-        return self.client.get_or_create_collection(name=name)
+        key = (*self._key, name)
+        col = _HANDLES.get(key)
+        if col is None:
+            col = self._open_or_create(name)
+            with _LOCK:
+                col = _HANDLES.setdefault(key, col)
+        return col
+
+    def create_collection(self, name: str, profile: Dict[str, Any]):
+        """Neue Collection mit explizitem Profil (Migration/Benchmark); Handle landet im Cache."""
+        col = self.client.create_collection(name=name, metadata=hnsw_metadata(profile))
+        with _LOCK:
+            _HANDLES[(*self._key, name)] = col
+        return col
+
+    def space(self, name: str) -> str:
+        """Distanzraum der Collection (cosine | ip | l2)."""
+        return str(profile_of(getattr(self.get_or_create_collection(name), "metadata", None))["space"])
+
+    def list_collections(self) -> List[str]:
+        return [c if isinstance(c, str) else getattr(c, "name", str(c)) for c in self.client.list_collections()]
+
+    def delete_collection(self, name: str) -> None:
+        self.client.delete_collection(name=name)
+        self.invalidate(name)
+
+    def dump(self, name: str, page_size: int = 1000):
+        """Alle Einträge seitenweise: Generator über {ids, documents, metadatas, embeddings}."""
+        col = self.client.get_collection(name=name)
+        total = col.count()
+        for off in range(0, total, page_size):
+            res = col.get(limit=page_size, offset=off, include=["documents", "metadatas", "embeddings"])
+            embs = res.get("embeddings")
+            yield {
+                "ids": list(res.get("ids") or []),
+                "documents": list(res.get("documents") or []),
+                "metadatas": list(res.get("metadatas") or []),
+                "embeddings": [[float(x) for x in v] for v in (embs if embs is not None else [])],
+            }
+
+    def _rename(self, old: str, new: str) -> None:
+        self.client.get_collection(name=old).modify(name=new)
+        self.invalidate(old)
+        self.invalidate(new)
+
+    def rebuild_leftovers(self) -> List[str]:
+        """Kopien/Backups abgebrochener Rebuilds (<name>__rebuild, <name>__backup)."""
+        return sorted(n for n in self.list_collections() if n.endswith((_REBUILD_SUFFIX, _BACKUP_SUFFIX)))
+
+    def recover_rebuild(self, name: str) -> Optional[str]:
+        """Reste eines abgebrochenen rebuild_collection(name) auflösen, ohne Daten zu verlieren.
+        Rückgabe: ausgeführte Aktion oder None (nichts zu tun)."""
+        tmp_name, bak_name = _rebuild_names(name)
+        names = set(self.list_collections())
+        has_name, has_tmp, has_bak = name in names, tmp_name in names, bak_name in names
+        if not (has_tmp or has_bak):
+            return None
+        count = lambda n: self.client.get_collection(name=n).count()
+        if has_bak and has_name and has_tmp:
+            # Original bereits im Backup, Kopie noch nicht umbenannt: <name> kann nur leer neu angelegt sein
+            if count(name):
+                raise RuntimeError(f"'{name}', '{tmp_name}' und '{bak_name}' enthalten Daten – bitte manuell prüfen")
+            self.delete_collection(name)
+            has_name = False
+        if has_bak and has_name:  # Tausch abgeschlossen, nur das Backup blieb übrig
+            self.delete_collection(bak_name)
+            action = "backup_deleted"
+        elif has_bak:
+            if has_tmp and count(tmp_name) == count(bak_name):
+                self._rename(tmp_name, name)
+                self.delete_collection(bak_name)
+                action = "rebuild_completed"
+            else:
+                self._rename(bak_name, name)
+                action = "backup_restored"
+        elif not has_name:  # Daten nur noch in der Kopie (Abbruch nach dem Löschen des Originals)
+            self._rename(tmp_name, name)
+            action = "rebuild_completed"
+        else:
+            action = "copy_discarded"
+        if tmp_name in self.list_collections():  # unvollständige Kopie, Original/Backup ist maßgeblich
+            self.delete_collection(tmp_name)
+        log.warning("chroma_rebuild_recovered", extra={"extra_fields": {"collection": name, "action": action}})
+        return action
+
+    def rebuild_collection(self, name: str, profile: Optional[Dict[str, Any]] = None,
+                           page_size: int = 1000) -> Dict[str, Any]:
+        """Collection mit (neuem) Index-Profil neu aufbauen: Kopie in <name>__rebuild, Abgleich der Anzahl,
+        Original -> <name>__backup, Kopie -> <name>, Backup löschen. Zu keinem Zeitpunkt liegen die Daten
+        nur in einer gelöschten Collection; Reste eines früheren Abbruchs zuerst per recover_rebuild.
+        Kurz ohne Collection -> nicht während Ingest/Suche ausführen."""
+        t0 = time.monotonic()
+        pname, target = ("explicit", profile) if profile else self.profile_for(name)
+        self.recover_rebuild(name)
+        tmp_name, bak_name = _rebuild_names(name)
+        total = self.client.get_collection(name=name).count()
+        self.create_collection(tmp_name, target)
+        copied = 0
+        try:
+            for page in self.dump(name, page_size):
+                if page["ids"]:
+                    copied += self.upsert(tmp_name, page["documents"], page["metadatas"], page["ids"],
+                                          page["embeddings"] or None)["count"]
+            if self.count(tmp_name) != total:
+                raise RuntimeError(f"Kopie unvollständig: {self.count(tmp_name)} von {total} Einträgen")
+        except Exception:
+            self.delete_collection(tmp_name)
+            raise
+        self._rename(name, bak_name)
+        try:
+            self._rename(tmp_name, name)
+        except Exception:
+            self._rename(bak_name, name)  # Original zurück, Kopie bleibt für recover_rebuild
+            raise
+        try:
+            self.delete_collection(bak_name)
+        except Exception as e:  # Daten vollständig unter <name>; Backup räumt recover_rebuild auf
+            log.warning("chroma_rebuild_backup_left", extra={"extra_fields": {"collection": bak_name, "err": str(e)[:200]}})
+        out = {"collection": name, "profile": pname, **target, "count": copied,
+               "seconds": round(time.monotonic() - t0, 2)}
+        log.info("chroma_collection_rebuilt", extra={"extra_fields": out})
+        return out
+
+    def max_batch_size(self) -> int:
+        """Server-Limit je Request (einmal je Server abgefragt)."""
+        n = _MAX_BATCH.get(self._key)
+        if n is None:
+            try:
+                n = int(self.client.get_max_batch_size())
+            except Exception as e:
+                log.warning("chroma_max_batch_size_unknown", extra={"extra_fields": {"err": str(e)[:200]}})
+                n = _FALLBACK_MAX_BATCH
+            _MAX_BATCH[self._key] = n
+        return n
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """Gecachte Handles verwerfen (eine Collection oder alle dieses Servers)."""
+        with _LOCK:
+            for key in [k for k in _HANDLES if k[:2] == self._key and (name is None or k[2] == name)]:
+                del _HANDLES[key]
+
+    def _with_collection(self, name: str, op: Callable[[Any], Any]) -> Any:
+        """op(collection) mit gecachtem Handle; bei veraltetem Handle einmal neu auflösen."""
+        try:
+            return op(self.get_or_create_collection(name))
+        except Exception as e:
+            if not _is_stale_handle(e):
+                raise
+            log.warning("chroma_handle_stale", extra={"extra_fields": {"collection": name, "err": str(e)[:200]}})
+            self.invalidate(name)
+            return op(self.get_or_create_collection(name))
+
+    def query(self, collection_name: str, **kwargs) -> Dict[str, Any]:
+        """col.query(**kwargs) über den Handle-Cache."""
+        return self._with_collection(collection_name, lambda col: col.query(**kwargs))
+
+    def count(self, collection_name: str) -> int:
+        return int(self._with_collection(collection_name, lambda col: col.count()))
+
+    def collection_exists(self, collection_name: str) -> bool:
+        """Ohne Anlegen: gecachter Handle oder client.get_collection."""
+        if (*self._key, collection_name) in _HANDLES:
+            return True
+        try:
+            col = self.client.get_collection(name=collection_name)
+        except Exception:
+            return False
+        with _LOCK:
+            _HANDLES.setdefault((*self._key, collection_name), col)
+        return True
+
+    def _upsert_batch(self, collection_name: str, documents, metadatas, ids, embeddings) -> int:
+        """Ein Batch mit Retry + exponentiellem Backoff; Rückgabe: Anzahl Wiederholungen."""
+        retries = max(0, int(self.upsert_cfg["retries"]))
+        backoff = float(self.upsert_cfg["backoff_seconds"])
+
+        def _op(col):
+            if embeddings is not None:
+                col.upsert(documents=documents, metadatas=metadatas, ids=ids, embeddings=embeddings)
+            else:
+                col.upsert(documents=documents, metadatas=metadatas, ids=ids)
+
+        for attempt in range(retries + 1):
+            try:
+                self._with_collection(collection_name, _op)
+                return attempt
+            except (ValueError, TypeError):
+                raise  # Validierungsfehler (z.B. Dimension) – Wiederholen hilft nicht
+            except Exception as e:
+                if attempt >= retries:
+                    raise
+                log.warning("chroma_upsert_retry", extra={"extra_fields": {
+                    "collection": collection_name, "batch": len(ids), "attempt": attempt + 1, "err": str(e)[:200]
+                }})
+                time.sleep(backoff * (2 ** attempt))
+        return retries
 
     def upsert(self, collection_name: str,
                documents: List[str],
                metadatas: List[Dict[str, Any]],
                ids: List[str],
                embeddings: List[List[float]] = None):
+        """Upsert in Batches (siehe Kopfkommentar); Rückgabe {ok, count, batches, retries, seconds}."""
         n = len(ids)
         if not (len(documents) == len(metadatas) == n and (embeddings is None or len(embeddings) == n)):
             raise ValueError(f"Upsert-Arrays müssen gleiche Länge haben: ids={len(ids)}, docs={len(documents)}, metas={len(metadatas)}, embeds={0 if embeddings is None else len(embeddings)}")
         if embeddings is not None and any((not v or len(v) == 0) for v in embeddings):
             raise ValueError("Mindestens ein Embedding-Vektor ist leer.")
-        col = self.get_or_create_collection(collection_name)
-        if embeddings is not None:
-            col.upsert(documents=documents, metadatas=metadatas, ids=ids, embeddings=embeddings)
+        t0 = time.monotonic()
+        if n == 0:
+            return {"ok": True, "count": 0, "batches": 0, "retries": 0, "seconds": 0.0}
+
+        limit = self.max_batch_size()
+        if int(self.upsert_cfg["batch_size"]) > 0:
+            limit = min(limit, int(self.upsert_cfg["batch_size"]))
+        max_bytes = int(float(self.upsert_cfg["max_request_mb"]) * 1024 * 1024)
+        spans = _batches(documents, metadatas, embeddings, max(1, limit), max_bytes)
+
+        def _run(span: Tuple[int, int]) -> int:
+            a, b = span
+            return self._upsert_batch(collection_name, documents[a:b], metadatas[a:b], ids[a:b],
+                                      embeddings[a:b] if embeddings is not None else None)
+
+        workers = min(len(spans), max(1, int(self.upsert_cfg["concurrency"])))
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chroma-upsert") as ex:
+                retried = sum(ex.map(_run, spans))
         else:
-            col.upsert(documents=documents, metadatas=metadatas, ids=ids)
-        return {"ok": True, "count": n}
+            retried = sum(_run(sp) for sp in spans)
+        res = {"ok": True, "count": n, "batches": len(spans), "retries": retried,
+               "seconds": round(time.monotonic() - t0, 3)}
+        if len(spans) > 1 or retried:
+            log.info("chroma_upsert_batched", extra={"extra_fields": {
+                "collection": collection_name, **res, "batch_limit": limit, "concurrency": workers
+            }})
+        return res
+
+    def update_metadata(self, collection_name: str, ids: List[str], metadatas: List[Dict[str, Any]]) -> int:
+        """Nur Metadaten ändern (Dokument und Vektor bleiben) – z.B. korrigierte Stammdaten."""
+        if len(ids) != len(metadatas):
+            raise ValueError(f"Update-Arrays müssen gleiche Länge haben: ids={len(ids)}, metas={len(metadatas)}")
+        if not ids:
+            return 0
+
+        def _op(col):
+            for s in range(0, len(ids), 500):
+                col.update(ids=ids[s:s + 500], metadatas=metadatas[s:s + 500])
+
+        self._with_collection(collection_name, _op)
+        return len(ids)
+
+    def get_embeddings(self, collection_name: str, ids: List[str]) -> Dict[str, List[float]]:
+        """Gespeicherte Vektoren je ID (fehlende IDs fehlen im Ergebnis)."""
+        if not ids:
+            return {}
+
+        def _op(col):
+            out: Dict[str, List[float]] = {}
+            for s in range(0, len(ids), 500):
+                res = col.get(ids=list(ids[s:s + 500]), include=["embeddings"])
+                embs = res.get("embeddings")
+                for i, v in zip(res.get("ids") or [], embs if embs is not None else []):
+                    if v is not None and len(v) > 0:
+                        out[i] = [float(x) for x in v]
+            return out
+
+        return self._with_collection(collection_name, _op)
+
+    def get_docid(self, collection_name: str, docid: str, page_size: int = 1000) -> Dict[str, List[Any]]:
+        """Alle Einträge einer docid (seitenweise gelesen): {ids, documents, metadatas, embeddings}."""
+        def _op(col):
+            out: Dict[str, List[Any]] = {"ids": [], "documents": [], "metadatas": [], "embeddings": []}
+            offset = 0
+            while True:
+                res = col.get(where={"docid": docid}, limit=page_size, offset=offset,
+                              include=["documents", "metadatas", "embeddings"])
+                ids = list(res.get("ids") or [])
+                embs = res.get("embeddings")
+                out["ids"].extend(ids)
+                out["documents"].extend(res.get("documents") or [None] * len(ids))
+                out["metadatas"].extend(res.get("metadatas") or [None] * len(ids))
+                out["embeddings"].extend(embs if embs is not None else [None] * len(ids))
+                if len(ids) < page_size:
+                    return out
+                offset += page_size
+
+        return self._with_collection(collection_name, _op)
+
+    def get_metadatas(self, collection_name: str, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Gespeicherte Metadaten je ID (fehlende IDs fehlen im Ergebnis)."""
+        if not ids:
+            return {}
+
+        def _op(col):
+            out: Dict[str, Dict[str, Any]] = {}
+            for s in range(0, len(ids), 500):
+                res = col.get(ids=list(ids[s:s + 500]), include=["metadatas"])
+                for i, m in zip(res.get("ids") or [], res.get("metadatas") or []):
+                    out[i] = dict(m or {})
+            return out
+
+        return self._with_collection(collection_name, _op)
+
+    def existing_ids(self, collection_name: str, ids: List[str]) -> set:
+        """Teilmenge von ids, die in der Collection vorhanden ist."""
+        if not ids:
+            return set()
+
+        def _op(col):
+            found: set = set()
+            for s in range(0, len(ids), 500):
+                found.update(col.get(ids=list(ids[s:s + 500]), include=[]).get("ids") or [])
+            return found
+
+        return self._with_collection(collection_name, _op)
+
+    def delete_ids(self, collection_name: str, ids: List[str]) -> int:
+        if not ids:
+            return 0
+
+        def _op(col):
+            for s in range(0, len(ids), 500):
+                col.delete(ids=list(ids[s:s + 500]))
+
+        self._with_collection(collection_name, _op)
+        return len(ids)
+
+    def delete_stale(self, collection_name: str, docid: str, keep_ids) -> int:
+        """Löscht Einträge von docid, deren ID nicht in keep_ids liegt (z.B. nach Re-Ingest mit
+        weniger Chunks). Liefert die Anzahl gelöschter Einträge."""
+        keep = set(keep_ids or [])
+
+        def _op(col):
+            res = col.get(where={"docid": docid}, include=[])
+            stale = [i for i in (res.get("ids") or []) if i not in keep]
+            for s in range(0, len(stale), 500):
+                col.delete(ids=stale[s:s + 500])
+            return len(stale)
+
+        return self._with_collection(collection_name, _op)
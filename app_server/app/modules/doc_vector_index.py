@@ -0,0 +1,217 @@
+# app/modules/doc_vector_index.py
+# In-Process-Vektorindex je Arbeit (docid): exakte Top-k-Suche per Matrix-Vektor-Produkt über die
+# Parent- (und Child-)Vektoren der Arbeit statt HNSW-Query mit where={"docid": ...}.
+# - Laden: einmal je docid aus Chroma (Quelle der Wahrheit bleibt Chroma), Collections laut Receipt;
+#   vorab im Hintergrund bei StateFacade.set_current(docid, app_cfg)
+# - gültig bis zur nächsten Änderung der Receipt-Datei (mtime_ns; Ingest/Re-Ingest/Re-Chunking)
+# - Distanzen wie in Chroma je Distanzraum der Collection (cosine | ip | l2), Ergebnis im Format von
+#   collection.query(...) -> Aufrufer behandeln beide Wege gleich
+# - prozessweit (Streamlit-Reruns/Seiten teilen die Instanzen), LRU über max_docs
+# - fehlgeschlagene Ladeversuche (Chroma nicht erreichbar, Receipt unlesbar) je (docid, Receipt-Token)
+#   für _FAILED_RETRY_S gemerkt -> Suchen gehen so lange direkt an Chroma statt jedes Mal neu zu laden
+# Konfiguration (app_config.json): "doc_index": {"enabled": true, "max_docs": 8, "children": true}
+
+from typing import Any, Dict, List, Optional, Tuple
+from collections import OrderedDict
+import os
+import threading
+import time
+
+import numpy as np
+
+from app.modules.logging_setup import get_logger
+from app.modules.chroma_client import ChromaWrapper
+from app.modules.model_registry import ModelRegistry
+from app.modules.state_repo import StateRepo
+from app.modules import vector_ops
+
+log = get_logger("doc_vector_index")
+
+_DEFAULTS: Dict[str, Any] = {"enabled": True, "max_docs": 8, "children": True}
+
+
+def settings(app_cfg: Dict[str, Any]) -> Dict[str, Any]:
+    return {**_DEFAULTS, **((app_cfg or {}).get("doc_index") or {})}
+
+
+def receipt_token(state_dir: str, docid: str) -> Optional[int]:
+    """Änderungszeit der Receipt-Datei (None = keine Receipt)."""
+    try:
+        return os.stat(os.path.join(state_dir, f"ingest_doc_{docid}.json")).st_mtime_ns
+    except OSError:
+        return None
+
+
+class _Level:
+    """Vektoren einer Collection (parents oder children) einer docid."""
+
+    def __init__(self, collection: str, space: str, data: Dict[str, List[Any]]):
+        keep = [i for i, v in enumerate(data["embeddings"]) if v is not None and len(v) > 0]
+        self.collection = collection
+        self.space = space
+        self.ids: List[str] = [data["ids"][i] for i in keep]
+        self.documents: List[str] = [data["documents"][i] or "" for i in keep]
+        self.metadatas: List[Dict[str, Any]] = [dict(data["metadatas"][i] or {}) for i in keep]
+        if keep:
+            mat = np.asarray([data["embeddings"][i] for i in keep], dtype=np.float32).reshape(len(keep), -1)
+        else:  # Arbeit ohne (gültige) Vektoren in dieser Collection
+            mat = np.zeros((0, 0), dtype=np.float32)
+        # cosine: Zeilen vorab normieren -> Suche = ein Matrix-Vektor-Produkt
+        self.mat = vector_ops.l2_normalize_rows(mat) if space == "cosine" and len(keep) else mat
+        self.sq_norms = (self.mat * self.mat).sum(axis=1) if space == "l2" else None
+
+    def distances(self, vec: np.ndarray) -> np.ndarray:
+        if self.space == "cosine":
+            n = float(np.linalg.norm(vec))
+            return 1.0 - self.mat @ (vec / n if n else vec)
+        if self.space == "ip":
+            return 1.0 - self.mat @ vec
+        return np.maximum(self.sq_norms - 2.0 * (self.mat @ vec) + float(vec @ vec), 0.0)
+
+    def query(self, vec: List[float], k: int) -> Dict[str, List[List[Any]]]:
+        if not self.ids:
+            return {"ids": [[]], "documents": [[]], "metadatas": [[]], "distances": [[]]}
+        d = self.distances(np.asarray(vec, dtype=np.float32))
+        k = min(int(k), len(self.ids))
+        top = np.argpartition(d, k - 1)[:k] if k < len(self.ids) else np.arange(len(self.ids))
+        top = top[np.argsort(d[top], kind="stable")]
+        return {
+            "ids": [[self.ids[i] for i in top]],
+            "documents": [[self.documents[i] for i in top]],
+            "metadatas": [[self.metadatas[i] for i in top]],
+            "distances": [[float(d[i]) for i in top]],
+        }
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.mat.nbytes)
+
+
+class DocVectorIndex:
+    def __init__(self, docid: str, token: Any, levels: Dict[str, _Level], load_seconds: float):
+        self.docid = docid
+        self.token = token
+        self.levels = levels
+        self.load_seconds = load_seconds
+
+    @classmethod
+    def load(cls, chroma: ChromaWrapper, receipt: Dict[str, Any], token: Any,
+             children: bool = True) -> "DocVectorIndex":
+        t0 = time.monotonic()
+        docid = receipt["docid"]
+        cols = receipt.get("collections") or {}
+        levels: Dict[str, _Level] = {}
+        for kind in ("parents", "children") if children else ("parents",):
+            name = cols.get(kind)
+            if name and chroma.collection_exists(name):
+                levels[kind] = _Level(name, chroma.space(name), chroma.get_docid(name, docid))
+        idx = cls(docid, token, levels, round(time.monotonic() - t0, 3))
+        log.info("doc_index_loaded", extra={"extra_fields": idx.stats()})
+        return idx
+
+    def level(self, collection: str) -> Optional[_Level]:
+        """Ebene für eine Collection (None, wenn die Arbeit dort nicht geladen ist)."""
+        for lv in self.levels.values():
+            if lv.collection == collection:
+                return lv
+        return None
+
+    def query(self, vec: List[float], k: int, kind: str = "parents") -> Dict[str, List[List[Any]]]:
+        return self.levels[kind].query(vec, k)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "docid": self.docid, "load_seconds": self.load_seconds,
+            **{kind: len(lv.ids) for kind, lv in self.levels.items()},
+            "bytes": sum(lv.nbytes for lv in self.levels.values()),
+        }
+
+
+# Prozessweit: (app_state_dir, docid) -> DocVectorIndex
+_INDEXES: "OrderedDict[Tuple[str, str], DocVectorIndex]" = OrderedDict()
+_KEY_LOCKS: Dict[Tuple[str, str], threading.Lock] = {}
+# (app_state_dir, docid) -> (Receipt-Token, monotonic bis) des letzten fehlgeschlagenen Ladeversuchs
+_FAILED: Dict[Tuple[str, str], Tuple[Any, float]] = {}
+_FAILED_RETRY_S = 30.0
+_LOCK = threading.Lock()
+
+
+def _failed_recently(key: Tuple[str, str], token: Any) -> bool:
+    hit = _FAILED.get(key)
+    return hit is not None and hit[0] == token and time.monotonic() < hit[1]
+
+
+def _mark_failed(key: Tuple[str, str], token: Any) -> None:
+    with _LOCK:
+        _FAILED[key] = (token, time.monotonic() + _FAILED_RETRY_S)
+
+
+def get_doc_index(app_cfg: Dict[str, Any], docid: Optional[str], chroma: Optional[ChromaWrapper] = None,
+                  load: bool = True) -> Optional[DocVectorIndex]:
+    """Aktueller Index der docid (bei geänderter Receipt neu geladen); None, wenn deaktiviert,
+    ohne Receipt, load=False und nicht geladen oder Laden kürzlich fehlgeschlagen."""
+    s = settings(app_cfg)
+    state_dir = ((app_cfg or {}).get("paths") or {}).get("app_state_dir")
+    if not (s["enabled"] and docid and state_dir):
+        return None
+    token = receipt_token(state_dir, docid)
+    if token is None:
+        return None
+    key = (os.path.abspath(state_dir), docid)
+    with _LOCK:
+        idx = _INDEXES.get(key)
+        if idx is not None and idx.token == token:
+            _INDEXES.move_to_end(key)
+            return idx
+        if not load or _failed_recently(key, token):
+            return None
+        key_lock = _KEY_LOCKS.setdefault(key, threading.Lock())
+    with key_lock:  # paralleles Laden derselben docid (Vorab-Laden + erste Frage) nur einmal
+        idx = _INDEXES.get(key)
+        if idx is not None and idx.token == token:
+            return idx
+        if _failed_recently(key, token):  # parallel wartender Aufrufer nach Fehlschlag
+            return None
+        receipt = StateRepo(state_dir).read_receipt(docid)
+        if not receipt:
+            _mark_failed(key, token)
+            return None
+        try:
+            if chroma is None:  # Vorab-Laden: eigener Wrapper mit den Index-Profilen aus model_config.json
+                chroma = ChromaWrapper(app_cfg.get("chroma") or {},
+                                       ModelRegistry(app_cfg["paths"]["config_dir"]).index())
+            idx = DocVectorIndex.load(chroma, receipt, token, children=bool(s["children"]))
+        except Exception:
+            _mark_failed(key, token)
+            raise
+        with _LOCK:
+            _FAILED.pop(key, None)
+            _INDEXES[key] = idx
+            _INDEXES.move_to_end(key)
+            while len(_INDEXES) > max(1, int(s["max_docs"])):
+                _INDEXES.popitem(last=False)
+        return idx
+
+
+def preload(app_cfg: Dict[str, Any], docid: str) -> Optional[threading.Thread]:
+    """Index der docid im Hintergrund laden (Auswahl einer Arbeit); Fehler nur geloggt."""
+    if not settings(app_cfg)["enabled"]:
+        return None
+
+    def _run() -> None:
+        try:
+            get_doc_index(app_cfg, docid)
+        except Exception as e:
+            log.warning("doc_index_preload_failed", extra={"extra_fields": {"docid": docid, "err": str(e)}})
+
+    t = threading.Thread(target=_run, name=f"doc-index-{docid}", daemon=True)
+    t.start()
+    return t
+
+
+def invalidate(docid: Optional[str] = None) -> None:
+    with _LOCK:
+        for key in [k for k in _INDEXES if docid is None or k[1] == docid]:
+            _INDEXES.pop(key, None)
+        for key in [k for k in _FAILED if docid is None or k[1] == docid]:
+            _FAILED.pop(key, None)
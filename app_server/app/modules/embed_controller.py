@@ -0,0 +1,205 @@
+# app/modules/embed_controller.py
+# Adaptiver Durchsatz-Regler für Ollama-Requests (prozessweit je base_url, d.h. je Ollama-Host).
+# - Misst Latenz (EWMA je Eingabe) und Fehler
+# - AIMD: Batchgröße/Parallelität additiv erhöhen, solange Latenz < Ziel; bei Fehlern/Timeouts halbieren
+# - Wiederholungen mit exponentiellem Backoff + Full Jitter
+# - Circuit Breaker: nach N Fehlern in Folge "open" -> CircuitOpenError (Fail-Fast statt Hängen);
+#   nach Cooldown genau ein Probe-Request ("half_open")
+# - Adaptiver Timeout: Faktor × erwartete Latenz, begrenzt durch timeouts.embeddings_seconds;
+#   nach idle_reset_seconds ohne Request (Ollama keep_alive abgelaufen -> Modell wird neu geladen)
+#   gilt wieder der volle timeouts.embeddings_seconds, bis ein Request abgeschlossen ist
+# Konfiguration (app_config.json):
+#   "embedding_controller": {"enabled": true, "min_batch_size": 1, "max_batch_size": 64,
+#     "min_in_flight": 1, "max_in_flight": 8, "target_latency_seconds": 10,
+#     "min_timeout_seconds": 10, "timeout_factor": 4, "idle_reset_seconds": 240, "retries": 3,
+#     "backoff_base_seconds": 0.5, "backoff_cap_seconds": 10,
+#     "breaker_failures": 5, "breaker_cooldown_seconds": 30}
+# LLM-Aufrufe (generate/chat) haben einen eigenen Regler/Breaker je Host (get_llm_controller), damit ein
+# langsames Chat-Modell den Embedding-Breaker nicht öffnet:
+#   "llm_controller": {"enabled": true, "retries": 1, "breaker_failures": 3, "breaker_cooldown_seconds": 30}
+
+from typing import Any, Dict, Optional, Tuple
+import random
+import threading
+import time
+
+from app.modules.logging_setup import get_logger
+
+log = get_logger("embed_controller")
+
+_DEFAULTS: Dict[str, Any] = {
+    "enabled": True,
+    "min_batch_size": 1,
+    "max_batch_size": 64,
+    "min_in_flight": 1,
+    "max_in_flight": 8,
+    "target_latency_seconds": 10.0,   # Ziel je Request; darüber kein Hochregeln
+    "increase_after": 4,              # erfolgreiche Requests je additivem Schritt
+    "min_timeout_seconds": 10.0,
+    "timeout_factor": 4.0,
+    "idle_reset_seconds": 240.0,      # < Ollama keep_alive (Default 5 min): danach Kaltstart möglich
+    "retries": 3,
+    "backoff_base_seconds": 0.5,
+    "backoff_cap_seconds": 10.0,
+    "breaker_failures": 5,
+    "breaker_cooldown_seconds": 30.0,
+}
+
+_EWMA_ALPHA = 0.2
+
+
+class CircuitOpenError(RuntimeError):
+    """Ollama-Host gilt als gestört; Requests werden bis zum Cooldown sofort abgelehnt."""
+    pass
+
+
+class AdaptiveController:
+    def __init__(self, base_url: str, settings: Optional[Dict[str, Any]] = None):
+        s = {**_DEFAULTS, **(settings or {})}
+        self.base_url = base_url
+        self.enabled = bool(s["enabled"])
+        self.min_bs, self.max_bs = max(1, int(s["min_batch_size"])), max(1, int(s["max_batch_size"]))
+        self.min_if, self.max_if = max(1, int(s["min_in_flight"])), max(1, int(s["max_in_flight"]))
+        self.target_latency = float(s["target_latency_seconds"])
+        self.increase_after = max(1, int(s["increase_after"]))
+        self.min_timeout = float(s["min_timeout_seconds"])
+        self.timeout_factor = float(s["timeout_factor"])
+        self.idle_reset = float(s["idle_reset_seconds"])
+        self.retries = max(0, int(s["retries"]))
+        self.backoff_base = float(s["backoff_base_seconds"])
+        self.backoff_cap = float(s["backoff_cap_seconds"])
+        self.breaker_failures = max(1, int(s["breaker_failures"]))
+        self.breaker_cooldown = float(s["breaker_cooldown_seconds"])
+
+        self._lock = threading.Lock()
+        self.batch_size = self.max_bs
+        self.in_flight = self.max_if
+        self.latency_per_item: Optional[float] = None   # EWMA Sekunden je Eingabe
+        self._last_done: Optional[float] = None         # monotonic: letzter abgeschlossener Request
+        self._ok_streak = 0
+        self._fail_streak = 0
+        self.state = "closed"
+        self._opened_at = 0.0
+        self._probe_running = False
+        self.requests = 0
+        self.failures = 0
+
+    # --------- Abfragen ---------
+    def effective(self, batch_size: int, max_in_flight: int) -> Dict[str, int]:
+        """Aktuelle Batchgröße/Parallelität, nach oben durch die Aufrufer-Konfiguration begrenzt."""
+        if not self.enabled:
+            return {"batch_size": max(1, int(batch_size)), "max_in_flight": max(1, int(max_in_flight))}
+        with self._lock:
+            return {"batch_size": max(1, min(int(batch_size), self.batch_size)),
+                    "max_in_flight": max(1, min(int(max_in_flight), self.in_flight))}
+
+    def timeout_for(self, items: int, max_timeout: float) -> float:
+        """Faktor × erwartete Dauer (EWMA), mindestens min_timeout, höchstens max_timeout.
+        Erster Request nach Leerlauf (Modell evtl. entladen, Kaltstart): max_timeout."""
+        if not self.enabled:
+            return float(max_timeout)
+        with self._lock:
+            per_item = self.latency_per_item
+            idle = self._last_done is None or time.monotonic() - self._last_done >= self.idle_reset
+        if per_item is None or idle:
+            return float(max_timeout)
+        return float(min(max_timeout, max(self.min_timeout, self.timeout_factor * per_item * max(1, items))))
+
+    def backoff(self, attempt: int) -> float:
+        """Full Jitter: zufällig in [0, min(cap, base·2^attempt)]."""
+        return random.uniform(0.0, min(self.backoff_cap, self.backoff_base * (2 ** max(0, attempt))))
+
+    # --------- Circuit Breaker ---------
+    def before_request(self) -> None:
+        """Wirft CircuitOpenError, solange der Breaker offen ist; lässt nach Cooldown einen Probe durch."""
+        if not self.enabled:
+            return
+        with self._lock:
+            if self.state == "closed":
+                return
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.breaker_cooldown:
+                self.state = "half_open"
+                self._probe_running = False
+            if self.state == "half_open" and not self._probe_running:
+                self._probe_running = True
+                return
+            raise CircuitOpenError(f"Ollama circuit open for {self.base_url} "
+                                   f"({self._fail_streak} consecutive failures)")
+
+    # --------- Messwerte ---------
+    def record(self, ok: bool, latency_s: float, items: int = 1, tune: bool = True) -> None:
+        """Ergebnis eines Requests; tune=False (z.B. Chat) zählt nur für den Breaker."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.requests += 1
+            self._probe_running = False
+            self._last_done = time.monotonic()
+            if ok:
+                self._fail_streak = 0
+                if self.state != "closed":
+                    log.info("embed_circuit_closed", extra={"extra_fields": {"base_url": self.base_url}})
+                self.state = "closed"
+                if not tune or items <= 0:
+                    return
+                per_item = float(latency_s) / items
+                self.latency_per_item = per_item if self.latency_per_item is None else (
+                    _EWMA_ALPHA * per_item + (1 - _EWMA_ALPHA) * self.latency_per_item)
+                self._ok_streak += 1
+                if self._ok_streak >= self.increase_after and latency_s < self.target_latency:
+                    self._ok_streak = 0
+                    self.batch_size = min(self.max_bs, self.batch_size + max(1, self.batch_size // 4))
+                    self.in_flight = min(self.max_if, self.in_flight + 1)
+                elif latency_s >= self.target_latency:
+                    self._ok_streak = 0
+                    self.batch_size = max(self.min_bs, self.batch_size // 2)
+                return
+            self.failures += 1
+            self._ok_streak = 0
+            self._fail_streak += 1
+            if tune:
+                self.batch_size = max(self.min_bs, self.batch_size // 2)
+                self.in_flight = max(self.min_if, self.in_flight // 2)
+            if self.state == "half_open" or self._fail_streak >= self.breaker_failures:
+                if self.state != "open":
+                    log.error("embed_circuit_open", extra={"extra_fields": {
+                        "base_url": self.base_url, "fail_streak": self._fail_streak,
+                        "cooldown_s": self.breaker_cooldown,
+                    }})
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self.state, "batch_size": self.batch_size, "in_flight": self.in_flight,
+                "latency_per_item_s": self.latency_per_item, "requests": self.requests,
+                "failures": self.failures, "fail_streak": self._fail_streak,
+            }
+
+
+_LLM_DEFAULTS: Dict[str, Any] = {"retries": 1, "breaker_failures": 3, "breaker_cooldown_seconds": 30.0}
+
+_CONTROLLERS: Dict[Tuple[str, str], AdaptiveController] = {}
+_LOCK = threading.Lock()
+
+
+def _get_controller(kind: str, base_url: str, settings: Dict[str, Any]) -> AdaptiveController:
+    key = (kind, (base_url or "").rstrip("/"))
+    with _LOCK:
+        ctl = _CONTROLLERS.get(key)
+        if ctl is None:
+            ctl = AdaptiveController(key[1], settings)
+            _CONTROLLERS[key] = ctl
+            log.info(f"{kind}_controller_init", extra={"extra_fields": {"base_url": key[1], **ctl.stats()}})
+        return ctl
+
+
+def get_embed_controller(base_url: str, app_cfg: Optional[Dict[str, Any]] = None) -> AdaptiveController:
+    """Prozessweit ein Regler je Ollama-Host; die erste Konfiguration gewinnt."""
+    return _get_controller("embed", base_url, (app_cfg or {}).get("embedding_controller") or {})
+
+
+def get_llm_controller(base_url: str, app_cfg: Optional[Dict[str, Any]] = None) -> AdaptiveController:
+    """Eigener Regler/Breaker für generate/chat je Ollama-Host (getrennt von den Embeddings)."""
+    return _get_controller("llm", base_url, {**_LLM_DEFAULTS, **((app_cfg or {}).get("llm_controller") or {})})
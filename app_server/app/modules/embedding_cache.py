@@ -0,0 +1,188 @@
+# app/modules/embedding_cache.py
+# Persistenter, inhaltsadressierter Embedding-Cache (SQLite unter paths.app_state_dir).
+# - Schlüssel: (Embedding-Modell, sha256(Text)); gespeichert werden Rohvektoren (vor der Normalisierung),
+#   Aufrufer normalisieren selbst -> ein Eintrag je Text, egal ob mit oder ohne normalize
+#   (Spalte normalize nur noch aus Kompatibilität mit bestehenden Dateien, neue Einträge mit 0)
+# - Werte: kompakte float32-Blobs (array('f'))
+# - Größenlimit in MB, LRU-Eviction über last_access
+# - Hit/Miss-Zähler pro Prozess (stats())
+# Konfiguration (app_config.json):
+#   "embedding_cache": {"enabled": true, "max_mb": 512, "filename": "embedding_cache.sqlite"}
+
+from typing import Any, Dict, List, Optional
+from array import array
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from app.modules.logging_setup import get_logger
+
+log = get_logger("embedding_cache")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    model       TEXT    NOT NULL,
+    normalize   INTEGER NOT NULL,
+    text_sha    TEXT    NOT NULL,
+    dim         INTEGER NOT NULL,
+    vec         BLOB    NOT NULL,
+    last_access REAL    NOT NULL,
+    PRIMARY KEY (model, normalize, text_sha)
+);
+CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings(last_access);
+"""
+
+
+def text_sha256(text: str) -> str:
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def _pack(vec: List[float]) -> bytes:
+    return array("f", vec).tobytes()
+
+
+def _unpack(blob: bytes) -> List[float]:
+    a = array("f")
+    a.frombytes(blob)
+    return a.tolist()
+
+
+class EmbeddingCache:
+    def __init__(self, path: str, max_mb: float = 512.0):
+        self.path = path
+        self.max_bytes = int(float(max_mb) * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._bytes = self._total_bytes()
+        log.info("embedding_cache_init", extra={"extra_fields": {
+            "path": path, "max_mb": max_mb, "bytes": self._bytes
+        }})
+
+    # --------- intern ---------
+    def _total_bytes(self) -> int:
+        row = self._conn.execute("SELECT COALESCE(SUM(LENGTH(vec)), 0) FROM embeddings").fetchone()
+        return int(row[0] or 0)
+
+    def _evict_locked(self) -> None:
+        if self._bytes <= self.max_bytes:
+            return
+        target = int(self.max_bytes * 0.9)
+        removed = 0
+        while self._bytes > target:
+            rows = self._conn.execute(
+                "SELECT rowid, LENGTH(vec) FROM embeddings ORDER BY last_access ASC LIMIT 500"
+            ).fetchall()
+            if not rows:
+                break
+            victims = []
+            for rowid, size in rows:
+                if self._bytes <= target:
+                    break
+                victims.append((rowid,))
+                self._bytes -= int(size or 0)
+            self._conn.executemany("DELETE FROM embeddings WHERE rowid = ?", victims)
+            removed += len(victims)
+        self._conn.commit()
+        self._bytes = self._total_bytes()
+        log.info("embedding_cache_evicted", extra={"extra_fields": {"removed": removed, "bytes": self._bytes}})
+
+    # --------- API ---------
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """Liefert je Text den Rohvektor oder None (Miss). Reihenfolge wie texts."""
+        if not texts:
+            return []
+        shas = [text_sha256(t) for t in texts]
+        found: Dict[str, List[float]] = {}
+        uniq = list(dict.fromkeys(shas))
+        with self._lock:
+            for s in range(0, len(uniq), 500):
+                part = uniq[s:s + 500]
+                q = ("SELECT text_sha, vec FROM embeddings WHERE model = ? AND text_sha IN (%s)"
+                     % ",".join("?" * len(part)))
+                for sha, blob in self._conn.execute(q, [model] + part):
+                    found[sha] = _unpack(blob)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE model = ? AND text_sha = ?",
+                    [(now, model, sha) for sha in found],
+                )
+                self._conn.commit()
+            out = [found.get(sha) for sha in shas]
+            hits = sum(1 for v in out if v is not None)
+            self.hits += hits
+            self.misses += len(out) - hits
+        return out
+
+    def put_many(self, model: str, texts: List[str], vectors: List[List[float]]) -> int:
+        """Speichert nicht-leere Rohvektoren; liefert Anzahl geschriebener Einträge."""
+        now = time.time()
+        rows = []
+        for t, v in zip(texts, vectors):
+            if not v:
+                continue
+            rows.append((model, 0, text_sha256(t), len(v), _pack(v), now))
+        if not rows:
+            return 0
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, normalize, text_sha, dim, vec, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+            self._bytes += sum(len(r[4]) for r in rows)
+            self._evict_locked()
+        return len(rows)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = int(self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0] or 0)
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits / total) if total else 0.0,
+                "entries": entries,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self._bytes = 0
+
+
+_CACHES: Dict[str, EmbeddingCache] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def get_embedding_cache(app_cfg: Dict[str, Any]) -> Optional[EmbeddingCache]:
+    """Prozessweite Cache-Instanz je Datei; None, wenn deaktiviert oder kein app_state_dir."""
+    cc = (app_cfg or {}).get("embedding_cache") or {}
+    if not cc.get("enabled", True):
+        return None
+    state_dir = ((app_cfg or {}).get("paths") or {}).get("app_state_dir")
+    if not state_dir:
+        return None
+    path = os.path.join(state_dir, cc.get("filename") or "embedding_cache.sqlite")
+    with _CACHES_LOCK:
+        cache = _CACHES.get(path)
+        if cache is None:
+            try:
+                cache = EmbeddingCache(path, max_mb=float(cc.get("max_mb", 512)))
+            except Exception as e:
+                log.warning("embedding_cache_unavailable", extra={"extra_fields": {"path": path, "err": str(e)}})
+                return None
+            _CACHES[path] = cache
+        return cache
@@ -0,0 +1,83 @@
+# app/modules/embedding_executor.py
+# Begrenzter Thread-Pool für Embedding-Requests.
+# - max_in_flight = maximale Anzahl gleichzeitig laufender Requests (passend zu OLLAMA_NUM_PARALLEL)
+# - Ergebnisreihenfolge = Eingabereihenfolge
+# - Fehler werden pro Eintrag gemeldet (Index + Fehlertext), nie als Exception nach außen –
+#   Ausnahme: CircuitOpenError (Ollama-Host gestört) bricht den Lauf sofort ab (Fail-Fast)
+# - Prozessweit geteilt: mehrere Ingests teilen sich dieselbe Obergrenze
+
+from typing import Any, Callable, Dict, List
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+from app.modules.logging_setup import get_logger
+from app.modules.embed_controller import CircuitOpenError
+
+log = get_logger("embedding_executor")
+
+BatchFn = Callable[[List[str]], List[List[float]]]
+
+
+class EmbeddingExecutor:
+    def __init__(self, max_in_flight: int = 4):
+        self.max_in_flight = max(1, int(max_in_flight or 1))
+        self._pool = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="embed")
+
+    def run(self, fn: BatchFn, inputs: List[str], batch_size: int = 1) -> Dict[str, Any]:
+        """
+        Teilt inputs in Batches, führt fn(batch) parallel aus und setzt die Ergebnisse
+        in Eingabereihenfolge zusammen.
+        Rückgabe: {"vectors": [...], "failed": [idx, ...], "errors": {idx: str}}
+        (leere Vektoren zählen als fehlgeschlagen).
+        """
+        bs = max(1, int(batch_size or 1))
+        batches = [inputs[s:s + bs] for s in range(0, len(inputs), bs)]
+        futures = [self._pool.submit(fn, b) for b in batches]
+
+        vectors: List[List[float]] = []
+        errors: Dict[int, str] = {}
+        for b, fut in zip(batches, futures):
+            base = len(vectors)
+            try:
+                res = fut.result() or []
+            except CircuitOpenError:
+                for f in futures:
+                    f.cancel()
+                raise
+            except Exception as e:
+                res = []
+                for i in range(len(b)):
+                    errors[base + i] = str(e)
+            if len(res) != len(b):
+                if res:
+                    for i in range(len(b)):
+                        errors.setdefault(base + i, f"batch_count_mismatch: {len(res)}/{len(b)}")
+                res = [[] for _ in b]
+            for i, v in enumerate(res):
+                if not v:
+                    errors.setdefault(base + i, "empty_vector")
+                vectors.append(v or [])
+
+        failed = sorted(errors.keys())
+        if failed:
+            log.warning("embedding_items_failed", extra={"extra_fields": {
+                "failed": len(failed), "total": len(inputs), "batches": len(batches),
+                "first_error": errors[failed[0]][:200],
+            }})
+        return {"vectors": vectors, "failed": failed, "errors": errors}
+
+
+_EXECUTORS: Dict[int, EmbeddingExecutor] = {}
+_LOCK = threading.Lock()
+
+
+def get_embedding_executor(max_in_flight: int) -> EmbeddingExecutor:
+    """Prozessweit geteilter Executor je max_in_flight-Wert."""
+    n = max(1, int(max_in_flight or 1))
+    with _LOCK:
+        ex = _EXECUTORS.get(n)
+        if ex is None:
+            ex = EmbeddingExecutor(n)
+            _EXECUTORS[n] = ex
+            log.info("embedding_executor_init", extra={"extra_fields": {"max_in_flight": n}})
+        return ex
@@ -1,130 +1,214 @@
 # app/modules/embeddings_factory.py
 # Robuster direkter Ollama-Embeddings-Client:
-# - Erst Versuch mit "prompt" (stabil in Praxis/Docs), Fallback auf "input"
-# - Akzeptiert Antwortschema {"embedding":[...]} und {"embeddings":[[...], ...]}
-# - Unterstützt Chunking langer Texte + Aggregation (mean/sum)
+# - HTTP über den gemeinsamen OllamaEmbedTransport: Endpoint/Payload-Key/Antwortschema werden
+#   einmal je (base_url, model) geprobt und gecacht (kein "prompt"->"input"-Doppelrequest mehr)
+# - Lange Texte: token-bewusst an Satzgrenzen zerlegt (embeddings[].max_input_tokens,
+#   Tokenizer oder chars_per_token; token_splitter) + längengewichtete Aggregation (vector_ops)
+# - normalize=true (Embedding-Config): Ergebnisvektoren werden L2-normalisiert
+# - Batch-Modus: mehrere Eingaben pro Request an /api/embed (retrieval.embedding_batch_size)
+# - Parallel-Modus: bis zu max_in_flight Requests gleichzeitig (retrieval.embedding_max_in_flight)
+# - embed_with_retry(): nur fehlgeschlagene/dimensionsfalsche Einträge erneut (Backoff, gleiches Modell)
+# - HTTP-Keep-Alive: geteilte Session aus http_pool (app_config.ollama.pool_maxsize etc.)
+# - Adaptiver Regler (embed_controller): AIMD für Batchgröße/Parallelität, Jitter-Backoff,
+#   Circuit Breaker (CircuitOpenError -> Fail-Fast), adaptiver Timeout
+# - Persistenter Embedding-Cache (app_config.embedding_cache): nur Cache-Misses gehen an Ollama
 # - Detailliertes Logging (strukturierte Felder)
 #
 # Änderung ggü. Vorversion:
 # - Import-Pfad korrigiert: from app.modules.logging_setup import get_logger
 
-from typing import Dict, List, Any, Callable
-import requests
+from typing import Dict, List, Any, Optional
+import time
 
 from app.modules.logging_setup import get_logger  # <-- Import konsistent gemacht
+from app.modules.embedding_executor import get_embedding_executor
+from app.modules.embedding_cache import get_embedding_cache
+from app.modules import vector_ops
+from app.modules.ollama_embed_transport import OllamaEmbedTransport
+from app.modules.http_pool import get_http_session
+from app.modules.embed_controller import get_embed_controller
+from app.modules.token_splitter import get_token_counter, split_for_embedding
 
 log = get_logger("embeddings_factory")
 
-def _mean(vectors: List[List[float]]) -> List[float]:
-    if not vectors:
-        return []
-    n = len(vectors[0]) if vectors[0] else 0
-    if n == 0:
-        return []
-    acc = [0.0] * n
-    k = 0
-    for v in vectors:
-        if not v or len(v) != n:
-            return []
-        for i, x in enumerate(v):
-            acc[i] += float(x)
-        k += 1
-    return [x / max(1, k) for x in acc]
-
-def _sum(vectors: List[List[float]]) -> List[float]:
-    if not vectors:
-        return []
-    n = len(vectors[0]) if vectors[0] else 0
-    if n == 0:
-        return []
-    acc = [0.0] * n
-    for v in vectors:
-        if not v or len(v) != n:
-            return []
-        for i, x in enumerate(v):
-            acc[i] += float(x)
-    return acc
-
 class EmbeddingsFactory:
     def __init__(self, app_cfg: Dict[str, Any], embedding_cfg: Dict[str, Any]):
         self.base = app_cfg["ollama"]["base_url"].rstrip("/")
         self.model = embedding_cfg["model"]
         self.max_timeout = int(app_cfg.get("timeouts", {}).get("embeddings_seconds", 120))
-        self.normalize = embedding_cfg.get("normalize", True)  # Platzhalter für evtl. spätere Normalisierung
-
-    def _parse_vec(self, j: Dict[str, Any]) -> List[float]:
-        # Schema 1: {"embedding": [...]}
-        emb = j.get("embedding")
-        if isinstance(emb, list):
-            return emb
-        # Schema 2: {"embeddings":[ [...], ... ]}
-        embs = j.get("embeddings")
-        if isinstance(embs, list) and embs and isinstance(embs[0], list):
-            return embs[0]
-        return []
+        self.dim: Optional[int] = int(embedding_cfg["dim"]) if embedding_cfg.get("dim") else None
+        self.normalize = bool(embedding_cfg.get("normalize", True))  # L2-Normalisierung der Ergebnisvektoren
+        self.cache = get_embedding_cache(app_cfg)
+        self.controller = get_embed_controller(self.base, app_cfg)
+        self.transport = OllamaEmbedTransport(self.base, timeout=self.max_timeout,
+                                              session=get_http_session(app_cfg), controller=self.controller)
+        # Token-Budget je Eingabe (None -> Zeichenbudget max_chars aus embed_robust)
+        mit = embedding_cfg.get("max_input_tokens")
+        self.max_input_tokens = int(mit) if mit else None
+        self.count_tokens = get_token_counter(embedding_cfg)
+        # Indizes (bzgl. texts) des letzten embed_robust-Aufrufs, die leer geblieben sind
+        self.last_failed: List[int] = []
 
     def _request_embed(self, text: str, prefer_prompt: bool = True) -> List[float]:
-        url = f"{self.base}/api/embeddings"
-        primary = {"model": self.model, "prompt": text} if prefer_prompt else {"model": self.model, "input": text}
+        """Einzel-Embedding über den gemeinsamen Transport (prefer_prompt nur noch aus Kompatibilität;
+        Endpoint/Payload-Key bestimmt die einmalige Capability-Probe)."""
+        return self.transport.embed(self.model, [text or ""])[0]
+
+    def _request_embed_batch(self, inputs: List[str]) -> List[List[float]]:
+        """Genau len(inputs) Vektoren (Reihenfolge wie Eingabe); [] für Fehlschläge."""
+        return self.transport.embed(self.model, inputs)
+
+    def _embed_single_batch(self, inputs: List[str]) -> List[List[float]]:
+        return [self._request_embed(t) or [] for t in inputs]
+
+    def _embed_inputs(self, inputs: List[str], batch_size: int, max_in_flight: int = 1) -> List[List[float]]:
+        """Wie _embed_uncached, fragt aber zuerst den Embedding-Cache; nur (eindeutige) Misses
+        werden angefragt und anschließend gespeichert (Rohvektoren, normalisiert wird danach)."""
+        if self.cache is None or not inputs:
+            return self._embed_uncached(inputs, batch_size, max_in_flight)
         try:
-            r = requests.post(url, json=primary, timeout=self.max_timeout)
-            if r.status_code != 200:
-                log.error("ollama_http_error", extra={"extra_fields": {
-                    "status": r.status_code, "body": (r.text or "")[:200], "model": self.model, "phase": "primary"
-                }})
-                return []
-            v = self._parse_vec(r.json())
-            if v:
-                return v
-            # Alternate key probieren (prompt <-> input)
-            alt = {"model": self.model, "input": text} if prefer_prompt else {"model": self.model, "prompt": text}
-            r2 = requests.post(url, json=alt, timeout=self.max_timeout)
-            if r2.status_code != 200:
-                log.error("ollama_http_error", extra={"extra_fields": {
-                    "status": r2.status_code, "body": (r2.text or "")[:200], "model": self.model, "phase": "alternate"
-                }})
-                return []
-            v2 = self._parse_vec(r2.json())
-            if not v2:
-                log.warning("ollama_empty_embedding", extra={"extra_fields": {
-                    "model": self.model, "len_text": len(text), "tried": ["prompt", "input"]
-                }})
-            return v2 or []
+            cached = self.cache.get_many(self.model, inputs)
         except Exception as e:
-            log.error("ollama_embed_exception", extra={"extra_fields": {"error": str(e), "model": self.model}})
-            return []
+            log.warning("embedding_cache_read_failed", extra={"extra_fields": {"err": str(e)}})
+            return self._embed_uncached(inputs, batch_size, max_in_flight)
+        misses = list(dict.fromkeys(t for t, v in zip(inputs, cached) if v is None))
+        fresh: Dict[str, List[float]] = {}
+        if misses:
+            vecs = self._embed_uncached(misses, batch_size, max_in_flight)
+            fresh = {t: v for t, v in zip(misses, vecs)}
+            try:
+                self.cache.put_many(self.model, misses, vecs)
+            except Exception as e:
+                log.warning("embedding_cache_write_failed", extra={"extra_fields": {"err": str(e)}})
+        log.debug("embedding_cache_lookup", extra={"extra_fields": {
+            "model": self.model, "inputs": len(inputs), "misses": len(misses)
+        }})
+        return [v if v is not None else (fresh.get(t) or []) for t, v in zip(inputs, cached)]
+
+    def _embed_uncached(self, inputs: List[str], batch_size: int, max_in_flight: int = 1) -> List[List[float]]:
+        """Bettet eine flache Eingabeliste ein; batch_size <= 1 entspricht dem bisherigen Einzelpfad,
+        max_in_flight > 1 verteilt die Batches auf den geteilten Thread-Pool.
+        Gearbeitet wird in Wellen: je Welle gelten die aktuellen Reglerwerte (AIMD), nach oben
+        begrenzt durch batch_size/max_in_flight."""
+        fn = self._request_embed_batch if batch_size > 1 else self._embed_single_batch
+        out: List[List[float]] = []
+        pos = 0
+        while pos < len(inputs):
+            eff = self.controller.effective(max(1, batch_size), max(1, max_in_flight))
+            bs, mif = eff["batch_size"], eff["max_in_flight"]
+            wave = inputs[pos:pos + bs * mif]
+            pos += len(wave)
+            if mif > 1 and len(wave) > 1:
+                out.extend(get_embedding_executor(max_in_flight).run(fn, wave, batch_size=bs)["vectors"])
+                continue
+            for s in range(0, len(wave), bs):
+                out.extend(fn(wave[s:s + bs]))
+        return out
 
     def embed(self, texts: List[str]) -> List[List[float]]:
         out: List[List[float]] = []
         for t in texts:
             t = t or ""
-            v = self._request_embed(t, prefer_prompt=True)
+            v = self._request_embed(t)
             out.append(v or [])
-        return out
+        return vector_ops.l2_normalize_many(out) if self.normalize else out
+
+    def embed_robust(self, texts: List[str], max_chars: int = 2000, agg: str = "mean",
+                     batch_size: int = 1, max_in_flight: int = 1) -> List[List[float]]:
+        """Lange Texte werden an Satzgrenzen in Teile unterhalb des Token-Budgets zerlegt
+        (max_input_tokens; ohne Angabe max_chars Zeichen) und längengewichtet aggregiert.
+        Alle Teile werden gemeinsam in Batches eingebettet. Reihenfolge bleibt erhalten,
+        Fehlschläge liefern [] je Text (Indizes danach in self.last_failed)."""
+        if self.max_input_tokens:
+            budget, count = self.max_input_tokens, self.count_tokens
+        else:
+            budget, count = int(max_chars), len
+        # 1) Alle Texte in Teile zerlegen (owner = Index des Ursprungstexts, weight = Teillänge)
+        owners: List[int] = []
+        inputs: List[str] = []
+        weights: List[int] = []
+        split_texts = 0
+        for k, t in enumerate(texts):
+            parts = split_for_embedding(t or "", budget, count)
+            if len(parts) > 1:
+                split_texts += 1
+            for p in parts:
+                owners.append(k); inputs.append(p); weights.append(count(p))
+        if split_texts:
+            log.debug("embed_inputs_split", extra={"extra_fields": {
+                "model": self.model, "texts_split": split_texts, "parts": len(inputs), "budget": budget,
+                "unit": "tokens" if self.max_input_tokens else "chars",
+            }})
+
+        # 2) Einbetten (einzeln oder gebatcht)
+        flat = self._embed_inputs(inputs, int(batch_size or 1), int(max_in_flight or 1))
 
-    def embed_robust(self, texts: List[str], max_chars: int = 2000, agg: str = "mean") -> List[List[float]]:
-        agg_fn: Callable[[List[List[float]]], List[float]] = _mean if agg == "mean" else _sum
+        # 3) Pro Ursprungstext einsammeln + aggregieren (mean: nach Teillänge gewichtet)
+        subs: List[List[List[float]]] = [[] for _ in texts]
+        sub_w: List[List[int]] = [[] for _ in texts]
+        for k, v, w in zip(owners, flat, weights):
+            subs[k].append(v or [])
+            sub_w[k].append(w)
         out: List[List[float]] = []
-        for t in texts:
-            t = t or ""
-            if len(t) <= max_chars:
-                v = self._request_embed(t, prefer_prompt=True)
-                out.append(v or [])
+        for sub, w in zip(subs, sub_w):
+            if len(sub) == 1:
+                out.append(sub[0] or [])
                 continue
-            # Stückeln
-            parts: List[str] = []
-            s = 0
-            n = len(t)
-            while s < n:
-                e = min(n, s + max_chars)
-                parts.append(t[s:e])
-                s = e
-            sub = [self._request_embed(p, prefer_prompt=True) for p in parts]
-            vec = agg_fn(sub)
+            vec = vector_ops.weighted_mean(sub, w) if agg == "mean" else vector_ops.total(sub)
             if not vec:
                 lens = [len(v) for v in sub]
                 log.warning("agg_empty_embedding", extra={"extra_fields": {
-                    "parts": len(parts), "sub_vec_lens": lens, "model": self.model
+                    "parts": len(sub), "sub_vec_lens": lens, "model": self.model
                 }})
             out.append(vec or [])
+        if self.normalize:
+            out = vector_ops.l2_normalize_many(out)
+        self.last_failed = [k for k, v in enumerate(out) if not v]
+        if int(batch_size or 1) > 1 or int(max_in_flight or 1) > 1:
+            bs = max(1, int(batch_size or 1))
+            log.info("embed_batched", extra={"extra_fields": {
+                "model": self.model, "texts": len(texts), "inputs": len(inputs), "batch_size": bs,
+                "requests": (len(inputs) + bs - 1) // bs, "max_in_flight": int(max_in_flight or 1),
+                "failed": len(self.last_failed),
+            }})
+        return out
+
+    def _invalid_indices(self, vectors: List[List[float]]) -> List[int]:
+        """Leere Vektoren und Vektoren mit falscher Dimension (dim aus Config, sonst häufigste)."""
+        dim = self.dim
+        if not dim:
+            lens = [len(v) for v in vectors if v]
+            dim = max(set(lens), key=lens.count) if lens else 0
+        return [i for i, v in enumerate(vectors) if not v or len(v) != dim]
+
+    def embed_with_retry(self, texts: List[str], max_chars: int = 2000, agg: str = "mean",
+                         batch_size: int = 1, max_in_flight: int = 1,
+                         retries: int = 2, backoff_seconds: float = 0.5) -> List[List[float]]:
+        """embed_robust + gezielte Wiederholung nur der fehlgeschlagenen Einträge auf DEMSELBEN Modell
+        (exponentieller Backoff). Dimensionsfalsche Vektoren gelten als Fehlschlag und werden zu [].
+        Endgültige Fehlschläge danach in self.last_failed."""
+        out = self.embed_robust(texts, max_chars=max_chars, agg=agg,
+                                batch_size=batch_size, max_in_flight=max_in_flight)
+        failed = self._invalid_indices(out)
+        attempt = 0
+        while failed and attempt < max(0, int(retries)):
+            delay = float(backoff_seconds) * (2 ** attempt)
+            attempt += 1
+            log.info("embed_retry", extra={"extra_fields": {
+                "model": self.model, "attempt": attempt, "items": len(failed), "total": len(texts), "delay_s": delay
+            }})
+            if delay > 0:
+                time.sleep(delay)
+            again = self.embed_robust([texts[i] for i in failed], max_chars=max_chars, agg=agg,
+                                      batch_size=batch_size, max_in_flight=max_in_flight)
+            for i, v in zip(failed, again):
+                out[i] = v or []
+            failed = self._invalid_indices(out)
+        for i in failed:
+            out[i] = []
+        self.last_failed = failed
+        if failed:
+            log.warning("embed_retry_exhausted", extra={"extra_fields": {
+                "model": self.model, "failed": len(failed), "total": len(texts), "attempts": attempt
+            }})
         return out
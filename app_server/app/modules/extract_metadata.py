@@ -6,12 +6,14 @@
 
 from .metadata_extraction import (
     extract_first_page_text,
+    first_page_text,
     extract_by_regex,
     llm_fill_missing,
 )
 
 __all__ = [
     "extract_first_page_text",
+    "first_page_text",
     "extract_by_regex",
     "llm_fill_missing",
 ]
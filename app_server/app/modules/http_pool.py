@@ -0,0 +1,90 @@
+# app/modules/http_pool.py
+# Prozessweit geteilte HTTP-Session (requests + urllib3-Connection-Pool) für allen Ollama-Traffic.
+# - Keep-Alive: TCP-Verbindungen (inkl. DNS für host.docker.internal) werden wiederverwendet
+# - Poolgröße passend zu retrieval.embedding_max_in_flight (pool_maxsize >= parallele Requests)
+# - Timeouts als (connect, read)-Tupel: Verbindungsaufbau schnell abbrechen, Lesen lang erlauben
+# Konfiguration (app_config.json):
+#   "ollama": {"base_url": "...", "pool_connections": 4, "pool_maxsize": 16,
+#              "connect_timeout_seconds": 5}
+# Die erste Konfiguration (configure_http_pool / get_http_session(app_cfg)) legt die Session an;
+# spätere Aufrufe ohne Config teilen dieselbe Session.
+
+from typing import Any, Dict, Optional, Tuple
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.modules.logging_setup import get_logger
+
+log = get_logger("http_pool")
+
+_DEFAULTS: Dict[str, Any] = {
+    "pool_connections": 4,       # Anzahl Hosts mit eigenem Pool
+    "pool_maxsize": 16,          # Verbindungen je Host
+    "connect_timeout_seconds": 5.0,
+}
+
+_SESSION: Optional[requests.Session] = None
+_SETTINGS: Dict[str, Any] = dict(_DEFAULTS)
+_LOCK = threading.Lock()
+
+
+def _settings_from(app_cfg: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    oc = ((app_cfg or {}).get("ollama") or {})
+    out = dict(_DEFAULTS)
+    for k in _DEFAULTS:
+        if oc.get(k) is not None:
+            out[k] = oc[k]
+    out["pool_connections"] = max(1, int(out["pool_connections"]))
+    out["pool_maxsize"] = max(1, int(out["pool_maxsize"]))
+    out["connect_timeout_seconds"] = max(0.1, float(out["connect_timeout_seconds"]))
+    return out
+
+
+def _build(settings: Dict[str, Any]) -> requests.Session:
+    s = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=settings["pool_connections"],
+        pool_maxsize=settings["pool_maxsize"],
+        pool_block=False,  # bei Überlauf neue Verbindung statt Blockieren (Executor begrenzt ohnehin)
+    )
+    s.mount("http://", adapter)
+    s.mount("https://", adapter)
+    s.headers.update({"Content-Type": "application/json"})
+    return s
+
+
+def configure_http_pool(app_cfg: Optional[Dict[str, Any]]) -> requests.Session:
+    """Legt die geteilte Session mit den Werten aus app_cfg['ollama'] an (nur beim ersten Aufruf)."""
+    global _SESSION, _SETTINGS
+    with _LOCK:
+        if _SESSION is None:
+            _SETTINGS = _settings_from(app_cfg)
+            _SESSION = _build(_SETTINGS)
+            log.info("http_pool_init", extra={"extra_fields": dict(_SETTINGS)})
+        return _SESSION
+
+
+def get_http_session(app_cfg: Optional[Dict[str, Any]] = None) -> requests.Session:
+    """Geteilte Session; ohne app_cfg mit Defaults bzw. der zuerst konfigurierten Einstellung."""
+    if _SESSION is not None:
+        return _SESSION
+    return configure_http_pool(app_cfg)
+
+
+def http_timeout(read_seconds: float) -> Tuple[float, float]:
+    """(connect, read)-Timeout für requests; connect aus der Pool-Konfiguration."""
+    return (float(_SETTINGS["connect_timeout_seconds"]), float(read_seconds))
+
+
+def reset_http_pool() -> None:
+    """Schließt die Session (z.B. nach Netzwerkwechsel); nächster Zugriff baut sie neu auf."""
+    global _SESSION
+    with _LOCK:
+        if _SESSION is not None:
+            try:
+                _SESSION.close()
+            except Exception:
+                pass
+        _SESSION = None
@@ -0,0 +1,93 @@
+# modules/ingest/bulk_ops.py
+# Eingaben für den Bulk-Ingest: Verzeichnis-Scan (+ Sidecar-Metadaten) oder Manifest.
+# Einträge haben die Form {"path": <abs. PDF-Pfad>, "docid": str|None, "metadata": dict}.
+# - Verzeichnis: alle *.pdf (rekursiv optional); Metadaten aus <name>.json bzw.
+#   <name>.metadata.json neben der PDF (Format wie metadata_in der IngestFacade)
+# - Manifest: .json (Liste oder {"items": [...]}), .jsonl oder .csv
+#   (Spalten file|path, optional docid, alle übrigen Spalten = Metadaten)
+#   Relative Pfade gelten relativ zum Manifest-Verzeichnis.
+
+from typing import Any, Dict, List, Optional
+import csv
+import hashlib
+import json
+import os
+
+from modules.logging_setup import get_logger
+
+log = get_logger("ingest.bulk_ops")
+
+_SKIP_KEYS = ("file", "path", "docid", "filehash")
+
+
+def file_sha256(b: bytes) -> str:
+    return hashlib.sha256(b).hexdigest()
+
+
+def default_docid(filehash: str) -> str:
+    """Stabile docid aus dem Datei-Hash (Neustart eines Laufs erzeugt dieselbe docid)."""
+    return (filehash or "")[:8]
+
+
+def _read_sidecar(pdf_path: str) -> Optional[Dict[str, Any]]:
+    stem = os.path.splitext(pdf_path)[0]
+    for cand in (f"{stem}.metadata.json", f"{stem}.json"):
+        if os.path.isfile(cand):
+            with open(cand, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                return data
+    return None
+
+
+def _entry(path: str, raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Manifest-/Sidecar-Zeile → Eintrag; 'docid' wird herausgelöst, Rest ist metadata_in."""
+    # "filehash": Sidecar im Format von save_metadata_json – kein fachliches Feld
+    md = {k: v for k, v in raw.items() if k not in _SKIP_KEYS and v not in (None, "")}
+    return {"path": path, "docid": (str(raw.get("docid")).strip() if raw.get("docid") else None), "metadata": md}
+
+
+def discover_pdfs(directory: str, recursive: bool = False) -> List[Dict[str, Any]]:
+    """Alle PDFs eines Verzeichnisses (sortiert), Metadaten aus Sidecar-JSON falls vorhanden."""
+    root = os.path.abspath(directory)
+    if not os.path.isdir(root):
+        raise ValueError(f"Verzeichnis nicht gefunden: {directory}")
+    paths: List[str] = []
+    if recursive:
+        for d, _, names in os.walk(root):
+            paths.extend(os.path.join(d, n) for n in names if n.lower().endswith(".pdf"))
+    else:
+        paths = [os.path.join(root, n) for n in os.listdir(root) if n.lower().endswith(".pdf")]
+    entries = []
+    for p in sorted(paths):
+        side = _read_sidecar(p)
+        entries.append(_entry(p, side) if side else {"path": p, "docid": None, "metadata": {}})
+    log.info("bulk_dir_scanned", extra={"extra_fields": {
+        "dir": root, "pdfs": len(entries), "with_metadata": sum(1 for e in entries if e["metadata"]),
+    }})
+    return entries
+
+
+def load_manifest(manifest_path: str) -> List[Dict[str, Any]]:
+    """Liest ein Manifest (.json/.jsonl/.csv) in Einträge."""
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    ext = os.path.splitext(manifest_path)[1].lower()
+    with open(manifest_path, "r", encoding="utf-8-sig") as f:
+        if ext == ".csv":
+            rows = list(csv.DictReader(f))
+        elif ext == ".jsonl":
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            data = json.load(f)
+            rows = data.get("items", []) if isinstance(data, dict) else data
+    entries = []
+    for n, row in enumerate(rows or [], start=1):
+        if not isinstance(row, dict):
+            raise ValueError(f"Manifest-Zeile {n}: Objekt erwartet")
+        rel = row.get("file") or row.get("path")
+        if not rel:
+            raise ValueError(f"Manifest-Zeile {n}: Feld 'file' fehlt")
+        path = rel if os.path.isabs(rel) else os.path.join(base, rel)
+        entries.append(_entry(os.path.abspath(path), row))
+    log.info("bulk_manifest_loaded", extra={"extra_fields": {"manifest": manifest_path, "items": len(entries)}})
+    return entries
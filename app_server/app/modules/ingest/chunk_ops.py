@@ -24,5 +24,5 @@ log = get_logger("ingest.chunk_ops")
 _ID_IDX_RE = re.compile(r"_c_(\d{4})$")
 
 from .filters import align_and_prune_children, filter_chunks_minlen  # re-export
-from .parent_grouping import build_parents  # re-export
-from .splitters import _infer_chunk_index, build_children  # re-export
+from .parent_grouping import build_parents, parent_metadata  # re-export
+from .splitters import _infer_chunk_index, build_children, child_metadata  # re-export
@@ -1,8 +1,10 @@
 # modules/ingest/embed_ops.py
-from typing import Dict, Any, List, Tuple
+from typing import Callable, Dict, Any, List, Optional, Tuple
 from modules.logging_setup import get_logger
 from modules.embeddings_factory import EmbeddingsFactory
 from modules.model_registry import ModelRegistry
+from app.modules.embed_controller import CircuitOpenError  # gleiche Klasse wie im Transport (app.modules)
+from modules import vector_ops
 
 log = get_logger("ingest.embed_ops")
 
@@ -12,15 +14,87 @@ def _count_empty(vectors: List[List[float]]) -> Tuple[int,int]:
     return total, empty
 
 def _avg_vectors(vs: List[List[float]]) -> List[float]:
-    if not vs: return []
-    n = len(vs[0]) if vs[0] else 0
-    if n == 0: return []
-    acc = [0.0]*n; k = 0
-    for v in vs:
-        if not v or len(v)!=n: return []
-        for i,x in enumerate(v): acc[i]+=x
-        k += 1
-    return [x/max(1,k) for x in acc]
+    return vector_ops.mean(vs)
+
+PARENT_VECTOR_STRATEGIES = ("embed", "pool_mean", "pool_weighted")
+
+def pool_parent_vectors(parents_raw: List[Dict[str, Any]], children_mds: List[Dict[str, Any]],
+                        children_docs: List[str], child_vecs: List[List[float]],
+                        weighted: bool = False, normalize: bool = False) -> List[List[float]]:
+    """Parent-Vektoren aus Child-Vektoren (über child_indices -> chunk_index).
+    weighted=True gewichtet nach Child-Textlänge; normalize=True normalisiert das Ergebnis (L2).
+    Parents ohne gültige Child-Vektoren -> []."""
+    idx_by_chunk = {m.get("chunk_index"): i for i, m in enumerate(children_mds or []) if isinstance(m, dict)}
+    out: List[List[float]] = []
+    for raw in parents_raw or []:
+        pos = [idx_by_chunk.get(ci) for ci in raw.get("child_indices") or []]
+        pos = [i for i in pos if i is not None and i < len(child_vecs) and child_vecs[i]]
+        subs = [child_vecs[i] for i in pos]
+        if weighted:
+            lens = [len((children_docs[i] if i < len(children_docs) else "") or "") for i in pos]
+            out.append(vector_ops.weighted_mean(subs, lens))
+        else:
+            out.append(_avg_vectors(subs))
+    return vector_ops.l2_normalize_many(out) if normalize else out
+
+def retry_settings(retrieval_cfg: Dict[str, Any]) -> Dict[str, Any]:
+    """Retry-/Alias-Wechsel-Parameter aus retrieval_cfg (mit Defaults)."""
+    rc = retrieval_cfg or {}
+    return {
+        "retries": int(rc.get("embedding_retry_attempts", 2)),
+        "backoff_seconds": float(rc.get("embedding_retry_backoff_seconds", 0.5)),
+        "switch_ratio": float(rc.get("embedding_alias_switch_ratio", 0.2)),
+    }
+
+def embed_document_with_fallback(app_cfg: Dict[str, Any], resolve_cfg: Callable[[str], Dict[str, Any]],
+                                 aliases: List[str], texts: List[str], retrieval_cfg: Dict[str, Any],
+                                 max_chars: int = 2000, agg: str = "mean") -> Dict[str, Any]:
+    """
+    Bettet alle Texte eines Dokuments mit EINEM Modell ein (ein Vektorraum je Dokument):
+    - fehlgeschlagene Einträge werden einzeln auf demselben Modell wiederholt (Backoff)
+    - Alias-Wechsel nur als Dokument-Entscheidung, wenn die Fehlerquote nach den Retries
+      retrieval.embedding_alias_switch_ratio überschreitet; dann wird das ganze Dokument neu eingebettet
+    - sonst bleiben Einzel-Fehlschläge als [] stehen (Indizes unter "failed")
+    Rückgabe: {vectors, alias, emb_cfg, factory, failed, failure_ratio, tried}
+    """
+    rs = retry_settings(retrieval_cfg)
+    batch_size = int((retrieval_cfg or {}).get("embedding_batch_size", 16))
+    max_in_flight = int((retrieval_cfg or {}).get("embedding_max_in_flight", 4))
+    tried: List[str] = []
+    best: Optional[Dict[str, Any]] = None
+    for alias in [a for a in aliases if a]:
+        if alias in tried:
+            continue
+        tried.append(alias)
+        try:
+            emb_cfg = resolve_cfg(alias)
+            fac = EmbeddingsFactory(app_cfg, emb_cfg)
+            vecs = fac.embed_with_retry(texts, max_chars=max_chars, agg=agg, batch_size=batch_size,
+                                        max_in_flight=max_in_flight, retries=rs["retries"],
+                                        backoff_seconds=rs["backoff_seconds"])
+        except CircuitOpenError:
+            raise  # Ollama-Host gestört: kein Alias-Wechsel, Ingest bricht schnell ab
+        except Exception as e:
+            log.error("embedding_alias_failed", extra={"extra_fields": {"alias": alias, "error": str(e)}})
+            continue
+        failed = [i for i, v in enumerate(vecs) if not v]
+        ratio = (len(failed) / len(texts)) if texts else 0.0
+        res = {"vectors": vecs, "alias": alias, "emb_cfg": emb_cfg, "factory": fac,
+               "failed": failed, "failure_ratio": ratio, "tried": tried}
+        if best is None or ratio < best["failure_ratio"]:
+            best = res
+        if ratio <= rs["switch_ratio"]:
+            break
+        log.warning("embedding_alias_switch", extra={"extra_fields": {
+            "alias": alias, "failure_ratio": round(ratio, 4), "threshold": rs["switch_ratio"],
+            "failed": len(failed), "total": len(texts),
+        }})
+    if best is None:
+        return {"vectors": [[] for _ in texts], "alias": (aliases or [None])[0], "emb_cfg": None,
+                "factory": None, "failed": list(range(len(texts))), "failure_ratio": 1.0 if texts else 0.0,
+                "tried": tried}
+    best["tried"] = tried
+    return best
 
 def embed_parents_with_fallback(app_cfg: Dict[str, Any], model_reg: ModelRegistry,
                                 retrieval_cfg: Dict[str, Any],
@@ -36,39 +110,29 @@ def embed_parents_with_fallback(app_cfg: Dict[str, Any], model_reg: ModelRegistr
         fallbacks = retrieval_cfg.get("embedding_alias_fallbacks", []) or []
         max_chars = int(retrieval_cfg.get("max_chars_per_embedding", 2000))
         agg = retrieval_cfg.get("embedding_agg", "mean")
+        batch_size = int(retrieval_cfg.get("embedding_batch_size", 16))
+        max_in_flight = int(retrieval_cfg.get("embedding_max_in_flight", 4))
 
-        tried: List[str] = []
-        vectors_parent: List[List[float]] = []
-
-        def _embed_alias(alias: str, texts: List[str]) -> List[List[float]]:
-            try:
-                emb_cfg = model_reg.embedding_by_alias(alias)
-                emb = EmbeddingsFactory(app_cfg, emb_cfg)
-                log.info("embedding_parents_start", extra={"extra_fields":{"alias": alias, "model": emb_cfg.get("model"), "count": len(texts), "max_chars": max_chars, "agg": agg}})
-                return emb.embed_robust(texts, max_chars=max_chars, agg=agg) or []
-            except Exception as e:
-                log.error("embedding_alias_failed", extra={"extra_fields":{"alias": alias, "error": str(e)}})
-                return []
-
-        # 1) Primär + Fallbacks
-        for alias in [emb_alias] + fallbacks:
-            tried.append(alias)
-            vectors_parent = _embed_alias(alias, docs_p)
-            total, empty = _count_empty(vectors_parent)
-            if empty < total:
-                # leere Einträge rausfiltern
-                if empty > 0:
-                    nd, ni, nm, nv = [], [], [], []
-                    for d, i, m, v in zip(docs_p, ids_p, mds_p, vectors_parent):
-                        if v and len(v)>0:
-                            nd.append(d); ni.append(i); nm.append(m); nv.append(v)
-                    docs_p, ids_p, mds_p, vectors_parent = nd, ni, nm, nv
-                    log.info("empty_parent_embeddings_removed", extra={"extra_fields":{"remaining": len(docs_p), "alias_used": alias}})
-                log.info("embedding_parents_ok", extra={"extra_fields":{"alias_used": alias, "tried": tried}})
-                emb_alias = alias
-                break
-            else:
-                log.warning("embedding_parents_all_empty_on_alias", extra={"extra_fields":{"alias": alias}})
+        # 1) Primär-Alias mit Einzel-Retries; Alias-Wechsel nur über Fehlerquote (ganzes Dokument)
+        log.info("embedding_parents_start", extra={"extra_fields":{"alias": emb_alias, "count": len(docs_p), "max_chars": max_chars, "agg": agg, "batch_size": batch_size, "max_in_flight": max_in_flight}})
+        res = embed_document_with_fallback(app_cfg, model_reg.embedding_by_alias, [emb_alias] + fallbacks,
+                                           docs_p, retrieval_cfg, max_chars=max_chars, agg=agg)
+        tried: List[str] = res["tried"]
+        vectors_parent: List[List[float]] = res["vectors"]
+        total, empty = _count_empty(vectors_parent)
+        if empty < total:
+            emb_alias = res["alias"]
+            if empty > 0:
+                # nach Retries endgültig leere Einträge rausfiltern (Längen für Upsert)
+                nd, ni, nm, nv = [], [], [], []
+                for d, i, m, v in zip(docs_p, ids_p, mds_p, vectors_parent):
+                    if v and len(v)>0:
+                        nd.append(d); ni.append(i); nm.append(m); nv.append(v)
+                docs_p, ids_p, mds_p, vectors_parent = nd, ni, nm, nv
+                log.warning("empty_parent_embeddings_removed", extra={"extra_fields":{"removed": empty, "remaining": len(docs_p), "alias_used": emb_alias}})
+            log.info("embedding_parents_ok", extra={"extra_fields":{"alias_used": emb_alias, "tried": tried, "failure_ratio": res["failure_ratio"]}})
+        else:
+            log.warning("embedding_parents_all_empty", extra={"extra_fields":{"tried": tried}})
 
         # 2) Fallback: Mittelung aus Child-Embeddings, wenn noch leer
         total, empty = _count_empty(vectors_parent)
@@ -77,14 +141,14 @@ def embed_parents_with_fallback(app_cfg: Dict[str, Any], model_reg: ModelRegistr
                 last = tried[-1] if tried else emb_alias
                 emb_cfg = model_reg.embedding_by_alias(last)
                 emb = EmbeddingsFactory(app_cfg, emb_cfg)
-                child_vecs = emb.embed_robust(children.get("documents") or [], max_chars=max_chars, agg=agg) or []
-                idx_by_chunk = {m.get("chunk_index"): i for i, m in enumerate(children.get("metadatas") or [])}
-                parent_vecs = []
-                for raw in parents.get("raw") or []:
-                    idxs = [idx_by_chunk.get(ci) for ci in raw.get("child_indices") or [] if idx_by_chunk.get(ci) is not None]
-                    subs = [child_vecs[i] for i in idxs if i is not None and i < len(child_vecs) and child_vecs[i]]
-                    parent_vecs.append(_avg_vectors(subs))
-                vectors_parent = parent_vecs
+                rs = retry_settings(retrieval_cfg)
+                child_vecs = emb.embed_with_retry(children.get("documents") or [], max_chars=max_chars, agg=agg,
+                                                  batch_size=batch_size, max_in_flight=max_in_flight,
+                                                  retries=rs["retries"], backoff_seconds=rs["backoff_seconds"]) or []
+                vectors_parent = pool_parent_vectors(
+                    parents.get("raw") or [], children.get("metadatas") or [],
+                    children.get("documents") or [], child_vecs, normalize=emb.normalize,
+                )
                 total, empty = _count_empty(vectors_parent)
             except Exception as e:
                 log.error("embedding_children_averaging_failed", extra={"extra_fields":{"error": str(e)}})
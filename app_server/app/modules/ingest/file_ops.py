@@ -1,19 +1,40 @@
 # modules/ingest/file_ops.py
-from typing import Tuple, Dict, Any
+# Upload-Artefakte: PDF, Metadaten-JSON, Text-Store (<filehash>.text.json.gz – extrahierte Seitentexte
+# + Seiten-Offsets, gzip-JSON wie pdf_text_cache; Re-Chunking/Re-Index liest daraus statt pypdf)
+from typing import Any, Dict, Optional, Tuple, Union
 import hashlib, os, json
 
 from modules.logging_setup import get_logger
+from app.modules.pdf_text_cache import read_document, write_document
 log = get_logger("ingest.file_ops")
 
 def sha256_hex(b: bytes) -> str:
     return hashlib.sha256(b).hexdigest()
 
-def save_upload_and_hash(pdf_bytes: bytes, uploads_dir: str, docid: str, filename: str) -> Tuple[str, str]:
+def sha256_file(path: str, block_size: int = 1 << 20) -> str:
+    """sha256 einer Datei, blockweise gelesen."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def save_upload_and_hash(pdf_source: Union[bytes, str], uploads_dir: str, docid: str,
+                         filename: str) -> Tuple[str, str]:
+    """pdf_source = PDF-Bytes oder Dateipfad (dann blockweise kopiert, nie ganz im Speicher)."""
     os.makedirs(uploads_dir, exist_ok=True)
     safe_name = (filename or "upload.pdf").replace("/", "_")
     pdf_path = os.path.join(uploads_dir, f"{docid}_{safe_name}")
-    with open(pdf_path, "wb") as f: f.write(pdf_bytes)
-    h = sha256_hex(pdf_bytes)
+    if isinstance(pdf_source, str):
+        hasher = hashlib.sha256()
+        with open(pdf_source, "rb") as src, open(pdf_path, "wb") as f:
+            for block in iter(lambda: src.read(1 << 20), b""):
+                hasher.update(block)
+                f.write(block)
+        h = hasher.hexdigest()
+    else:
+        with open(pdf_path, "wb") as f: f.write(pdf_source)
+        h = sha256_hex(pdf_source)
     log.info("file_saved", extra={"extra_fields": {"path": pdf_path, "sha256": h}})
     return pdf_path, h
 
@@ -32,3 +53,33 @@ def save_metadata_json(out_dir: str, docid: str, file_basename: str, filehash: s
         }, f, ensure_ascii=False, indent=2)
     log.info("metadata_saved", extra={"extra_fields": {"path": md_path}})
     return md_path
+
+def text_store_path(uploads_dir: str, filehash: str) -> str:
+    return os.path.join(uploads_dir, f"{filehash}.text.json.gz")
+
+def load_text_store(uploads_dir: str, filehash: str) -> Optional[Dict[str, Any]]:
+    """Gespeichertes Dokument {sha256, pages, offsets, chars} oder None."""
+    if not filehash:
+        return None
+    doc = read_document(text_store_path(uploads_dir, filehash))
+    if doc is not None and doc.get("sha256") != filehash:
+        log.warning("text_store_hash_mismatch", extra={"extra_fields": {"filehash": filehash}})
+        return None
+    return doc
+
+def save_text_store(uploads_dir: str, doc: Dict[str, Any]) -> Optional[str]:
+    """Schreibt das Dokument einmalig je filehash (Inhalt ist durch den Hash bestimmt)."""
+    if not doc.get("sha256"):
+        return None
+    path = text_store_path(uploads_dir, doc["sha256"])
+    if os.path.isfile(path):
+        return path
+    try:
+        write_document(path, doc)
+    except OSError as e:
+        log.warning("text_store_write_failed", extra={"extra_fields": {"path": path, "err": str(e)}})
+        return None
+    log.info("text_store_saved", extra={"extra_fields": {
+        "path": path, "pages": len(doc.get("pages") or []), "chars": doc.get("chars")
+    }})
+    return path
@@ -0,0 +1,93 @@
+# modules/ingest/manifest.py
+# Inhalts-adressierte Chunk-IDs + Chunk-Manifest für inkrementellen Re-Ingest.
+# - IDs: {docid}_c_<sha256(text)[:16]> bzw. {docid}_p_<...>; identische Texte im selben Dokument
+#   erhalten die Endung -2, -3, … (Reihenfolge des Auftretens) -> Batch- und Streaming-Pfad liefern
+#   dieselben IDs, unverändert gebliebene Chunks behalten ihre ID auch bei verschobener Position
+# - Manifest (in der Ingest-Quittung): Embedding-Kontext + je Chunk Inhalts- und Metadaten-Hash
+# - Vergleich mit dem Manifest des vorherigen Ingests: new (einbetten + upsert),
+#   meta (nur Metadaten aktualisieren), same (nichts tun), gone (löschen)
+
+from typing import Any, Dict, Iterable, List, Optional
+import hashlib
+import json
+
+MANIFEST_VERSION = 1
+HASH_LEN = 16
+
+# Felder, deren Änderung eine Neuberechnung aller Vektoren erzwingt
+EMBEDDING_CONTEXT_KEYS = ("alias", "model", "dim", "normalize", "parent_vector_strategy")
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()[:HASH_LEN]
+
+
+def metadata_hash(md: Dict[str, Any]) -> str:
+    raw = json.dumps(md or {}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:HASH_LEN]
+
+
+class ChunkIdAssigner:
+    """Vergibt Inhalts-IDs fortlaufend (auch fensterweise im Streaming-Ingest)."""
+
+    def __init__(self, docid: str, kind: str):
+        self.prefix = f"{docid}_{kind}_"
+        self._seen: Dict[str, int] = {}
+
+    def next_id(self, text: str) -> str:
+        h = content_hash(text)
+        n = self._seen.get(h, 0) + 1
+        self._seen[h] = n
+        return f"{self.prefix}{h}" if n == 1 else f"{self.prefix}{h}-{n}"
+
+
+def assign_ids(docid: str, kind: str, texts: Iterable[str]) -> List[str]:
+    a = ChunkIdAssigner(docid, kind)
+    return [a.next_id(t) for t in texts]
+
+
+def embedding_context(emb_cfg: Dict[str, Any], strategy: str) -> Dict[str, Any]:
+    cfg = emb_cfg or {}
+    return {"alias": cfg.get("alias"), "model": cfg.get("model"), "dim": cfg.get("dim"),
+            "normalize": cfg.get("normalize"), "parent_vector_strategy": strategy}
+
+
+def entries(ids: List[str], docs: List[str], mds: List[Dict[str, Any]]) -> Dict[str, Dict[str, str]]:
+    """{id: {"h": Inhalts-Hash, "m": Metadaten-Hash}}"""
+    return {i: {"h": content_hash(d), "m": metadata_hash(m)} for i, d, m in zip(ids, docs, mds)}
+
+
+def build_manifest(context: Dict[str, Any], collections: Dict[str, str],
+                   children: Dict[str, Dict[str, str]], parents: Dict[str, Dict[str, str]]) -> Dict[str, Any]:
+    return {"version": MANIFEST_VERSION, "embedding": dict(context), "collections": dict(collections),
+            "children": dict(children), "parents": dict(parents)}
+
+
+def is_compatible(old: Optional[Dict[str, Any]], context: Dict[str, Any], collections: Dict[str, str]) -> bool:
+    """Vorhandene Vektoren wiederverwendbar? (gleiches Modell/Strategie, gleiche Collections)"""
+    if not isinstance(old, dict) or old.get("version") != MANIFEST_VERSION:
+        return False
+    emb = old.get("embedding") or {}
+    if any(emb.get(k) != context.get(k) for k in EMBEDDING_CONTEXT_KEYS):
+        return False
+    return (old.get("collections") or {}) == dict(collections)
+
+
+def classify(old_entries: Dict[str, Dict[str, str]], ids: List[str], docs: List[str],
+             mds: List[Dict[str, Any]]) -> List[str]:
+    """Je Chunk: "new" | "meta" | "same" relativ zu old_entries."""
+    out: List[str] = []
+    for i, d, m in zip(ids, docs, mds):
+        prev = old_entries.get(i)
+        if not prev or prev.get("h") != content_hash(d):
+            out.append("new")
+        elif prev.get("m") != metadata_hash(m):
+            out.append("meta")
+        else:
+            out.append("same")
+    return out
+
+
+def vanished(old_entries: Dict[str, Any], keep_ids: Iterable[str]) -> List[str]:
+    keep = set(keep_ids)
+    return [i for i in (old_entries or {}) if i not in keep]
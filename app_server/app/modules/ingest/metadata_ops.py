@@ -69,3 +69,18 @@ def flatten_final_metadata(meta_in: Any) -> Tuple[Dict[str, Any], Dict[str, Any]
             final[k] = v.strip()
 
     return final, confidence, source
+
+def enrich_chunk_metadata(meta: Dict[str, Any], kind: str, final_md: Dict[str, Any],
+                          emb_cfg: Dict[str, Any]) -> Dict[str, Any]:
+    """Chunk-Metadaten sanitisieren + technische (Embedding) und fachliche Felder ergänzen
+    (gemeinsam für Batch-, Streaming- und inkrementellen Ingest)."""
+    m = sanitize_metadata(meta, kind)
+    for key in ("alias", "model", "dim", "normalize"):
+        v = sanitize_value((emb_cfg or {}).get(key))
+        if v is not None:
+            m[f"embedding_{key}"] = v
+    if (emb_cfg or {}).get("normalize") is not None:
+        # Vektor tatsächlich L2-normiert (ältere Chunks tragen embedding_normalize ohne normierte Vektoren)
+        m["embedding_unit_norm"] = bool(emb_cfg["normalize"])
+    m.update(sanitize_metadata(final_md, f"{kind}_final"))
+    return m
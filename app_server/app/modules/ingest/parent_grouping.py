@@ -16,11 +16,32 @@ import re
 from modules.logging_setup import get_logger
 from modules.chunking import chunk_text
 from modules.parent_chunking import make_parents_from_children
+from modules.ingest.manifest import assign_ids
 
 log = get_logger("ingest.chunk_ops")
 
 _ID_IDX_RE = re.compile(r"_c_(\d{4})$")
 
+def parent_metadata(docid: str, final_md: Dict[str, Any], source_file: str, parent: Dict[str, Any]) -> Dict[str, Any]:
+    """Parent-Metadaten (gemeinsam für Batch- und Streaming-Ingest)."""
+    return {
+        "level": "parent",
+        "docid": docid,
+        "parent_index": parent["parent_index"],
+        "child_indices_str": json.dumps(parent["child_indices"], ensure_ascii=False),
+        "children_count": len(parent["child_indices"]),
+        "student_name": final_md.get("student_name", ""),
+        "thesis_title": final_md.get("thesis_title", ""),
+        "work_type": final_md.get("work_type", ""),
+        "matriculation_number": final_md.get("matriculation_number", ""),
+        "study_program": final_md.get("study_program", ""),
+        "examiner_first": final_md.get("examiner_first", ""),
+        "examiner_second": final_md.get("examiner_second", ""),
+        "submission_date": final_md.get("submission_date", ""),
+        "source_file": source_file,
+    }
+
+
 def build_parents(
     children_docs: List[str],
     children_mds: List[Dict[str, Any]],
@@ -46,27 +67,8 @@ def build_parents(
     ) or make_parents_from_children(kept, group_size=0, group_overlap=0)
 
     documents = [p["text"] for p in parents]
-    ids = [f"{docid}_p_{p['parent_index']:04d}" for p in parents]
-    metadatas = []
-    for p in parents:
-        metadatas.append(
-            {
-                "level": "parent",
-                "docid": docid,
-                "parent_index": p["parent_index"],
-                "child_indices_str": json.dumps(p["child_indices"], ensure_ascii=False),
-                "children_count": len(p["child_indices"]),
-                "student_name": final_md.get("student_name", ""),
-                "thesis_title": final_md.get("thesis_title", ""),
-                "work_type": final_md.get("work_type", ""),
-                "matriculation_number": final_md.get("matriculation_number", ""),
-                "study_program": final_md.get("study_program", ""),
-                "examiner_first": final_md.get("examiner_first", ""),
-                "examiner_second": final_md.get("examiner_second", ""),
-                "submission_date": final_md.get("submission_date", ""),
-                "source_file": source_file,
-            }
-        )
+    ids = assign_ids(docid, "p", documents)  # Inhalts-IDs (modules/ingest/manifest.py)
+    metadatas = [parent_metadata(docid, final_md, source_file, p) for p in parents]
     log.info(
         "parents_built",
         extra={
@@ -1,16 +1,109 @@
 # modules/ingest/pdf_ops.py
-from typing import Optional
+# PDF -> Seitentexte (pypdf)
+# - extract_page_texts: alle Seiten; für einen Dateipfad ab min_pages Seiten und workers > 1 parallel im
+#   Prozess-Pool (Seitenbereiche je Worker, Reihenfolge/Seitengrenzen bleiben erhalten). Worker erhalten nur
+#   den Pfad und öffnen die Datei selbst; PDF-Bytes werden seriell extrahiert (kein Kopieren je Bereich per IPC)
+# - iter_page_texts: seitenweise (Streaming-Ingest, immer ein Prozess)
+# Konfiguration (app_config.json): "pdf_extract": {"workers": 0, "min_pages": 40}
+#   workers: 0 = automatisch (CPU-Kerne - 1, max. 8), 1 = immer seriell; nie mehr als CPU-Kerne
+
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from io import BytesIO
+import multiprocessing
+import os
+import time
 from pypdf import PdfReader
 from modules.logging_setup import get_logger
 
 log = get_logger("ingest.pdf_ops")
 
-def read_all_text(pdf_bytes: bytes) -> str:
-    r = PdfReader(BytesIO(pdf_bytes))
-    pages = []
+_PARALLEL_DEFAULTS: Dict[str, Any] = {"workers": 0, "min_pages": 40}
+_RANGES_PER_WORKER = 4  # kleinere Bereiche gleichen Seiten mit vielen Abbildungen aus
+
+
+def parallel_settings(app_cfg: Optional[Dict[str, Any]]) -> Dict[str, int]:
+    """{"workers", "min_pages"} aus app_config.pdf_extract (workers=0 -> automatisch)."""
+    s = {**_PARALLEL_DEFAULTS, **((app_cfg or {}).get("pdf_extract") or {})}
+    cpus = os.cpu_count() or 1
+    workers = int(s["workers"]) or min(8, cpus - 1)
+    return {"workers": max(1, min(workers, cpus)), "min_pages": max(1, int(s["min_pages"]))}
+
+
+def _reader(source: Union[bytes, str]) -> PdfReader:
+    return PdfReader(BytesIO(source) if isinstance(source, (bytes, bytearray)) else source)
+
+
+def _page_text(page, lenient: bool) -> str:
+    if not lenient:
+        return page.extract_text() or ""
+    try:
+        return page.extract_text() or ""
+    except Exception:
+        return ""
+
+
+def _extract_range(pdf_path: str, start: int, end: int, lenient: bool = False) -> List[str]:
+    """Läuft im Worker-Prozess: Seitentexte [start, end) mit eigenem PdfReader auf der Datei."""
+    r = _reader(pdf_path)
+    return [_page_text(r.pages[k], lenient) for k in range(start, end)]
+
+
+def _page_ranges(n_pages: int, parts: int) -> List[Tuple[int, int]]:
+    step = max(1, -(-n_pages // parts))
+    return [(a, min(n_pages, a + step)) for a in range(0, n_pages, step)]
+
+
+def _extract_parallel(pdf_path: str, n_pages: int, workers: int,
+                      lenient: bool) -> Optional[List[str]]:
+    """Seitenbereiche im Prozess-Pool; None bei Pool-Fehlern (Aufrufer extrahiert dann seriell)."""
+    ranges = _page_ranges(n_pages, workers * _RANGES_PER_WORKER)
+    ctx = multiprocessing.get_context("spawn")  # kein fork neben laufenden Threads (Streamlit, Embedding)
+    try:
+        with ProcessPoolExecutor(max_workers=min(workers, len(ranges)), mp_context=ctx) as pool:
+            futs = [pool.submit(_extract_range, pdf_path, a, b, lenient) for a, b in ranges]
+            return [t for f in futs for t in f.result()]
+    except (BrokenProcessPool, OSError) as e:
+        log.warning("pdf_parallel_extract_failed", extra={"extra_fields": {
+            "pages": n_pages, "workers": workers, "err": str(e)
+        }})
+        return None
+
+
+def extract_page_texts(source: Union[bytes, str], workers: int = 1, min_pages: int = 40,
+                       lenient: bool = False) -> List[str]:
+    """Alle Seitentexte (Reihenfolge wie im PDF); source = PDF-Bytes oder Dateipfad.
+    Dateipfad, workers > 1 und mindestens min_pages Seiten -> parallel je Seitenbereich.
+    lenient=True: Seiten, deren Extraktion fehlschlägt, liefern "" statt einer Exception."""
+    t0 = time.monotonic()
+    r = _reader(source)
+    n_pages = len(r.pages)
+    pages: Optional[List[str]] = None
+    parallel = isinstance(source, str) and workers > 1 and n_pages >= max(2, min_pages)
+    if parallel:
+        pages = _extract_parallel(source, n_pages, workers, lenient)
+    if pages is None:
+        parallel = False
+        pages = [_page_text(p, lenient) for p in r.pages]
+    log.info("pdf_text_extracted", extra={"extra_fields": {
+        "chars": sum(len(t) for t in pages), "pages": len(pages),
+        "workers": workers if parallel else 1, "seconds": round(time.monotonic() - t0, 3),
+    }})
+    return pages
+
+def read_all_text(pdf_bytes: bytes, workers: int = 1, min_pages: int = 40) -> str:
+    return "\n".join(extract_page_texts(pdf_bytes, workers=workers, min_pages=min_pages))
+
+def iter_page_texts(source: Union[bytes, str]) -> Iterator[str]:
+    """Seitentexte einzeln (Generator); source = PDF-Bytes oder Dateipfad.
+    Bei einem Pfad liest pypdf die Seiten bei Bedarf aus der Datei."""
+    r = _reader(source)
+    n = 0
+    chars = 0
     for p in r.pages:
-        pages.append(p.extract_text() or "")
-    txt = "\n".join(pages)
-    log.info("pdf_text_extracted", extra={"extra_fields": {"chars": len(txt), "pages": len(pages)}})
-    return txt
+        txt = p.extract_text() or ""
+        n += 1
+        chars += len(txt)
+        yield txt
+    log.info("pdf_text_streamed", extra={"extra_fields": {"chars": chars, "pages": n}})
@@ -0,0 +1,150 @@
+# app/modules/ingest/pipeline.py
+# Stufen-Pipeline mit begrenzten Queues (ein Thread je Stufe).
+# - Quelle (Iterator) und Stufen laufen überlappend: z.B. Extraktion von Fenster N+1,
+#   Embedding von Fenster N und Upsert von Fenster N-1 gleichzeitig
+# - Begrenzte Queues (queue_size) -> Backpressure: eine langsame Stufe bremst die vorderen,
+#   der Speicherbedarf bleibt bei ~ (Stufen + Queues) × Fenster
+# - Erster Fehler einer Stufe stoppt alle Stufen und wird im aufrufenden Thread erneut geworfen
+# - Reihenfolge bleibt erhalten (eine Instanz je Stufe)
+# - parallel=False: gleiche Stufen sequenziell im aufrufenden Thread (Debugging/Fallback)
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import queue
+import threading
+import time
+
+from app.modules.logging_setup import get_logger
+
+log = get_logger("ingest.pipeline")
+
+Stage = Tuple[str, Callable[[Any], Any]]
+
+_END = object()
+
+
+class StagePipeline:
+    def __init__(self, name: str, stages: List[Stage], queue_size: int = 2, parallel: bool = True):
+        self.name = name
+        self.stages = list(stages)
+        self.queue_size = max(1, int(queue_size))
+        self.parallel = bool(parallel)
+        self._stop = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._err_lock = threading.Lock()
+        self.busy: Dict[str, float] = {}
+        self.items: Dict[str, int] = {}
+
+    # --------- intern ---------
+    def _fail(self, stage: str, e: BaseException) -> None:
+        with self._err_lock:
+            if self._error is None:
+                self._error = e
+                log.error("pipeline_stage_failed", extra={"extra_fields": {
+                    "pipeline": self.name, "stage": stage, "error": str(e)[:300]
+                }})
+        self._stop.set()
+
+    def _put(self, q: "queue.Queue", item: Any) -> bool:
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q: "queue.Queue") -> Any:
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _END
+
+    def _timed(self, stage: str, fn: Callable[[Any], Any], item: Any) -> Any:
+        t0 = time.monotonic()
+        try:
+            return fn(item)
+        finally:
+            self.busy[stage] = self.busy.get(stage, 0.0) + (time.monotonic() - t0)
+            self.items[stage] = self.items.get(stage, 0) + 1
+
+    def _source_worker(self, source: Iterable[Any], out_q: "queue.Queue") -> None:
+        it = iter(source)
+        try:
+            while not self._stop.is_set():
+                t0 = time.monotonic()
+                try:
+                    item = next(it)
+                except StopIteration:
+                    break
+                finally:
+                    self.busy["source"] = self.busy.get("source", 0.0) + (time.monotonic() - t0)
+                self.items["source"] = self.items.get("source", 0) + 1
+                if not self._put(out_q, item):
+                    return
+        except BaseException as e:
+            self._fail("source", e)
+            return
+        self._put(out_q, _END)
+
+    def _stage_worker(self, stage: Stage, in_q: "queue.Queue", out_q: Optional["queue.Queue"],
+                      results: List[Any]) -> None:
+        name, fn = stage
+        try:
+            while True:
+                item = self._get(in_q)
+                if item is _END:
+                    break
+                res = self._timed(name, fn, item)
+                if out_q is None:
+                    results.append(res)
+                elif res is not None and not self._put(out_q, res):
+                    return
+        except BaseException as e:
+            self._fail(name, e)
+            return
+        if out_q is not None:
+            self._put(out_q, _END)
+
+    # --------- API ---------
+    def run(self, source: Iterable[Any]) -> List[Any]:
+        """Schiebt alle Elemente der Quelle durch die Stufen; liefert die Ergebnisse der letzten Stufe
+        (in Quellreihenfolge, None-Ergebnisse mittlerer Stufen werden verworfen)."""
+        t0 = time.monotonic()
+        results: List[Any] = []
+        if not self.parallel or not self.stages:
+            for item in source:
+                for name, fn in self.stages:
+                    item = self._timed(name, fn, item)
+                    if item is None:
+                        break
+                else:
+                    results.append(item)
+            self._log(t0)
+            return results
+
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        threads = [threading.Thread(target=self._source_worker, args=(source, queues[0]),
+                                    name=f"{self.name}-source", daemon=True)]
+        for k, st in enumerate(self.stages):
+            out_q = queues[k + 1] if k + 1 < len(queues) else None
+            threads.append(threading.Thread(target=self._stage_worker, args=(st, queues[k], out_q, results),
+                                            name=f"{self.name}-{st[0]}", daemon=True))
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        if self._error is not None:
+            raise self._error
+        self._log(t0)
+        return results
+
+    def _log(self, t0: float) -> None:
+        wall = time.monotonic() - t0
+        log.info("pipeline_done", extra={"extra_fields": {
+            "pipeline": self.name, "parallel": self.parallel, "wall_s": round(wall, 3),
+            "busy_s": {k: round(v, 3) for k, v in self.busy.items()}, "items": dict(self.items),
+            # > 1.0 = Stufen haben sich überlappt
+            "overlap": round(sum(self.busy.values()) / wall, 2) if wall > 0 else 0.0,
+        }})
@@ -16,6 +16,7 @@ import re
 from modules.logging_setup import get_logger
 from modules.chunking import chunk_text
 from modules.parent_chunking import make_parents_from_children
+from modules.ingest.manifest import assign_ids
 
 log = get_logger("ingest.chunk_ops")
 
@@ -33,6 +34,26 @@ def _infer_chunk_index(chunk_id: str, fallback_idx: int) -> int:
     return fallback_idx
 
 
+def child_metadata(docid: str, final_md: Dict[str, Any], source_file: str, index: int,
+                   chunk_id: str) -> Dict[str, Any]:
+    """Child-Metadaten für Chunk index (gemeinsam für Batch- und Streaming-Ingest)."""
+    return {
+        "level": "child",
+        "docid": docid,
+        "chunk_index": index,
+        "chunk_id": chunk_id,
+        "student_name": final_md.get("student_name", ""),
+        "thesis_title": final_md.get("thesis_title", ""),
+        "work_type": final_md.get("work_type", ""),
+        "matriculation_number": final_md.get("matriculation_number", ""),
+        "study_program": final_md.get("study_program", ""),
+        "examiner_first": final_md.get("examiner_first", ""),
+        "examiner_second": final_md.get("examiner_second", ""),
+        "submission_date": final_md.get("submission_date", ""),
+        "source_file": source_file,
+    }
+
+
 def build_children(
     full_text: str,
     docid: str,
@@ -44,25 +65,9 @@ def build_children(
     """Erzeugt Child-Dokumente, -IDs und -Metadaten aus Volltext."""
     ch = chunk_text(full_text, chunk_size=child_size, overlap=child_overlap)
     documents = [c["text"] for c in ch]
-    ids = [f"{docid}_c_{i:04d}" for i, _ in enumerate(ch)]
-    metadatas = [
-        {
-            "level": "child",
-            "docid": docid,
-            "chunk_index": c.get("index", idx),
-            "chunk_id": f"{docid}_c_{c.get('index', idx):04d}",
-            "student_name": final_md.get("student_name", ""),
-            "thesis_title": final_md.get("thesis_title", ""),
-            "work_type": final_md.get("work_type", ""),
-            "matriculation_number": final_md.get("matriculation_number", ""),
-            "study_program": final_md.get("study_program", ""),
-            "examiner_first": final_md.get("examiner_first", ""),
-            "examiner_second": final_md.get("examiner_second", ""),
-            "submission_date": final_md.get("submission_date", ""),
-            "source_file": source_file,
-        }
-        for idx, c in enumerate(ch)
-    ]
+    ids = assign_ids(docid, "c", documents)  # Inhalts-IDs (modules/ingest/manifest.py)
+    metadatas = [child_metadata(docid, final_md, source_file, c.get("index", idx), ids[idx])
+                 for idx, c in enumerate(ch)]
     log.info(
         "children_built",
         extra={
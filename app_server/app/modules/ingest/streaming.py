@@ -0,0 +1,94 @@
+# app/modules/ingest/streaming.py
+# Inkrementelle Bausteine für den Streaming-Ingest (Speicherbedarf ~ Fenstergröße statt Dokumentgröße).
+# - IncrementalChunker: liefert exakt dieselben Chunks wie chunking.chunk_text auf dem Gesamttext
+# - IncrementalParentGrouper: liefert exakt dieselben Gruppen wie parent_chunking.make_parents_from_children
+# Beide halten nur den noch nicht abgeschlossenen Rest im Speicher.
+
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class IncrementalChunker:
+    """
+    feed(text) / finish() liefern {"text", "index"} wie chunk_text(gesamt, chunk_size, overlap).
+    Ein Chunk [s, s+chunk_size) wird ausgegeben, sobald danach noch Text folgt (dann ist er
+    sicher nicht der letzte); der Rest wird bei finish() ausgegeben.
+    """
+
+    def __init__(self, chunk_size: int = 1000, overlap: int = 200):
+        self.chunk_size = int(chunk_size)
+        self.overlap = int(overlap)
+        self._buf = ""
+        self._index = 0
+
+    def feed(self, text: str) -> Iterator[Dict[str, Any]]:
+        self._buf += text or ""
+        if self.chunk_size <= 0:
+            return  # ein Chunk aus allem -> erst bei finish()
+        cs = self.chunk_size
+        while len(self._buf) > cs:
+            yield {"text": self._buf[:cs], "index": self._index}
+            self._index += 1
+            self._buf = self._buf[cs - self.overlap:] if self.overlap > 0 else self._buf[cs:]
+
+    def finish(self) -> Iterator[Dict[str, Any]]:
+        if self.chunk_size <= 0:
+            yield {"text": self._buf, "index": 0}
+        elif self._buf:
+            yield {"text": self._buf, "index": self._index}
+            self._index += 1
+        self._buf = ""
+
+
+class IncrementalParentGrouper:
+    """
+    add(child) / finish() liefern Parents {"parent_index", "text", "child_indices"} wie
+    make_parents_from_children(alle_children, group_size, group_overlap).
+    Volle Gruppen [s, s+group_size) werden sofort ausgegeben; bei finish() folgt die
+    Restgruppe [s_next, n), falls nach der letzten vollen Gruppe noch Children kamen.
+    """
+
+    def __init__(self, group_size: int = 5, group_overlap: int = 1):
+        self.group_size = int(group_size)
+        self.step = max(1, self.group_size - int(group_overlap))
+        self._window: List[Dict[str, Any]] = []   # Children ab Position self._start
+        self._start = 0          # globale Position des nächsten Gruppenstarts
+        self._n = 0              # Anzahl bisher gesehener Children
+        self._last_end = 0       # Ende der zuletzt ausgegebenen Gruppe
+        self._parent_idx = 0
+
+    @property
+    def pending_indices(self) -> List[int]:
+        """Chunk-Indizes, die noch in künftigen Parents vorkommen können."""
+        return [c["index"] for c in self._window]
+
+    def _emit(self, chunk_slice: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        text = " ".join((c.get("text") or "").strip() for c in chunk_slice if (c.get("text") or "").strip())
+        if not text.strip():
+            return None
+        p = {"parent_index": self._parent_idx, "text": text, "child_indices": [c["index"] for c in chunk_slice]}
+        self._parent_idx += 1
+        return p
+
+    def add(self, child: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        self._window.append(child)
+        self._n += 1
+        if self.group_size <= 0:
+            return  # ein Parent aus allen -> erst bei finish()
+        while len(self._window) >= self.group_size:
+            p = self._emit(self._window[:self.group_size])
+            self._last_end = self._start + self.group_size
+            self._start += self.step
+            self._window = self._window[self.step:]
+            if p:
+                yield p
+
+    def finish(self) -> Iterator[Dict[str, Any]]:
+        if self.group_size <= 0:
+            if self._window:
+                all_text = " ".join((c.get("text") or "").strip() for c in self._window if (c.get("text") or "").strip())
+                yield {"parent_index": 0, "text": all_text, "child_indices": [c["index"] for c in self._window]}
+        elif self._n > self._last_end and self._window:
+            p = self._emit(self._window)
+            if p:
+                yield p
+        self._window = []
@@ -1,28 +1,81 @@
 # modules/ingest/upsert_ops.py
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Tuple, List, Optional
 from modules.logging_setup import get_logger
-from modules.chroma_client import ChromaWrapper
+from app.modules.chroma_client import ChromaWrapper
 
 log = get_logger("ingest.upsert_ops")
 
+def add_upsert_stats(total: Dict[str, Any], res: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Summiert Ergebnisse von ChromaWrapper.upsert (count/batches/retries/seconds) in total."""
+    for k in ("count", "batches", "retries"):
+        total[k] = int(total.get(k) or 0) + int((res or {}).get(k) or 0)
+    total["seconds"] = round(float(total.get("seconds") or 0.0) + float((res or {}).get("seconds") or 0.0), 3)
+    return total
+
+def _drop_empty_vectors(docs, ids, mds, vectors, kind: str, docid: str):
+    """Längen prüfen und Einträge ohne Vektor entfernen (Chroma würde sonst selbst einbetten)."""
+    if not (len(docs) == len(ids) == len(mds) == len(vectors)):
+        raise ValueError(f"{kind}: Längen passen nicht: ids={len(ids)}, docs={len(docs)}, metas={len(mds)}, embeds={len(vectors)}")
+    nd, ni, nm, nv = [], [], [], []
+    for d, i, m, v in zip(docs, ids, mds, vectors):
+        if v and len(v) > 0:
+            nd.append(d); ni.append(i); nm.append(m); nv.append(v)
+    if len(ni) < len(ids):
+        log.warning("empty_embeddings_removed", extra={"extra_fields": {
+            "docid": docid, "kind": kind, "removed": len(ids) - len(ni), "remaining": len(ni)
+        }})
+    return nd, ni, nm, nv
+
 def upsert_parent_child(chroma: ChromaWrapper, work_type: str, docid: str,
                         parents_docs, parents_ids, parents_mds, parents_vectors,
-                        childs_docs, childs_ids, childs_mds) -> Tuple[Dict[str, str], Dict[str, int]]:
+                        childs_docs, childs_ids, childs_mds,
+                        childs_vectors: Optional[List[List[float]]] = None
+                        ) -> Tuple[Dict[str, str], Dict[str, int], Dict[str, Dict[str, Any]]]:
+    """Rückgabe: (collections, counts, upsert_stats) – counts = tatsächlich geschriebene Einträge,
+    upsert_stats je Art {count, batches, retries, seconds, dropped_ids} (für die Quittung);
+    dropped_ids = Einträge ohne Vektor (fehlgeschlagenes Embedding, Pool ohne Child-Vektoren), nicht geschrieben."""
     parents_col = f"{work_type}_parents"
     chunks_col  = f"{work_type}_chunks"
+    stats: Dict[str, Dict[str, Any]] = {"parents": {}, "children": {}}
 
-    chroma.upsert(
+    # Parents: leere Vektoren (failed_parent_ids, gepoolte Parents ohne Child-Vektoren) verwerfen
+    all_parent_ids = list(parents_ids or [])
+    parents_docs, parents_ids, parents_mds, parents_vectors = _drop_empty_vectors(
+        list(parents_docs or []), all_parent_ids, list(parents_mds or []), list(parents_vectors or []), "parents", docid
+    )
+    add_upsert_stats(stats["parents"], chroma.upsert(
         parents_col,
         documents=parents_docs, metadatas=parents_mds,
         ids=parents_ids, embeddings=parents_vectors
-    )
-    log.info("chroma_upsert_parents", extra={"extra_fields":{"docid": docid, "collection": parents_col, "count": len(parents_ids)}})
+    ) if parents_ids else None)
+    kept = set(parents_ids)
+    stats["parents"]["dropped_ids"] = [i for i in all_parent_ids if i not in kept]
+    log.info("chroma_upsert_parents", extra={"extra_fields":{"docid": docid, "collection": parents_col, **stats["parents"]}})
 
-    chroma.upsert(
-        chunks_col,
-        documents=childs_docs, metadatas=childs_mds,
-        ids=childs_ids, embeddings=None
-    )
-    log.info("chroma_upsert_children", extra={"extra_fields":{"docid": docid, "collection": chunks_col, "count": len(childs_ids)}})
+    # Children mit den bereits berechneten Ollama-Vektoren (gleicher Vektorraum wie die Queries).
+    # Ohne Vektoren wird NICHT upserted – sonst würde Chroma mit seinem Default-Modell einbetten.
+    childs_vectors = list(childs_vectors or [])
+    all_child_ids = list(childs_ids or [])
+    if childs_ids and not childs_vectors:
+        log.warning("chroma_upsert_children_skipped", extra={"extra_fields":{
+            "docid": docid, "collection": chunks_col, "reason": "no_child_embeddings", "count": len(childs_ids)
+        }})
+        childs_docs, childs_ids, childs_mds = [], [], []
+    else:
+        childs_docs, childs_ids, childs_mds, childs_vectors = _drop_empty_vectors(
+            list(childs_docs or []), list(childs_ids or []), list(childs_mds or []), childs_vectors, "children", docid
+        )
+    if childs_ids:
+        add_upsert_stats(stats["children"], chroma.upsert(
+            chunks_col,
+            documents=childs_docs, metadatas=childs_mds,
+            ids=childs_ids, embeddings=childs_vectors
+        ))
+    else:
+        add_upsert_stats(stats["children"], None)
+    kept = set(childs_ids)
+    stats["children"]["dropped_ids"] = [i for i in all_child_ids if i not in kept]
+    log.info("chroma_upsert_children", extra={"extra_fields":{"docid": docid, "collection": chunks_col, **stats["children"]}})
 
-    return {"parents": parents_col, "children": chunks_col}, {"parents": len(parents_ids), "children": len(childs_ids)}
+    counts = {"parents": stats["parents"]["count"], "children": stats["children"]["count"]}
+    return {"parents": parents_col, "children": chunks_col}, counts, stats
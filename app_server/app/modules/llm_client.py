@@ -1,82 +1,94 @@
 # app_server/app/modules/llm_client.py
-# Robuster Ollama-Client (Stdlib, keine Fremdpakete) für 0.9.6
+# Robuster Ollama-Client für 0.9.6
+# - HTTP über die prozessweit geteilte Keep-Alive-Session (http_pool), kein Verbindungsaufbau je Call
 # - /api/embed (nicht /api/embeddings)
-# - generate(), chat(), embed()  (embed: Single -> Batch-Fallback)
+# - generate(), chat(), embed()  (embed: über gemeinsamen OllamaEmbedTransport mit Schema-Probe)
+# - generate()/chat(): eigener Circuit Breaker + Retries mit Jitter-Backoff (get_llm_controller, getrennt vom
+#   Embedding-Regler); Read-Timeouts werden nicht wiederholt (lange, nicht idempotente Generierung)
+# - embed() nutzt optional den persistenten Embedding-Cache (from_app_config)
 from typing import Any, Dict, List, Optional
-import json, os, time
-import urllib.request, urllib.error
+import os
+import time
+import requests
+
+from app.modules.http_pool import get_http_session, configure_http_pool, http_timeout
+from app.modules.embedding_cache import EmbeddingCache, get_embedding_cache
+from app.modules.embed_controller import AdaptiveController, get_embed_controller, get_llm_controller
+from app.modules.ollama_embed_transport import OllamaEmbedTransport, extract_single, extract_batch
 
 DEFAULT_BASE = os.getenv("OLLAMA_BASE_URL") or "http://host.docker.internal:11434"
 
 class OllamaHTTPError(RuntimeError):
-    pass
+    def __init__(self, message: str, status: Optional[int] = None, read_timeout: bool = False):
+        super().__init__(message)
+        self.status = status
+        self.read_timeout = read_timeout  # Anfrage angekommen, Antwort blieb aus
 
 def _post_json(url: str, payload: Dict[str, Any], timeout: float = 120.0) -> Dict[str, Any]:
-    data = json.dumps(payload).encode("utf-8")
-    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
     try:
-        with urllib.request.urlopen(req, timeout=timeout) as resp:
-            return json.loads(resp.read().decode("utf-8"))
-    except urllib.error.HTTPError as e:
-        body = ""
-        try: body = e.read().decode("utf-8")
-        except Exception: pass
-        raise OllamaHTTPError(f"HTTP {e.code} {url}: {body}") from e
-    except urllib.error.URLError as e:
+        resp = get_http_session().post(url, json=payload, timeout=http_timeout(timeout))
+    except requests.ReadTimeout as e:
+        raise OllamaHTTPError(f"Read timeout ({timeout} s) from {url}: {e}", read_timeout=True) from e
+    except requests.RequestException as e:
         raise OllamaHTTPError(f"Connection error to {url}: {e}") from e
+    if resp.status_code != 200:
+        raise OllamaHTTPError(f"HTTP {resp.status_code} {url}: {resp.text or ''}", status=resp.status_code)
+    try:
+        return resp.json()
+    except ValueError as e:
+        raise OllamaHTTPError(f"Invalid JSON from {url}: {e}") from e
 
-def _extract_single(res: Dict[str, Any]) -> List[float]:
-    # Erwartet {"embedding":[...]} (kann bei manchen Builds leer sein)
-    emb = res.get("embedding")
-    if isinstance(emb, list):
-        return emb
-    # Fallbacks (selten)
-    embs = res.get("embeddings")
-    if isinstance(embs, list) and embs and isinstance(embs[0], list):
-        return embs[0]
-    data = res.get("data")
-    if isinstance(data, list) and data and isinstance(data[0], dict):
-        e = data[0].get("embedding")
-        if isinstance(e, list):
-            return e
-    return []
-
-def _extract_batch(res: Dict[str, Any]) -> List[List[float]]:
-    # Erwartet {"embeddings":[[...],[...],...]}
-    embs = res.get("embeddings")
-    if isinstance(embs, list) and (not embs or isinstance(embs[0], list)):
-        return embs or []
-    # Fallback-Formate
-    data = res.get("data")
-    if isinstance(data, list) and data and isinstance(data[0], dict):
-        outs: List[List[float]] = []
-        for item in data:
-            e = item.get("embedding")
-            if isinstance(e, list):
-                outs.append(e)
-        return outs
-    # Single in Batch-Antwort?
-    single = _extract_single(res)
-    return [single] if single else []
+# Abwärtskompatibel: Parser liegen jetzt im gemeinsamen Embedding-Transport
+_extract_single = extract_single
+_extract_batch = extract_batch
 
 class OllamaClient:
-    def __init__(self, base_url: Optional[str] = None):
+    def __init__(self, base_url: Optional[str] = None, cache: Optional[EmbeddingCache] = None,
+                 controller: Optional[AdaptiveController] = None,
+                 llm_controller: Optional[AdaptiveController] = None):
         self.base_url = (base_url or DEFAULT_BASE).rstrip("/")
+        self.cache = cache
+        self.controller = controller or get_embed_controller(self.base_url)  # embed()
+        self.llm_controller = llm_controller or get_llm_controller(self.base_url)  # generate()/chat()
         self._gen  = f"{self.base_url}/api/generate"
         self._chat = f"{self.base_url}/api/chat"
-        self._emb  = f"{self.base_url}/api/embed"     # << wichtig: /api/embed
 
     @classmethod
     def from_app_config(cls, app_cfg: Dict[str, Any]) -> "OllamaClient":
         base = ((app_cfg or {}).get("ollama") or {}).get("base_url") or DEFAULT_BASE
-        return cls(base)
+        configure_http_pool(app_cfg)
+        return cls(base, cache=get_embedding_cache(app_cfg), controller=get_embed_controller(base, app_cfg),
+                   llm_controller=get_llm_controller(base, app_cfg))
+
+    def _post(self, url: str, payload: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        """_post_json mit Breaker-Prüfung (LLM-Regler) und Retries (Jitter-Backoff) nur für Verbindungs-/
+        Serverfehler; ein Read-Timeout wird nicht wiederholt (die Generierung lief bereits bis zum Timeout)."""
+        ctl = self.llm_controller
+        retries = ctl.retries if ctl.enabled else 0
+        for attempt in range(retries + 1):
+            ctl.before_request()
+            t0 = time.monotonic()
+            try:
+                res = _post_json(url, payload, timeout=timeout)
+            except OllamaHTTPError as e:
+                if e.status is not None and 400 <= e.status < 500:
+                    ctl.record(True, time.monotonic() - t0, tune=False)  # Host gesund, Anfrage fehlerhaft
+                    raise
+                ctl.record(False, time.monotonic() - t0, tune=False)
+                if attempt >= retries or e.read_timeout:
+                    raise
+                time.sleep(ctl.backoff(attempt))
+                continue
+            ctl.record(True, time.monotonic() - t0, tune=False)
+            return res
+        raise OllamaHTTPError(f"request failed: {url}")
 
     def generate(self, model: str, prompt: str,
                  options: Optional[Dict[str, Any]] = None,
                  timeout: float = 120.0) -> Dict[str, Any]:
         payload = {"model": model, "prompt": prompt, "stream": False}
         if options: payload["options"] = options
-        res = _post_json(self._gen, payload, timeout=timeout)
+        res = self._post(self._gen, payload, timeout=timeout)
         return {"ok": True, "model": model, "response": res.get("response", ""), "raw": res}
 
     def chat(self, model: str, messages: List[Dict[str, str]],
@@ -84,37 +96,35 @@ class OllamaClient:
              timeout: float = 120.0) -> Dict[str, Any]:
         payload = {"model": model, "messages": messages, "stream": False}
         if options: payload["options"] = options
-        res = _post_json(self._chat, payload, timeout=timeout)
+        res = self._post(self._chat, payload, timeout=timeout)
         msg = res.get("message") or {}
         return {"ok": True, "model": model, "response": (msg.get("content") or ""), "raw": res}
 
     def embed(self, texts: List[str], model: str, timeout: float = 120.0) -> List[List[float]]:
-        """Single-Calls; wenn leere Vektoren -> kurzer Warmup -> Batch-Fallback."""
+        """Wie _embed_uncached; mit Cache werden nur Misses angefragt (Rohvektoren)."""
         if not texts:
             return []
-        # 1) Single
-        out: List[List[float]] = []
-        try:
-            for t in texts:
-                res = _post_json(self._emb, {"model": model, "input": t}, timeout=timeout)
-                v = _extract_single(res)
-                if not v:  # Beobachtung: einige Builds liefern leeres embedding im Single-Pfad
-                    out = []
-                    break
-                out.append(v)
-            if out:
-                return out
-        except OllamaHTTPError:
-            out = []  # weiter mit Batch
+        if self.cache is None:
+            return self._embed_uncached(texts, model, timeout)
+        cached = self.cache.get_many(model, texts)
+        misses = list(dict.fromkeys(t for t, v in zip(texts, cached) if v is None))
+        fresh: Dict[str, List[float]] = {}
+        if misses:
+            vecs = self._embed_uncached(misses, model, timeout)
+            fresh = {t: v for t, v in zip(misses, vecs)}
+            self.cache.put_many(model, misses, vecs)
+        return [v if v is not None else fresh.get(t, []) for t, v in zip(texts, cached)]
 
-        # 2) kurze Pause (Warmup)
-        time.sleep(0.2)
-
-        # 3) Batch-Fallback
-        res = _post_json(self._emb, {"model": model, "input": texts}, timeout=timeout)
-        vecs = _extract_batch(res)
-        if not vecs or (vecs and not vecs[0]):
-            raise OllamaHTTPError(f"Empty embeddings for model={model}; keys={list(res.keys())}")
+    def _embed_uncached(self, texts: List[str], model: str, timeout: float = 120.0) -> List[List[float]]:
+        """Ein Pfad laut Capability-Probe (Batch, falls das Modell/der Build es kann)."""
+        if not texts:
+            return []
+        transport = OllamaEmbedTransport(self.base_url, timeout=timeout, controller=self.controller)
+        vecs = transport.embed(model, list(texts), timeout=timeout)
+        if not vecs or any(not v for v in vecs):
+            raise OllamaHTTPError(
+                f"Empty embeddings for model={model}; empty={sum(1 for v in vecs if not v)}/{len(texts)}"
+            )
         return vecs
 
     # Abwärtskompatibel
@@ -1,7 +1,7 @@
 # modules/metadata_extraction/__init__.py
 # Fassade des Pakets
 
-from .pdf_io import extract_first_page_text, extract_all_text
+from .pdf_io import extract_first_page_text, extract_all_text, first_page_text
 from .core import extract_by_regex
 from .llm_fallback import llm_fill_missing
 from .finalize import finalize_with_overrides
@@ -9,6 +9,7 @@ from .finalize import finalize_with_overrides
 __all__ = [
     "extract_first_page_text",
     "extract_all_text",
+    "first_page_text",
     "extract_by_regex",
     "llm_fill_missing",
     "finalize_with_overrides",
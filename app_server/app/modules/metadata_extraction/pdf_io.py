@@ -1,10 +1,11 @@
 # modules/metadata_extraction/pdf_io.py
-# ÄNDERUNG: PDF lesen (Seite 1 / Volltext)
+# ÄNDERUNG: PDF lesen (Seite 1 / Volltext; Volltext über modules/ingest/pdf_ops, optional parallel)
 
 from __future__ import annotations
 from io import BytesIO
-from typing import Tuple
+from typing import List, Tuple
 from pypdf import PdfReader
+from app.modules.ingest.pdf_ops import extract_page_texts
 from .utils import normalize_spaces
 
 def extract_first_page_text(pdf_bytes: bytes) -> str:
@@ -14,13 +15,11 @@ def extract_first_page_text(pdf_bytes: bytes) -> str:
     text = reader.pages[0].extract_text() or ""
     return normalize_spaces(text)
 
-def extract_all_text(pdf_bytes: bytes) -> Tuple[str, int]:
-    reader = PdfReader(BytesIO(pdf_bytes))
-    texts = []
-    for p in reader.pages:
-        try:
-            t = p.extract_text() or ""
-        except Exception:
-            t = ""
-        texts.append(normalize_spaces(t))
-    return "\n".join(texts), len(reader.pages)
+def first_page_text(pages: List[str]) -> str:
+    """Wie extract_first_page_text, aber aus bereits extrahierten Seitentexten (pdf_text_cache)."""
+    return normalize_spaces(pages[0] or "") if pages else ""
+
+def extract_all_text(pdf_bytes: bytes, workers: int = 1, min_pages: int = 40) -> Tuple[str, int]:
+    """Volltext (Seiten normalisiert) + Seitenzahl; workers > 1 -> parallel ab min_pages Seiten."""
+    texts = extract_page_texts(pdf_bytes, workers=workers, min_pages=min_pages, lenient=True)
+    return "\n".join(normalize_spaces(t) for t in texts), len(texts)
@@ -44,6 +44,25 @@ class ModelRegistry:
             "parent_group_overlap": 1,
             "max_chars_per_embedding": 2000,
             "embedding_agg": "mean",
+            # Eingaben pro /api/embed-Request (1 = Einzel-Requests wie bisher)
+            "embedding_batch_size": 16,
+            # parallele Embedding-Requests (an OLLAMA_NUM_PARALLEL anpassen)
+            "embedding_max_in_flight": 4,
+            # Parent-Vektoren: "embed" (eigener Request) | "pool_mean" | "pool_weighted" (aus Child-Vektoren)
+            "parent_vector_strategy": "embed",
+            # Einzel-Retries fehlgeschlagener Embeddings (gleiches Modell, exponentieller Backoff)
+            "embedding_retry_attempts": 2,
+            "embedding_retry_backoff_seconds": 0.5,
+            # Alias-Wechsel (ganzes Dokument) erst ab dieser Fehlerquote nach den Retries
+            "embedding_alias_switch_ratio": 0.2,
+            # "batch" (alles im Speicher) | "streaming" (Seiten-Generator, fensterweise Embedding/Upsert)
+            "ingest_mode": "batch",
+            # Wiederverwendung eines vorhandenen Ingests derselben PDF/Konfiguration (opt-in)
+            "ingest_dedup": False,
+            "stream_window_children": 128,
+            # Streaming-Stufen (Extraktion, Embedding, Upsert) überlappend mit begrenzten Queues
+            "stream_pipelined": True,
+            "stream_queue_size": 2,
             # Diese Aliasse müssen in embeddings[] existieren:
             "embedding_alias_default": "nomic",
             "embedding_alias_fallbacks": ["mxbai-large", "jina-de"],
@@ -65,6 +84,17 @@ class ModelRegistry:
     def default_embedding_alias(self) -> Optional[str]:
         return self.retrieval().get("embedding_alias_default")
 
+    # --------------------------- Index-Profile (Chroma/HNSW) ---------------------------
+
+    def index(self) -> Dict[str, Any]:
+        """model_config.json "index": {"profiles": {Name: {space, M, construction_ef, search_ef, ...}},
+        "collections": {fnmatch-Muster: Profilname}} – Auflösung in chroma_client.resolve_profile."""
+        idx = self._cfg.get("index") or {}
+        if not isinstance(idx, dict):
+            log.warning("index_non_dict", extra={"extra_fields": {"type": str(type(idx))}})
+            idx = {}
+        return idx
+
     # --------------------------- Helpers -----------------------------
 
     @staticmethod
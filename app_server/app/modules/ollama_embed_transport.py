@@ -0,0 +1,245 @@
+# app/modules/ollama_embed_transport.py
+# Gemeinsamer Embedding-Transport zu Ollama (genutzt von EmbeddingsFactory und OllamaClient).
+# - Capability-Probe einmal je (base_url, model): welcher Endpoint, welcher Payload-Key,
+#   welches Antwortschema, Batch-fähig?
+# - Ergebnis wird für die Prozesslaufzeit gecacht; danach nur noch dieser eine Pfad
+#   (keine Doppel-Requests, kein Warmup-Sleep mehr). Fehlgeschlagene Probe wird _PROBE_RETRY_S gemerkt
+#   (kein erneutes Proben vor jedem Embed-Aufruf, solange Ollama gestört ist).
+# - Fehlschläge liefern [] je Eintrag (Reihenfolge bleibt erhalten).
+# - HTTP über die geteilte Keep-Alive-Session aus http_pool (Connection-Pool, (connect, read)-Timeout).
+# - Adaptiver Regler je Host (embed_controller): adaptiver Timeout, Retries mit Jitter-Backoff,
+#   Circuit Breaker (CircuitOpenError wird NICHT in [] umgewandelt, damit Ingest schnell abbricht).
+
+from typing import Any, Dict, List, Optional, Tuple
+import threading
+import time
+import requests
+
+from app.modules.logging_setup import get_logger
+from app.modules.http_pool import get_http_session, http_timeout
+from app.modules.embed_controller import AdaptiveController, CircuitOpenError, get_embed_controller
+
+log = get_logger("ollama_embed_transport")
+
+# Reihenfolge = Präferenz: /api/embed (Batch) vor Legacy /api/embeddings
+_CANDIDATES: List[Dict[str, Any]] = [
+    {"endpoint": "/api/embed", "key": "input", "batch": True},
+    {"endpoint": "/api/embeddings", "key": "prompt", "batch": False},
+    {"endpoint": "/api/embeddings", "key": "input", "batch": False},
+]
+
+_PROBE_TEXTS = ["probe", "probe two"]
+
+_SCHEMAS: Dict[Tuple[str, str], Dict[str, Any]] = {}
+_PROBE_FAILED: Dict[Tuple[str, str], float] = {}  # (base_url, model) -> monotonic() bis zum nächsten Versuch
+_PROBE_RETRY_S = 15.0
+_SCHEMAS_LOCK = threading.Lock()
+_PROBE_LOCKS: Dict[Tuple[str, str], threading.Lock] = {}
+
+
+class EmbedHTTPError(RuntimeError):
+    def __init__(self, message: str, status: int):
+        super().__init__(message)
+        self.status = status
+
+    @property
+    def client_error(self) -> bool:
+        """4xx: Anfrage fehlerhaft (z.B. Modell fehlt) – Host ist gesund, Retry sinnlos."""
+        return 400 <= self.status < 500
+
+
+def extract_single(res: Dict[str, Any]) -> List[float]:
+    """{"embedding":[...]} | {"embeddings":[[...]]} | {"data":[{"embedding":[...]}]}"""
+    emb = res.get("embedding")
+    if isinstance(emb, list):
+        return emb
+    embs = res.get("embeddings")
+    if isinstance(embs, list) and embs and isinstance(embs[0], list):
+        return embs[0]
+    data = res.get("data")
+    if isinstance(data, list) and data and isinstance(data[0], dict):
+        e = data[0].get("embedding")
+        if isinstance(e, list):
+            return e
+    return []
+
+
+def extract_batch(res: Dict[str, Any]) -> List[List[float]]:
+    """{"embeddings":[[...],...]} | {"data":[{"embedding":[...]},...]} | Single in Batch-Antwort."""
+    embs = res.get("embeddings")
+    if isinstance(embs, list) and (not embs or isinstance(embs[0], list)):
+        return embs or []
+    data = res.get("data")
+    if isinstance(data, list) and data and isinstance(data[0], dict):
+        outs: List[List[float]] = []
+        for item in data:
+            e = item.get("embedding")
+            if isinstance(e, list):
+                outs.append(e)
+        return outs
+    single = extract_single(res)
+    return [single] if single else []
+
+
+def cached_schema(base_url: str, model: str) -> Optional[Dict[str, Any]]:
+    with _SCHEMAS_LOCK:
+        return _SCHEMAS.get((base_url.rstrip("/"), model))
+
+
+def forget_schema(base_url: Optional[str] = None, model: Optional[str] = None) -> None:
+    """Cache-Invalidierung (z.B. nach Ollama-Upgrade); ohne Argumente alles."""
+    with _SCHEMAS_LOCK:
+        for k in list(_SCHEMAS.keys()):
+            if (base_url is None or k[0] == base_url.rstrip("/")) and (model is None or k[1] == model):
+                _SCHEMAS.pop(k, None)
+        for k in list(_PROBE_FAILED.keys()):
+            if (base_url is None or k[0] == base_url.rstrip("/")) and (model is None or k[1] == model):
+                _PROBE_FAILED.pop(k, None)
+
+
+class OllamaEmbedTransport:
+    def __init__(self, base_url: str, timeout: float = 120.0, session: Optional[requests.Session] = None,
+                 controller: Optional[AdaptiveController] = None):
+        self.base_url = (base_url or "").rstrip("/")
+        self.timeout = float(timeout)
+        self.session = session or get_http_session()
+        self.controller = controller or get_embed_controller(self.base_url)
+
+    # --------- HTTP ---------
+    def _post(self, endpoint: str, payload: Dict[str, Any], timeout: Optional[float]) -> Dict[str, Any]:
+        r = self.session.post(f"{self.base_url}{endpoint}", json=payload,
+                              timeout=http_timeout(timeout or self.timeout))
+        if r.status_code != 200:
+            raise EmbedHTTPError(f"HTTP {r.status_code} {endpoint}: {(r.text or '')[:200]}", r.status_code)
+        return r.json()
+
+    def _call(self, schema: Dict[str, Any], model: str, inputs: List[str],
+              timeout: Optional[float]) -> List[List[float]]:
+        """Ein Request im Schema; Batch-Schema nimmt Listen, sonst genau ein Eintrag."""
+        if schema["batch"]:
+            res = self._post(schema["endpoint"], {"model": model, schema["key"]: inputs}, timeout)
+            return extract_batch(res)
+        res = self._post(schema["endpoint"], {"model": model, schema["key"]: inputs[0]}, timeout)
+        v = extract_single(res)
+        return [v] if v else []
+
+    def _request(self, schema: Dict[str, Any], model: str, inputs: List[str],
+                 timeout: Optional[float], retries: Optional[int] = None) -> List[List[float]]:
+        """_call unter Regler-Aufsicht: Breaker-Prüfung, adaptiver Timeout, Messung,
+        Wiederholung mit Jitter-Backoff. Letzter Fehler wird weitergereicht."""
+        ctl = self.controller
+        n_retry = ctl.retries if (retries is None and ctl.enabled) else int(retries or 0)
+        last: Optional[Exception] = None
+        for attempt in range(n_retry + 1):
+            ctl.before_request()
+            t_eff = ctl.timeout_for(len(inputs), timeout or self.timeout)
+            t0 = time.monotonic()
+            try:
+                vecs = self._call(schema, model, inputs, t_eff)
+            except Exception as e:
+                if isinstance(e, EmbedHTTPError) and e.client_error:
+                    ctl.record(True, time.monotonic() - t0, 0)  # Host antwortet -> kein Breaker-Fehler
+                    raise
+                ctl.record(False, time.monotonic() - t0, len(inputs))
+                last = e
+                if attempt < n_retry:
+                    delay = ctl.backoff(attempt)
+                    log.warning("ollama_embed_retry", extra={"extra_fields": {
+                        "model": model, "attempt": attempt + 1, "size": len(inputs),
+                        "delay_s": round(delay, 3), "timeout_s": round(t_eff, 1), "error": str(e)[:200],
+                    }})
+                    time.sleep(delay)
+                continue
+            ctl.record(True, time.monotonic() - t0, len(inputs))
+            return vecs
+        raise last if last else RuntimeError("embed request failed")
+
+    # --------- Probe ---------
+    def schema(self, model: str) -> Optional[Dict[str, Any]]:
+        """Arbeitsschema für model (einmalig geprobt, danach aus dem Prozess-Cache)."""
+        key = (self.base_url, model)
+        with _SCHEMAS_LOCK:
+            hit = _SCHEMAS.get(key)
+            if hit:
+                return hit
+            if _PROBE_FAILED.get(key, 0.0) > time.monotonic():
+                return None  # Probe kürzlich fehlgeschlagen -> nicht erneut belasten
+            plock = _PROBE_LOCKS.setdefault(key, threading.Lock())
+        with plock:  # parallele Erst-Aufrufe proben nur einmal
+            with _SCHEMAS_LOCK:
+                hit = _SCHEMAS.get(key)
+                failed = _PROBE_FAILED.get(key, 0.0) > time.monotonic()
+            if hit or failed:
+                return hit
+            self.controller.before_request()
+            errors: List[str] = []
+            host_down = True
+            for cand in _CANDIDATES:
+                probe = _PROBE_TEXTS if cand["batch"] else _PROBE_TEXTS[:1]
+                try:
+                    vecs = self._call(cand, model, probe, None)
+                except Exception as e:
+                    host_down = host_down and not isinstance(e, EmbedHTTPError)
+                    errors.append(f"{cand['endpoint']}:{cand['key']}: {e}")
+                    continue
+                host_down = False
+                if len(vecs) == len(probe) and all(vecs):
+                    found = dict(cand, dim=len(vecs[0]))
+                    self.controller.record(True, 0.0, 0)
+                    with _SCHEMAS_LOCK:
+                        _SCHEMAS[key] = found
+                        _PROBE_FAILED.pop(key, None)
+                    log.info("ollama_embed_schema_probed", extra={"extra_fields": {
+                        "base_url": self.base_url, "model": model, **found
+                    }})
+                    return found
+                errors.append(f"{cand['endpoint']}:{cand['key']}: empty/mismatch")
+            self.controller.record(not host_down, 0.0, 0)  # nur Verbindungsfehler zählen für den Breaker
+            with _SCHEMAS_LOCK:
+                _PROBE_FAILED[key] = time.monotonic() + _PROBE_RETRY_S
+            log.error("ollama_embed_schema_probe_failed", extra={"extra_fields": {
+                "base_url": self.base_url, "model": model, "errors": errors[:3], "retry_in_s": _PROBE_RETRY_S
+            }})
+            return None
+
+    # --------- API ---------
+    def embed(self, model: str, inputs: List[str], timeout: Optional[float] = None) -> List[List[float]]:
+        """Bettet inputs ein (Batch-Schema: ein Request; sonst ein Request je Eintrag).
+        Liefert genau len(inputs) Einträge, [] für Fehlschläge; CircuitOpenError bei offenem Breaker."""
+        if not inputs:
+            return []
+        schema = self.schema(model)
+        if schema is None:
+            return [[] for _ in inputs]
+        if schema["batch"]:
+            try:
+                vecs = self._request(schema, model, inputs, timeout)
+                if len(vecs) == len(inputs):
+                    return [v if isinstance(v, list) else [] for v in vecs]
+                log.warning("ollama_batch_count_mismatch", extra={"extra_fields": {
+                    "model": model, "expected": len(inputs), "got": len(vecs)
+                }})
+            except CircuitOpenError:
+                raise
+            except Exception as e:
+                log.error("ollama_embed_exception", extra={"extra_fields": {
+                    "error": str(e), "model": model, "phase": "batch", "size": len(inputs)
+                }})
+            if len(inputs) == 1:
+                return [[]]
+        # Einzelpfad (Nicht-Batch-Schema oder Batch-Fehler): derselbe Endpoint je Eintrag;
+        # nach einem Batch-Fehler ohne weitere Retries (die Batch-Retries sind bereits gelaufen)
+        single_retries = None if not schema["batch"] else 0
+        out: List[List[float]] = []
+        for t in inputs:
+            try:
+                vecs = self._request(schema, model, [t], timeout, retries=single_retries)
+                out.append(vecs[0] if vecs and vecs[0] else [])
+            except CircuitOpenError:
+                raise
+            except Exception as e:
+                log.error("ollama_embed_exception", extra={"extra_fields": {
+                    "error": str(e), "model": model, "phase": "single", "len_text": len(t or "")
+                }})
+                out.append([])
+        return out
@@ -0,0 +1,289 @@
+# app/modules/pdf_text_cache.py
+# Cache extrahierter PDF-Texte: ein pypdf-Durchlauf je Datei, geteilt von Metadaten-Vorschau
+# (Seite 1), Ingest (Volltext/Seiten) und erneutem Chunking.
+# - Schlüssel: sha256 der PDF-Bytes (= filehash der Quittung)
+# - Wert: {"sha256", "pages": [Seitentext], "offsets": [Start je Seite im Volltext], "chars"}
+#   Volltext = "\n".join(pages) (wie read_all_text)
+# - Größenlimit in MB (UTF-8-Länge der Seitentexte), LRU-Eviction im Speicher
+# - optional persistent: gzip-JSON unter paths.app_state_dir/<dirname>/<sha256>.json.gz
+#   (überlebt Neustarts; Bulk-Worker-Prozesse teilen sich diese Ebene)
+# - Streaming-Ingest (iter_pages): Seiten werden einzeln in die Dateien geschrieben (DocumentWriter),
+#   nicht im Speicher gesammelt -> kein Eintrag in der Speicher-Ebene, nur auf Disk
+# Konfiguration (app_config.json):
+#   "pdf_text_cache": {"enabled": true, "max_mb": 256, "persist": false, "dirname": "pdf_text_cache"}
+
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union
+from collections import OrderedDict
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+from app.modules.logging_setup import get_logger
+from app.modules.ingest.pdf_ops import extract_page_texts, iter_page_texts, parallel_settings
+
+log = get_logger("pdf_text_cache")
+
+FORMAT_VERSION = 1
+
+
+def pdf_sha256(pdf_bytes: bytes) -> str:
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+
+def build_document(sha256: str, pages: List[str]) -> Dict[str, Any]:
+    offsets: List[int] = []
+    pos = 0
+    for t in pages:
+        offsets.append(pos)
+        pos += len(t) + 1  # "\n" zwischen den Seiten
+    return {"sha256": sha256, "pages": list(pages), "offsets": offsets, "chars": max(0, pos - 1)}
+
+
+def full_text(doc: Dict[str, Any]) -> str:
+    return "\n".join(doc.get("pages") or [])
+
+
+def _doc_bytes(doc: Dict[str, Any]) -> int:
+    return sum(len(t.encode("utf-8")) for t in doc.get("pages") or [])
+
+
+def write_document(path: str, doc: Dict[str, Any]) -> str:
+    """gzip-JSON atomar schreiben."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=".tmp_", dir=os.path.dirname(path) or ".")
+    try:
+        with os.fdopen(fd, "wb") as f, gzip.GzipFile(fileobj=f, mode="wb", compresslevel=6) as gz:
+            gz.write(json.dumps({"version": FORMAT_VERSION, **doc}, ensure_ascii=False).encode("utf-8"))
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            try:
+                os.remove(tmp)
+            except Exception:
+                pass
+    return path
+
+
+class DocumentWriter:
+    """Schreibt ein Dokument seitenweise im Format von write_document (gzip-JSON); im Speicher
+    bleiben nur die Seiten-Offsets. close() ersetzt die Zieldatei atomar, abort() verwirft die Teildatei."""
+
+    def __init__(self, path: str, sha256: str):
+        self.path = path
+        self.offsets: List[int] = []
+        self._pos = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        fd, self._tmp = tempfile.mkstemp(prefix=".tmp_", dir=os.path.dirname(path) or ".")
+        self._f = os.fdopen(fd, "wb")
+        self._gz = gzip.GzipFile(fileobj=self._f, mode="wb", compresslevel=6)
+        self._gz.write(f'{{"version": {FORMAT_VERSION}, "sha256": {json.dumps(sha256)}, "pages": ['.encode("utf-8"))
+
+    def add(self, text: str) -> None:
+        sep = ", " if self.offsets else ""
+        self._gz.write((sep + json.dumps(text, ensure_ascii=False)).encode("utf-8"))
+        self.offsets.append(self._pos)
+        self._pos += len(text) + 1  # "\n" zwischen den Seiten (wie build_document)
+
+    def close(self) -> str:
+        tail = f'], "offsets": {json.dumps(self.offsets)}, "chars": {max(0, self._pos - 1)}}}'
+        self._gz.write(tail.encode("utf-8"))
+        self._gz.close()
+        self._f.close()
+        os.replace(self._tmp, self.path)
+        return self.path
+
+    def abort(self) -> None:
+        for h in (self._gz, self._f):
+            try:
+                h.close()
+            except Exception:
+                pass
+        try:
+            os.remove(self._tmp)
+        except OSError:
+            pass
+
+
+def read_document(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with gzip.open(path, "rb") as gz:
+            data = json.loads(gz.read().decode("utf-8"))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        log.warning("pdf_text_cache_read_failed", extra={"extra_fields": {"path": path, "err": str(e)}})
+        return None
+    if not isinstance(data, dict) or data.get("version") != FORMAT_VERSION or not isinstance(data.get("pages"), list):
+        return None
+    data.pop("version", None)
+    return data
+
+
+class PDFTextCache:
+    def __init__(self, max_mb: float = 256.0, disk_dir: Optional[str] = None):
+        self.max_bytes = int(float(max_mb) * 1024 * 1024)
+        self.disk_dir = disk_dir
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._bytes = 0
+        self._items: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        log.info("pdf_text_cache_init", extra={"extra_fields": {"max_mb": max_mb, "disk_dir": disk_dir}})
+
+    # --------- intern ---------
+    def _disk_path(self, sha256: str) -> Optional[str]:
+        return os.path.join(self.disk_dir, f"{sha256}.json.gz") if self.disk_dir else None
+
+    def _remember_locked(self, doc: Dict[str, Any]) -> None:
+        size = _doc_bytes(doc)
+        if size > self.max_bytes:
+            return  # größer als der ganze Cache -> nur Disk-Ebene
+        old = self._items.pop(doc["sha256"], None)
+        if old is not None:
+            self._bytes -= _doc_bytes(old)
+        self._items[doc["sha256"]] = doc
+        self._bytes += size
+        while self._bytes > self.max_bytes and self._items:
+            _, victim = self._items.popitem(last=False)
+            self._bytes -= _doc_bytes(victim)
+
+    # --------- API ---------
+    def get(self, sha256: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            doc = self._items.get(sha256)
+            if doc is not None:
+                self._items.move_to_end(sha256)
+                self.hits += 1
+                return doc
+        path = self._disk_path(sha256)
+        doc = read_document(path) if path else None
+        with self._lock:
+            if doc is not None:
+                self.disk_hits += 1
+                self._remember_locked(doc)
+            else:
+                self.misses += 1
+        return doc
+
+    def put(self, doc: Dict[str, Any]) -> None:
+        with self._lock:
+            self._remember_locked(doc)
+        path = self._disk_path(doc["sha256"])
+        if path and not os.path.isfile(path):
+            try:
+                write_document(path, doc)
+            except OSError as e:
+                log.warning("pdf_text_cache_write_failed", extra={"extra_fields": {"path": path, "err": str(e)}})
+
+    def document(self, source: Union[bytes, str], sha256: Optional[str] = None,
+                 workers: int = 1, min_pages: int = 40) -> Dict[str, Any]:
+        """Geparstes Dokument aus dem Cache oder per pypdf (danach im Cache).
+        source = PDF-Bytes oder Dateipfad (dann sha256 angeben, sonst wird die Datei gehasht);
+        workers/min_pages: parallele Extraktion (pdf_ops.extract_page_texts)."""
+        if sha256 is None:
+            if isinstance(source, (bytes, bytearray)):
+                sha256 = pdf_sha256(bytes(source))
+            else:
+                with open(source, "rb") as f:
+                    sha256 = pdf_sha256(f.read())
+        doc = self.get(sha256)
+        if doc is None:
+            doc = build_document(sha256, extract_page_texts(source, workers=workers, min_pages=min_pages))
+            self.put(doc)
+        return doc
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": ((self.hits + self.disk_hits) / total) if total else 0.0,
+                "entries": len(self._items),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+
+_CACHES: Dict[str, PDFTextCache] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def get_pdf_text_cache(app_cfg: Dict[str, Any]) -> Optional[PDFTextCache]:
+    """Prozessweite Cache-Instanz (je Disk-Verzeichnis); None, wenn deaktiviert."""
+    cc = (app_cfg or {}).get("pdf_text_cache") or {}
+    if not cc.get("enabled", True):
+        return None
+    state_dir = ((app_cfg or {}).get("paths") or {}).get("app_state_dir")
+    disk_dir = os.path.join(state_dir, cc.get("dirname") or "pdf_text_cache") if (cc.get("persist") and state_dir) else None
+    key = disk_dir or ""
+    with _CACHES_LOCK:
+        cache = _CACHES.get(key)
+        if cache is None:
+            cache = PDFTextCache(max_mb=float(cc.get("max_mb", 256)), disk_dir=disk_dir)
+            _CACHES[key] = cache
+        return cache
+
+
+def iter_pages(app_cfg: Dict[str, Any], source: Union[bytes, str], sha256: str,
+               write_to: Sequence[str] = ()) -> Iterator[str]:
+    """Seitentexte für den Streaming-Ingest: aus dem Cache, sonst seitenweise per pypdf.
+    Beim Parsen geht jede Seite sofort in die Disk-Ebene des Caches (falls persistent) und in die
+    Dateien write_to (z.B. Text-Store) – Speicher unabhängig von der Dokumentgröße. Dateien werden
+    nur bei vollständigem Durchlauf fertiggestellt (Abbruch/Fehler: Teildateien verworfen)."""
+    cache = get_pdf_text_cache(app_cfg)
+    doc = cache.get(sha256) if cache is not None else None
+    if doc is not None:
+        yield from doc["pages"]
+        return
+    paths = [p for p in [cache._disk_path(sha256) if cache is not None else None, *write_to]
+             if p and not os.path.isfile(p)]
+    writers: List[DocumentWriter] = []
+    for path in paths:
+        try:
+            writers.append(DocumentWriter(path, sha256))
+        except OSError as e:
+            log.warning("pdf_text_write_failed", extra={"extra_fields": {"path": path, "err": str(e)}})
+    done = False
+    try:
+        for t in iter_page_texts(source):
+            for w in list(writers):
+                try:
+                    w.add(t)
+                except OSError as e:
+                    log.warning("pdf_text_write_failed", extra={"extra_fields": {"path": w.path, "err": str(e)}})
+                    w.abort()
+                    writers.remove(w)
+            yield t
+        done = True
+    finally:
+        for w in writers:
+            if not done:
+                w.abort()
+                continue
+            try:
+                w.close()
+            except OSError as e:
+                log.warning("pdf_text_write_failed", extra={"extra_fields": {"path": w.path, "err": str(e)}})
+                w.abort()
+
+
+def parsed_pdf(app_cfg: Dict[str, Any], source: Union[bytes, str], sha256: Optional[str] = None) -> Dict[str, Any]:
+    """Geparstes Dokument über den Cache (ohne Cache: direkt per pypdf, ggf. parallel – pdf_extract)."""
+    opts = parallel_settings(app_cfg)
+    cache = get_pdf_text_cache(app_cfg)
+    if cache is not None:
+        return cache.document(source, sha256, **opts)
+    if sha256 is None:
+        sha256 = pdf_sha256(source) if isinstance(source, (bytes, bytearray)) else ""
+    return build_document(sha256, extract_page_texts(source, **opts))
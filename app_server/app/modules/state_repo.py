@@ -4,11 +4,15 @@
 #   data/app_state/ingest_doc_<docid>.json
 #   data/app_state/ingests_index.json
 #   data/app_state/current_thesis.json
+#   data/app_state/bulk/<run>.json   (Checkpoints des Bulk-Ingests)
+#   data/app_state/jobs/<job_id>.json (Ingest-Jobs der Warteschlange)
+#   data/app_state/dedup_index.json   (Datei-Hash + Konfigurations-Fingerprint -> docid)
 from __future__ import annotations
 
 import os
 import json
 import tempfile
+import threading
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timezone
 
@@ -20,12 +24,16 @@ def _utcnow() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
+_DEDUP_LOCK = threading.Lock()  # Read-Modify-Write des Dedup-Index (mehrere Ingest-Worker)
+
+
 class StateRepo:
     def __init__(self, app_state_dir: str):
         self.dir = app_state_dir
         os.makedirs(self.dir, exist_ok=True)
         self.index_path = os.path.join(self.dir, "ingests_index.json")
         self.current_path = os.path.join(self.dir, "current_thesis.json")
+        self.dedup_path = os.path.join(self.dir, "dedup_index.json")
         log.info("state_repo_init", extra={"extra_fields": {"dir": self.dir}})
 
     # --------- Low level ---------
@@ -116,6 +124,81 @@ class StateRepo:
         self._atomic_write_json(self.index_path, idx)
         return self.index_path
 
+    # --------- Bulk-Checkpoints ---------
+    def bulk_checkpoint_path(self, run: str) -> str:
+        safe = "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in (run or "default"))
+        return os.path.join(self.dir, "bulk", f"{safe}.json")
+
+    def write_bulk_checkpoint(self, run: str, data: Dict[str, Any]) -> str:
+        path = self.bulk_checkpoint_path(run)
+        self._atomic_write_json(path, {**data, "updated_at": _utcnow()})
+        return path
+
+    def read_bulk_checkpoint(self, run: str) -> Optional[Dict[str, Any]]:
+        return self._read_json(self.bulk_checkpoint_path(run))
+
+    # --------- Ingest-Jobs ---------
+    def jobs_dir(self) -> str:
+        return os.path.join(self.dir, "jobs")
+
+    def job_path(self, job_id: str) -> str:
+        return os.path.join(self.jobs_dir(), f"{job_id}.json")
+
+    def write_job(self, job: Dict[str, Any]) -> str:
+        job_id = job.get("job_id")
+        if not job_id:
+            raise ValueError("Job ohne job_id.")
+        path = self.job_path(job_id)
+        self._atomic_write_json(path, {**job, "updated_at": _utcnow()})
+        return path
+
+    def read_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._read_json(self.job_path(job_id))
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        """Alle Jobs, neueste zuerst (nach created_at)."""
+        d = self.jobs_dir()
+        if not os.path.isdir(d):
+            return []
+        jobs = []
+        for name in os.listdir(d):
+            if name.endswith(".json") and not name.startswith(".tmp_"):
+                try:
+                    job = self._read_json(os.path.join(d, name))
+                except ValueError:
+                    continue  # halb geschrieben/defekt -> überspringen
+                if isinstance(job, dict):
+                    jobs.append(job)
+        jobs.sort(key=lambda j: j.get("created_at") or "", reverse=True)
+        return jobs
+
+    def delete_job(self, job_id: str) -> None:
+        try:
+            os.remove(self.job_path(job_id))
+        except FileNotFoundError:
+            pass
+
+    # --------- Dedup-Index ---------
+    def read_dedup_entry(self, key: str) -> Optional[Dict[str, Any]]:
+        data = self._read_json(self.dedup_path) or {}
+        return (data.get("items") or {}).get(key)
+
+    def write_dedup_entry(self, key: str, entry: Dict[str, Any]) -> str:
+        with _DEDUP_LOCK:
+            data = self._read_json(self.dedup_path) or {"items": {}}
+            data.setdefault("items", {})[key] = {**entry, "registered_at": _utcnow()}
+            data["updated_at"] = _utcnow()
+            self._atomic_write_json(self.dedup_path, data)
+        return self.dedup_path
+
+    def delete_dedup_entry(self, key: str) -> None:
+        with _DEDUP_LOCK:
+            data = self._read_json(self.dedup_path) or {}
+            if key in (data.get("items") or {}):
+                del data["items"][key]
+                data["updated_at"] = _utcnow()
+                self._atomic_write_json(self.dedup_path, data)
+
     # --------- Current Selection ---------
     def set_current(self, docid: str) -> str:
         rec = self.read_receipt(docid)
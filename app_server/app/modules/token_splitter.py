@@ -0,0 +1,134 @@
+# app/modules/token_splitter.py
+# Token-bewusstes Zerlegen langer Embedding-Eingaben.
+# - Budget je Embedding-Modell: model_config.json embeddings[].max_input_tokens
+# - Token-Zählung: lokaler HF-Tokenizer (embeddings[].tokenizer, nur lokal gecacht, optional)
+#   oder kalibrierte Schätzung über embeddings[].chars_per_token
+# - Schnitt an Satzgrenzen (Absätze, . ! ? …), nur übergroße Sätze werden an Wortgrenzen
+#   und im Notfall hart nach Zeichen geteilt
+# - Teile liegen sicher unter dem Budget -> kein stilles Abschneiden auf Server-Seite
+
+from typing import Any, Callable, Dict, List, Optional
+import math
+import re
+import threading
+
+from app.modules.logging_setup import get_logger
+
+log = get_logger("token_splitter")
+
+DEFAULT_CHARS_PER_TOKEN = 3.0
+
+# Satzende: Satzzeichen (+ optionale schließende Anführungszeichen/Klammern) + Leerraum,
+# oder Absatzgrenze. Gängige deutsche Abkürzungen werden nicht als Satzende gewertet.
+_SENT_END = re.compile(r"(?<=[.!?…])([\"'»«“”)\]]*)\s+|\n\s*\n")
+_ABBREV = re.compile(
+    r"(?i)(?:\b(?:z\.B|d\.h|u\.a|o\.ä|bzw|vgl|ca|usw|etc|Abb|Tab|Kap|Nr|Bd|Hrsg|S|s|ff|f|Dr|Prof|evtl|ggf|inkl|bspw|sog)\.|\b\d{1,3}\.)$"
+)
+
+TokenCounter = Callable[[str], int]
+
+_TOKENIZERS: Dict[str, Any] = {}
+_TOKENIZERS_LOCK = threading.Lock()
+
+
+def estimate_counter(chars_per_token: float = DEFAULT_CHARS_PER_TOKEN) -> TokenCounter:
+    cpt = float(chars_per_token or DEFAULT_CHARS_PER_TOKEN)
+    if cpt <= 0:
+        cpt = DEFAULT_CHARS_PER_TOKEN
+    return lambda text: int(math.ceil(len(text or "") / cpt))
+
+
+def _load_tokenizer(name: str) -> Optional[Any]:
+    """HF-Tokenizer nur aus dem lokalen Cache (kein Download im Ingest-Pfad); None bei Fehlschlag."""
+    with _TOKENIZERS_LOCK:
+        if name in _TOKENIZERS:
+            return _TOKENIZERS[name]
+        tok = None
+        try:
+            from transformers import AutoTokenizer  # optional (via sentence-transformers)
+            tok = AutoTokenizer.from_pretrained(name, local_files_only=True)
+        except Exception as e:
+            log.warning("tokenizer_unavailable", extra={"extra_fields": {"tokenizer": name, "err": str(e)[:200]}})
+        _TOKENIZERS[name] = tok
+        return tok
+
+
+def get_token_counter(embedding_cfg: Dict[str, Any]) -> TokenCounter:
+    """Zähler für das Embedding-Modell: lokaler Tokenizer, sonst chars_per_token-Schätzung."""
+    cfg = embedding_cfg or {}
+    name = cfg.get("tokenizer")
+    if name:
+        tok = _load_tokenizer(str(name))
+        if tok is not None:
+            return lambda text: len(tok.encode(text or "", add_special_tokens=True))
+    return estimate_counter(cfg.get("chars_per_token", DEFAULT_CHARS_PER_TOKEN))
+
+
+def split_sentences(text: str) -> List[str]:
+    """Zerlegt an Satz-/Absatzgrenzen; Leerraum am Rand wird entfernt, leere Teile entfallen."""
+    out: List[str] = []
+    buf = ""
+    pos = 0
+    for m in _SENT_END.finditer(text or ""):
+        piece = text[pos:m.end(1) if m.group(1) is not None else m.start()]  # Anführungszeichen bleiben am Satz
+        pos = m.end()
+        buf = f"{buf} {piece}" if buf else piece
+        if m.group(0).count("\n") < 2 and _ABBREV.search(buf.rstrip("\"'»«“”)]")):
+            continue  # Abkürzung/Ordinalzahl -> kein Satzende
+        if buf.strip():
+            out.append(buf.strip())
+        buf = ""
+    rest = (text or "")[pos:]
+    buf = f"{buf} {rest}" if buf else rest
+    if buf.strip():
+        out.append(buf.strip())
+    return out
+
+
+def _split_oversized(sentence: str, max_tokens: int, count: TokenCounter) -> List[str]:
+    """Übergroßer Satz: an Wortgrenzen packen, einzelne Riesen-"Wörter" hart nach Zeichen teilen."""
+    parts: List[str] = []
+    cur: List[str] = []
+    for word in sentence.split():
+        if count(word) > max_tokens:
+            if cur:
+                parts.append(" ".join(cur)); cur = []
+            step = max(1, int(len(word) * max_tokens / max(1, count(word))))
+            while count(word[:step]) > max_tokens and step > 1:
+                step = max(1, int(step * 0.9))  # Tokenizer-Zähler ist nicht linear
+            parts.extend(word[s:s + step] for s in range(0, len(word), step))
+            continue
+        if cur and count(" ".join(cur + [word])) > max_tokens:
+            parts.append(" ".join(cur)); cur = []
+        cur.append(word)
+    if cur:
+        parts.append(" ".join(cur))
+    return parts
+
+
+def split_for_embedding(text: str, max_tokens: int, count: TokenCounter) -> List[str]:
+    """
+    Packt Sätze gierig in Teile mit count(teil) <= max_tokens.
+    Text innerhalb des Budgets bleibt unverändert ein Teil (auch Leerstring).
+    """
+    text = text or ""
+    max_tokens = max(1, int(max_tokens))
+    if count(text) <= max_tokens:
+        return [text]
+    parts: List[str] = []
+    cur = ""
+    for sent in split_sentences(text):
+        if count(sent) > max_tokens:
+            if cur:
+                parts.append(cur); cur = ""
+            parts.extend(_split_oversized(sent, max_tokens, count))
+            continue
+        cand = f"{cur} {sent}" if cur else sent
+        if cur and count(cand) > max_tokens:
+            parts.append(cur)
+            cur = sent
+        else:
+            cur = cand
+    if cur:
+        parts.append(cur)
+    return parts or [text]
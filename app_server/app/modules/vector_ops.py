@@ -0,0 +1,95 @@
+# app/modules/vector_ops.py
+# Vektor-Hilfsfunktionen auf NumPy-float32-Basis (Ingest + Suche).
+# Schnittstelle bleibt listenbasiert (List[float]); leere Liste [] = "kein gültiger Vektor",
+# damit bestehende Aufrufer (Leer-Filter, Chroma-Upsert) unverändert funktionieren.
+
+from typing import List, Optional, Sequence
+import numpy as np
+
+Vector = List[float]
+
+
+def dim_of(vectors: Sequence[Sequence[float]]) -> int:
+    """Gemeinsame Dimension aller Vektoren; 0 bei leerer Liste, leerem oder abweichendem Vektor."""
+    if not vectors:
+        return 0
+    n = len(vectors[0]) if vectors[0] is not None else 0
+    if n == 0:
+        return 0
+    for v in vectors:
+        if v is None or len(v) != n:
+            return 0
+    return n
+
+
+def validate_dims(vectors: Sequence[Sequence[float]], dim: Optional[int] = None) -> bool:
+    """True, wenn alle Vektoren nicht-leer sind, gleiche Länge haben (und ggf. == dim)."""
+    n = dim_of(vectors)
+    if n == 0:
+        return False
+    return dim is None or int(dim) == n
+
+
+def as_matrix(vectors: Sequence[Sequence[float]]) -> np.ndarray:
+    """(n, d)-float32-Matrix; ValueError bei leeren/ungleich langen Vektoren."""
+    if dim_of(vectors) == 0:
+        raise ValueError("Vektoren leer oder mit abweichender Dimension.")
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def to_list(arr: np.ndarray) -> Vector:
+    return arr.astype(np.float32).tolist()
+
+
+def mean(vectors: Sequence[Sequence[float]]) -> Vector:
+    if dim_of(vectors) == 0:
+        return []
+    return to_list(as_matrix(vectors).mean(axis=0))
+
+
+def total(vectors: Sequence[Sequence[float]]) -> Vector:
+    if dim_of(vectors) == 0:
+        return []
+    return to_list(as_matrix(vectors).sum(axis=0))
+
+
+def weighted_mean(vectors: Sequence[Sequence[float]], weights: Sequence[float]) -> Vector:
+    """Gewichteter Mittelwert (z.B. nach Textlänge); Gewichte <= 0 zählen nicht, Summe 0 -> mean."""
+    if dim_of(vectors) == 0 or len(weights) != len(vectors):
+        return []
+    w = np.clip(np.asarray(weights, dtype=np.float32), 0.0, None)
+    s = float(w.sum())
+    if s <= 0.0:
+        return mean(vectors)
+    return to_list((as_matrix(vectors) * w[:, None]).sum(axis=0) / s)
+
+
+def l2_normalize(vec: Sequence[float]) -> Vector:
+    """Einheitsvektor; [] bleibt [], Nullvektor bleibt unverändert."""
+    if not vec:
+        return []
+    a = np.asarray(vec, dtype=np.float32)
+    n = float(np.linalg.norm(a))
+    if n == 0.0 or not np.isfinite(n):
+        return to_list(a)
+    return to_list(a / n)
+
+
+def l2_normalize_rows(mat: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    norms[norms == 0.0] = 1.0
+    return (mat / norms).astype(np.float32)
+
+
+def distance_to_score(dist: float, space: str = "cosine", normalized: bool = True) -> float:
+    """Chroma-Distanz -> Score (höher = ähnlicher), abhängig vom Distanzraum der Collection:
+    cosine: 1 - d; ip: 1 - d (= Skalarprodukt); l2 (quadriert): normalisiert 1 - d/2 (= Kosinus), sonst 1/(1 + d)."""
+    d = float(dist)
+    if space == "l2":
+        return 1.0 - d / 2.0 if normalized else 1.0 / (1.0 + d)
+    return 1.0 - d
+
+
+def l2_normalize_many(vectors: Sequence[Sequence[float]]) -> List[Vector]:
+    """Normalisiert zeilenweise; leere Einträge bleiben [] (Reihenfolge bleibt erhalten)."""
+    return [l2_normalize(v) if v else [] for v in vectors]
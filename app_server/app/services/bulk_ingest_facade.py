@@ -0,0 +1,278 @@
+# services/bulk_ingest_facade.py
+# Bulk-Ingest vieler PDFs (Verzeichnis oder Manifest), z.B. zum Semesterende.
+# - Parsen + Chunking in einem Prozess-Pool (CPU-gebunden, umgeht den GIL)
+# - Embedding/Upsert/Quittung im Hauptprozess über IngestFacade.ingest_parsed; mehrere Dokumente
+#   gleichzeitig (docs_in_flight), alle Requests über den prozessweiten, begrenzten Embedding-Executor
+# - Höchstens workers + docs_in_flight Dokumente gleichzeitig im Speicher (Backpressure)
+# - Checkpoint je Lauf (StateFacade, app_state/bulk/<run>.json) nach jeder Datei:
+#   erledigte Dateien (Schlüssel = SHA-256) werden beim Neustart übersprungen
+# - bereits (auch außerhalb des Laufs) ingestierte PDFs mit gleicher Konfiguration: kein Parsen/Embedding,
+#   nur ggf. Metadaten aktualisieren (IngestFacade.find_duplicate)
+# - Seitentexte aus dem Text-Store neben dem Upload, falls vorhanden; sonst Parsen + Text-Store schreiben
+# - Durchsatz: Seiten/s, Chunks/s, Embeddings/s
+
+from typing import Any, Callable, Dict, List, Optional
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone
+import multiprocessing
+import os
+import time
+
+from app.modules.logging_setup import get_logger
+from app.modules.embed_controller import CircuitOpenError
+from modules.ingest.bulk_ops import file_sha256, default_docid
+from modules.ingest.pdf_ops import extract_page_texts
+from modules.ingest.file_ops import load_text_store, save_text_store
+from app.modules.pdf_text_cache import build_document, parsed_pdf
+from services.ingest.chunk_facade import ChunkIngestFacade
+
+log = get_logger("bulk_ingest_facade")
+
+Progress = Callable[[Dict[str, Any]], None]
+
+
+def _parse_and_chunk(task: Dict[str, Any]) -> Dict[str, Any]:
+    """Läuft im Worker-Prozess: PDF → Volltext (wie read_all_text) → Children/Parents.
+    task["text_cache"]: Cache-Konfiguration, nur bei persistentem pdf_text_cache (geteilt über die Disk);
+    task["text_store"]: Text-Store neben dem Upload lesen/schreiben."""
+    t0 = time.monotonic()
+    uploads_dir = os.path.dirname(task["pdf_path"])
+    doc = load_text_store(uploads_dir, task["filehash"]) if task.get("text_store") else None
+    if doc is not None:
+        pages = doc["pages"]
+    elif task.get("text_cache"):
+        pages = parsed_pdf(task["text_cache"], task["pdf_path"], task["filehash"])["pages"]
+    else:
+        pages = extract_page_texts(task["pdf_path"])
+    if doc is None and task.get("text_store"):
+        save_text_store(uploads_dir, build_document(task["filehash"], pages))
+    full_text = "\n".join(pages)
+    if not full_text:
+        raise ValueError("PDF-Text leer.")
+    children, parents = ChunkIngestFacade().build(
+        full_text=full_text,
+        final_md=task["final_md"],
+        docid=task["docid"],
+        source_file=os.path.basename(task["pdf_path"]),
+        child_size=task["child_size"],
+        child_overlap=task["child_overlap"],
+        parent_group_size=task["parent_group_size"],
+        parent_group_overlap=task["parent_group_overlap"],
+    )
+    return {"children": children, "parents": parents, "pages": len(pages),
+            "parse_s": time.monotonic() - t0}
+
+
+class BulkIngestFacade:
+    def __init__(self, ingest, state, metadata_srv=None):
+        """ingest: IngestFacade, state: StateFacade, metadata_srv: MetadataFacade (optional,
+        erkennt Metadaten für Dateien ohne Manifest-/Sidecar-Angaben)."""
+        self.ingest = ingest
+        self.state = state
+        self.metadata_srv = metadata_srv
+
+    # --------- Checkpoint ---------
+    def _load_checkpoint(self, run: str, source: str, restart: bool) -> Dict[str, Any]:
+        cp = None if restart else self.state.load_bulk_checkpoint(run)
+        if not cp:
+            cp = {"run": run, "source": source, "created_at": datetime.now(timezone.utc).isoformat(),
+                  "files": {}}
+        return cp
+
+    # --------- Vorbereitung (Hauptprozess) ---------
+    def _prepare(self, entry: Dict[str, Any], pdf_bytes: bytes, filehash: str,
+                 retrieval: Dict[str, Any]) -> Dict[str, Any]:
+        """Metadaten bestimmen/prüfen und PDF + Metadaten-JSON ins Upload-Verzeichnis schreiben.
+        Bekannte PDF: {"docid", "duplicate": Quittung} ohne Schreiben."""
+        metadata_in = entry.get("metadata") or {}
+        if not metadata_in:
+            if self.metadata_srv is None:
+                raise ValueError("Keine Metadaten (Manifest/Sidecar) und keine Erkennung aktiv.")
+            metadata_in = self.metadata_srv.preview_metadata(pdf_bytes).get("metadata") or {}
+        docid = str(entry.get("docid") or metadata_in.get("docid") or default_docid(filehash)).strip()
+        final_md, confidence_md, source_md = self.ingest.meta.prepare(metadata_in, docid)
+        dup = self.ingest.find_duplicate(filehash, retrieval, final_md, confidence_md, source_md, docid)
+        if dup is not None:
+            return {"docid": dup["docid"], "duplicate": dup}
+        file_info = self.ingest.files.save(
+            pdf_source=pdf_bytes,
+            filename=os.path.basename(entry["path"]),
+            docid=docid,
+            final_md=final_md,
+            confidence_md=confidence_md,
+            source_md=source_md,
+        )
+        return {"docid": docid, "final_md": final_md, "confidence_md": confidence_md,
+                "source_md": source_md, "file_info": file_info}
+
+    # --------- Lauf ---------
+    def run(self, entries: List[Dict[str, Any]], run: str, source: str = "", workers: int = 0,
+            docs_in_flight: int = 2, restart: bool = False, retry_failed: bool = True,
+            progress: Optional[Progress] = None) -> Dict[str, Any]:
+        """
+        entries: [{"path", "docid"?, "metadata"?}] (siehe bulk_ops.load_manifest/discover_pdfs)
+        Rückgabe: Zusammenfassung {run, total, done, failed, skipped, pages, chunks, embeddings,
+                                   wall_s, pages_per_s, chunks_per_s, embeddings_per_s, checkpoint}
+        """
+        retrieval = self.ingest.model_reg.retrieval() or {}
+        strategy = str(retrieval.get("parent_vector_strategy") or "embed").strip().lower()
+        chunk_params = {
+            "child_size": int(retrieval.get("child_chunk_size", 1200)),
+            "child_overlap": int(retrieval.get("child_chunk_overlap", 200)),
+            "parent_group_size": int(retrieval.get("parent_group_size", 3)),
+            "parent_group_overlap": int(retrieval.get("parent_group_overlap", 1)),
+        }
+        tc = self.ingest.app_cfg.get("pdf_text_cache") or {}
+        # Seiten im Worker seriell extrahieren: die Dokumente laufen bereits parallel im Pool
+        text_cache = ({"paths": self.ingest.app_cfg["paths"], "pdf_text_cache": tc, "pdf_extract": {"workers": 1}}
+                      if tc.get("enabled", True) and tc.get("persist") else None)
+        workers = int(workers) or max(1, min(8, (os.cpu_count() or 2) - 1))
+        docs_in_flight = max(1, int(docs_in_flight))
+        limit = workers + docs_in_flight
+
+        cp = self._load_checkpoint(run, source, restart)
+        files: Dict[str, Dict[str, Any]] = cp["files"]
+        cp_path = [""]
+        totals = {"done": 0, "failed": 0, "skipped": 0, "pages": 0, "chunks": 0, "embeddings": 0}
+        t0 = time.monotonic()
+
+        def _save() -> str:
+            cp_path[0] = self.state.save_bulk_checkpoint(run, cp)
+            return cp_path[0]
+
+        def _report(status: str, entry: Dict[str, Any], rec: Dict[str, Any]) -> None:
+            if progress is None:
+                return
+            wall = max(1e-9, time.monotonic() - t0)
+            progress({
+                "status": status, "path": entry["path"], "docid": rec.get("docid"),
+                "error": rec.get("error"), "position": sum(totals[k] for k in ("done", "failed", "skipped")),
+                "total": len(entries), **self._rates(totals, wall),
+            })
+
+        def _fail(entry: Dict[str, Any], filehash: str, docid: Optional[str], err: BaseException) -> None:
+            rec = {"path": entry["path"], "docid": docid, "status": "failed", "error": str(err)[:500],
+                   "at": datetime.now(timezone.utc).isoformat()}
+            files[filehash] = rec
+            totals["failed"] += 1
+            _save()
+            log.error("bulk_file_failed", extra={"extra_fields": {
+                "path": entry["path"], "docid": docid, "error": str(err)[:300]
+            }})
+            _report("failed", entry, rec)
+
+        def _store(prep: Dict[str, Any], parsed: Dict[str, Any]) -> Dict[str, Any]:
+            # Thread im Hauptprozess: Embedding → Upsert → Quittung/Index (StateFacade)
+            return self.ingest.ingest_parsed(
+                prep["docid"], prep["final_md"], prep["confidence_md"], prep["source_md"],
+                prep["file_info"], parsed["children"], parsed["parents"], retrieval,
+                receipt_extra={"ingest_mode": "bulk", "bulk_run": run},
+            )
+
+        pending = iter(entries)
+        inflight: Dict[Any, Dict[str, Any]] = {}
+        ctx = multiprocessing.get_context("spawn")  # kein fork neben laufenden Embedding-Threads
+        pp = ProcessPoolExecutor(max_workers=workers, mp_context=ctx)
+        tp = ThreadPoolExecutor(max_workers=docs_in_flight, thread_name_prefix="bulk-store")
+        log.info("bulk_run_start", extra={"extra_fields": {
+            "run": run, "files": len(entries), "workers": workers, "docs_in_flight": docs_in_flight,
+            "already_done": sum(1 for r in files.values() if r.get("status") == "done"),
+        }})
+        try:
+            while True:
+                # Nachschub bis zur Obergrenze (Backpressure)
+                while len(inflight) < limit:
+                    entry = next(pending, None)
+                    if entry is None:
+                        break
+                    try:
+                        with open(entry["path"], "rb") as f:
+                            pdf_bytes = f.read()
+                    except Exception as e:
+                        _fail(entry, f"path:{entry['path']}", entry.get("docid"), e)
+                        continue
+                    filehash = file_sha256(pdf_bytes)
+                    prev = files.get(filehash) or {}
+                    if prev.get("status") == "done" or (prev.get("status") == "failed" and not retry_failed):
+                        totals["skipped"] += 1
+                        _report("skipped", entry, prev)
+                        continue
+                    try:
+                        prep = self._prepare(entry, pdf_bytes, filehash, retrieval)
+                    except Exception as e:
+                        _fail(entry, filehash, entry.get("docid"), e)
+                        continue
+                    if prep.get("duplicate"):
+                        dup = prep["duplicate"]
+                        rec = {"path": entry["path"], "docid": prep["docid"], "status": "done",
+                               "counts": dup.get("counts") or {}, "dedup": dup["dedup"]["action"],
+                               "at": datetime.now(timezone.utc).isoformat()}
+                        files[filehash] = rec
+                        totals["skipped"] += 1
+                        _save()
+                        _report("skipped", entry, rec)
+                        continue
+                    del pdf_bytes
+                    task = {"pdf_path": prep["file_info"]["pdf_path"], "docid": prep["docid"],
+                            "final_md": prep["final_md"], "filehash": filehash, "text_cache": text_cache,
+                            "text_store": self.ingest.pdf.use_store,
+                            **chunk_params}
+                    fut = pp.submit(_parse_and_chunk, task)
+                    inflight[fut] = {"kind": "parse", "entry": entry, "hash": filehash, "prep": prep}
+
+                if not inflight:
+                    break
+                done, _ = wait(list(inflight), return_when=FIRST_COMPLETED)
+                for fut in done:
+                    job = inflight.pop(fut)
+                    entry, filehash, prep = job["entry"], job["hash"], job["prep"]
+                    try:
+                        res = fut.result()
+                    except (CircuitOpenError, BrokenProcessPool):
+                        raise  # Ollama gestört/Worker abgestürzt: Lauf abbrechen, Checkpoint bleibt für den Neustart
+                    except Exception as e:
+                        _fail(entry, filehash, prep["docid"], e)
+                        continue
+                    if job["kind"] == "parse":
+                        job.update({"kind": "store", "parsed_stats": {
+                            "pages": res["pages"], "parse_s": round(res["parse_s"], 3),
+                            "children": len(res["children"].get("documents") or []),
+                        }})
+                        inflight[tp.submit(_store, prep, res)] = job
+                        continue
+
+                    counts = res.get("counts") or {}
+                    n_par, n_chi = int(counts.get("parents") or 0), int(counts.get("children") or 0)
+                    pages = job["parsed_stats"]["pages"]
+                    totals["done"] += 1
+                    totals["pages"] += pages
+                    totals["chunks"] += n_par + n_chi
+                    totals["embeddings"] += n_chi + (n_par if strategy == "embed" else 0)
+                    rec = {"path": entry["path"], "docid": prep["docid"], "status": "done",
+                           "pages": pages, "counts": counts, "parse_s": job["parsed_stats"]["parse_s"],
+                           "at": datetime.now(timezone.utc).isoformat()}
+                    files[filehash] = rec
+                    _save()
+                    _report("done", entry, rec)
+        finally:
+            for fut in inflight:
+                fut.cancel()
+            pp.shutdown(wait=True, cancel_futures=True)
+            tp.shutdown(wait=True, cancel_futures=True)
+            _save()
+
+        wall = time.monotonic() - t0
+        summary = {"run": run, "total": len(entries), **totals, "wall_s": round(wall, 2),
+                   **self._rates(totals, wall), "checkpoint": cp_path[0]}
+        log.info("bulk_run_done", extra={"extra_fields": summary})
+        return summary
+
+    @staticmethod
+    def _rates(totals: Dict[str, int], wall: float) -> Dict[str, float]:
+        wall = max(1e-9, wall)
+        return {
+            "pages_per_s": round(totals["pages"] / wall, 2),
+            "chunks_per_s": round(totals["chunks"] / wall, 2),
+            "embeddings_per_s": round(totals["embeddings"] / wall, 2),
+        }
@@ -0,0 +1,174 @@
+# app/services/index_facade.py
+# Verwaltung der Chroma-Index-Profile (model_config.json "index"):
+# - status(): Collections mit gespeichertem vs. konfiguriertem Profil (hnsw:space, M, construction_ef, ...)
+# - migrate(): Collections mit abweichendem Profil neu aufbauen (ChromaWrapper.rebuild_collection)
+# - recover(): Reste abgebrochener Migrationen (<name>__rebuild/__backup) auflösen (ChromaWrapper.recover_rebuild)
+# - benchmark(): Recall@k und Latenz je Profil gegen exakte NumPy-Suche auf den Vektoren einer Collection
+#   (temporäre Collections "bench-<profil>-<collection>", danach gelöscht)
+# Chroma kann hnsw:space/M/construction_ef einer vorhandenen Collection nicht ändern -> Profile greifen
+# bei Neuanlage, bestehende Collections nur über migrate().
+
+from typing import Any, Callable, Dict, List, Optional
+from fnmatch import fnmatchcase
+import re
+import time
+
+import numpy as np
+
+from app.modules.logging_setup import get_logger
+from app.modules.chroma_client import ChromaWrapper, profile_of, resolve_profile
+from app.modules import vector_ops
+
+log = get_logger("index_facade")
+
+_PROFILE_KEYS = ("space", "M", "construction_ef", "search_ef", "batch_size", "sync_threshold")
+
+ProgressFn = Callable[[str, Dict[str, Any]], None]
+
+
+def _exact_top_k(mat: np.ndarray, queries: np.ndarray, k: int, space: str) -> List[List[int]]:
+    """Exakte Nachbarn (Zeilenindizes) je Anfrage im Distanzraum space."""
+    if space == "cosine":
+        scores = vector_ops.l2_normalize_rows(queries) @ vector_ops.l2_normalize_rows(mat).T
+    elif space == "ip":
+        scores = queries @ mat.T
+    else:  # l2: kleinste quadrierte Distanz = größtes 2qx - |x|^2
+        scores = 2.0 * (queries @ mat.T) - (mat * mat).sum(axis=1)[None, :]
+    k = min(k, mat.shape[0])
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return [list(row[np.argsort(-scores[i, row])]) for i, row in enumerate(top)]
+
+
+def _percentile_ms(values: List[float], q: float) -> Optional[float]:
+    return round(float(np.percentile(values, q)) * 1000.0, 2) if values else None
+
+
+def _bench_name(profile: str, collection: str) -> str:
+    name = re.sub(r"[^a-zA-Z0-9._-]", "-", f"bench-{profile}-{collection}")[:63]
+    return name.rstrip("._-") or "bench"
+
+
+class IndexFacade:
+    def __init__(self, chroma: ChromaWrapper, index_cfg: Optional[Dict[str, Any]] = None):
+        self.chroma = chroma
+        self.index_cfg = index_cfg if index_cfg is not None else chroma.index_cfg
+
+    # --------- Status / Migration ---------
+    def status(self, pattern: str = "*") -> List[Dict[str, Any]]:
+        out: List[Dict[str, Any]] = []
+        for name in sorted(self.chroma.list_collections()):
+            if not fnmatchcase(name, pattern):
+                continue
+            col = self.chroma.client.get_collection(name=name)
+            stored = profile_of(getattr(col, "metadata", None))
+            pname, target = resolve_profile(self.index_cfg, name)
+            diff = sorted(k for k in _PROFILE_KEYS if k in target and stored.get(k) != target[k])
+            out.append({"collection": name, "count": col.count(), "profile": pname,
+                        "stored": stored, "target": target, "diff": diff})
+        return out
+
+    def migrate(self, pattern: str = "*_parents", dry_run: bool = False, force: bool = False,
+                page_size: int = 1000, progress: Optional[ProgressFn] = None) -> List[Dict[str, Any]]:
+        """Collections (fnmatch pattern) mit abweichendem Profil neu aufbauen; force = auch ohne Abweichung."""
+        results: List[Dict[str, Any]] = []
+        for st in self.status(pattern):
+            if not (st["diff"] or force):
+                continue
+            if progress is not None:
+                progress("migrate", st)
+            if dry_run:
+                results.append({**st, "dry_run": True})
+                continue
+            res = self.chroma.rebuild_collection(st["collection"], page_size=page_size)
+            results.append({**st, **res})
+        log.info("index_migrate", extra={"extra_fields": {
+            "pattern": pattern, "dry_run": dry_run, "collections": [r["collection"] for r in results]
+        }})
+        return results
+
+    def leftovers(self) -> List[str]:
+        return self.chroma.rebuild_leftovers()
+
+    def recover(self) -> List[Dict[str, Any]]:
+        """Alle Reste abgebrochener Migrationen auflösen (Original bzw. vollständige Kopie bleibt erhalten)."""
+        bases = sorted({re.sub(r"__(rebuild|backup)$", "", n) for n in self.leftovers()})
+        results = [{"collection": b, "action": self.chroma.recover_rebuild(b)} for b in bases]
+        log.info("index_recover", extra={"extra_fields": {"results": results}})
+        return results
+
+    # --------- Benchmark ---------
+    def _load(self, collection: str, page_size: int = 1000):
+        ids: List[str] = []
+        docids: List[str] = []
+        vecs: List[List[float]] = []
+        for page in self.chroma.dump(collection, page_size):
+            for i, v in enumerate(page["embeddings"]):
+                if not v:
+                    continue
+                md = page["metadatas"][i] if i < len(page["metadatas"]) else None
+                ids.append(page["ids"][i])
+                docids.append(str((md or {}).get("docid") or ""))
+                vecs.append(v)
+        return ids, docids, np.asarray(vecs, dtype=np.float32)
+
+    def benchmark(self, collection: str, profiles: Optional[List[str]] = None, k: int = 10,
+                  queries: int = 100, filter_docid: bool = False, seed: int = 0,
+                  progress: Optional[ProgressFn] = None) -> List[Dict[str, Any]]:
+        """Recall@k (gegen exakte Suche im Distanzraum des Profils) und Query-Latenz je Profil.
+        Anfragen = zufällig gewählte Vektoren der Collection; filter_docid = Suche mit where={"docid": ...}
+        wie in der SearchFacade (Ground Truth dann nur innerhalb des Dokuments)."""
+        all_profiles = self.index_cfg.get("profiles") or {}
+        names = profiles or list(all_profiles)
+        unknown = [p for p in names if p not in all_profiles]
+        if unknown:
+            raise ValueError(f"Unbekannte Index-Profile: {', '.join(unknown)}")
+        ids, docids, mat = self._load(collection)
+        if mat.shape[0] == 0:
+            raise ValueError(f"Collection '{collection}' enthält keine Vektoren.")
+        rng = np.random.default_rng(seed)
+        q_idx = rng.choice(mat.shape[0], size=min(queries, mat.shape[0]), replace=False)
+        docid_arr = np.asarray(docids)
+
+        results: List[Dict[str, Any]] = []
+        for pname in names:
+            profile = all_profiles[pname]
+            space = str(profile.get("space", "l2"))
+            bench = _bench_name(pname, collection)
+            if bench in self.chroma.list_collections():
+                self.chroma.delete_collection(bench)
+            t0 = time.monotonic()
+            self.chroma.create_collection(bench, profile)
+            try:
+                self.chroma.upsert(bench, [""] * len(ids), [{"docid": d} for d in docids], ids, mat.tolist())
+                build_s = time.monotonic() - t0
+                hits = 0
+                expected = 0
+                lat: List[float] = []
+                for qi in q_idx:
+                    where = {"docid": docids[qi]} if filter_docid else None
+                    if filter_docid:
+                        rows = np.flatnonzero(docid_arr == docids[qi])
+                        truth = [ids[rows[j]] for j in _exact_top_k(mat[rows], mat[qi:qi + 1], k, space)[0]]
+                    else:
+                        truth = [ids[j] for j in _exact_top_k(mat, mat[qi:qi + 1], k, space)[0]]
+                    t1 = time.monotonic()
+                    res = self.chroma.query(bench, query_embeddings=[mat[qi].tolist()], n_results=len(truth),
+                                            where=where, include=[])
+                    lat.append(time.monotonic() - t1)
+                    got = set((res.get("ids") or [[]])[0])
+                    hits += len(got.intersection(truth))
+                    expected += len(truth)
+            finally:
+                self.chroma.delete_collection(bench)
+            row = {
+                "profile": pname, **{key: profile.get(key) for key in _PROFILE_KEYS if key in profile},
+                "vectors": len(ids), "queries": len(q_idx), "k": k, "filter_docid": filter_docid,
+                "recall_at_k": round(hits / expected, 4) if expected else None,
+                "p50_ms": _percentile_ms(lat, 50), "p95_ms": _percentile_ms(lat, 95),
+                "build_seconds": round(build_s, 2),
+            }
+            log.info("index_benchmark", extra={"extra_fields": {"collection": collection, **row}})
+            if progress is not None:
+                progress("benchmark", row)
+            results.append(row)
+        return results
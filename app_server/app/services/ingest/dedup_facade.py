@@ -0,0 +1,123 @@
+# services/ingest/dedup_facade.py
+# Duplikat-Erkennung vor dem Ingest: SHA-256 der PDF + Konfigurations-Fingerprint
+# (Chunking-Parameter, Parent-Strategie, Embedding-Alias/Modell/Dim/Normalisierung) -> vorhandene docid.
+# - Treffer nur, wenn Quittung (mit chunk_manifest) und die Chunks in Chroma noch existieren
+#   und die Arbeitsart gleich ist (sonst andere Collections -> regulärer Ingest)
+# - gleiche Metadaten: vorhandene Quittung wird zurückgegeben (kein Parsen/Embedding/Upsert)
+# - geänderte Metadaten: nur Chunk-Metadaten in Chroma + Quittung/Index aktualisieren
+# - Abschalten: retrieval.ingest_dedup = false (model_config.json)
+
+from typing import Any, Dict, Optional
+import hashlib
+import json
+
+from modules.logging_setup import get_logger
+from app.modules.chroma_client import ChromaWrapper
+from modules.ingest import manifest as mf
+from modules.ingest.metadata_ops import enrich_chunk_metadata
+from services.state_facade import StateFacade
+
+log = get_logger("ingest.dedup_facade")
+
+_SAMPLE_IDS = 3  # Stichprobe: sind die Chunks der Quittung noch in Chroma?
+
+
+def config_fingerprint(retrieval: Dict[str, Any], emb_cfg: Dict[str, Any]) -> Dict[str, Any]:
+    """Parameter, bei deren Änderung ein erneuter Ingest andere Chunks/Vektoren liefert."""
+    return {
+        "child_size": int(retrieval.get("child_chunk_size", 1200)),
+        "child_overlap": int(retrieval.get("child_chunk_overlap", 200)),
+        "parent_group_size": int(retrieval.get("parent_group_size", 3)),
+        "parent_group_overlap": int(retrieval.get("parent_group_overlap", 1)),
+        "parent_vector_strategy": str(retrieval.get("parent_vector_strategy") or "embed").strip().lower(),
+        "embedding_alias": (emb_cfg or {}).get("alias"),
+        "embedding_model": (emb_cfg or {}).get("model"),
+        "embedding_dim": (emb_cfg or {}).get("dim"),
+        "embedding_normalize": (emb_cfg or {}).get("normalize"),
+    }
+
+
+def dedup_key(filehash: str, fingerprint: Dict[str, Any]) -> str:
+    raw = json.dumps({"filehash": filehash, **fingerprint}, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _business(md: Dict[str, Any]) -> Dict[str, Any]:
+    """Fachliche Metadaten ohne docid (die docid des Duplikats bleibt die vorhandene)."""
+    return {k: v for k, v in (md or {}).items() if k != "docid"}
+
+
+class DedupIngestFacade:
+    def __init__(self, state: StateFacade, chroma: ChromaWrapper):
+        self.state = state
+        self.chroma = chroma
+
+    def _alive(self, receipt: Dict[str, Any]) -> bool:
+        man = receipt.get("chunk_manifest") or {}
+        col = (man.get("collections") or {}).get("children")
+        sample = list(man.get("children") or {})[:_SAMPLE_IDS]
+        if not col or not sample:
+            return False
+        try:
+            return len(self.chroma.existing_ids(col, sample)) == len(sample)
+        except Exception as e:
+            log.warning("dedup_chroma_check_failed", extra={"extra_fields": {"collection": col, "err": str(e)}})
+            return False
+
+    def find(self, key: str, filehash: str) -> Optional[Dict[str, Any]]:
+        """Vorhandene Quittung zu key – oder None (veraltete Einträge werden entfernt)."""
+        entry = self.state.find_dedup(key)
+        if not entry:
+            return None
+        receipt = self.state.get_receipt(entry.get("docid") or "")
+        if (not receipt or receipt.get("filehash") != filehash or receipt.get("dedup_key") != key
+                or not self._alive(receipt)):
+            log.info("dedup_entry_stale", extra={"extra_fields": {"docid": entry.get("docid")}})
+            self.state.forget_dedup(key)
+            return None
+        return receipt
+
+    def reuse(self, receipt: Dict[str, Any], final_md: Dict[str, Any], confidence_md: Dict[str, Any],
+              source_md: Any, requested_docid: str) -> Optional[Dict[str, Any]]:
+        """Vorhandenen Ingest wiederverwenden; None, wenn die Arbeitsart abweicht (andere Collections)."""
+        docid = receipt["docid"]
+        if (final_md.get("work_type") or "") != (receipt.get("work_type") or ""):
+            log.info("dedup_work_type_changed", extra={"extra_fields": {
+                "docid": docid, "old": receipt.get("work_type"), "new": final_md.get("work_type")
+            }})
+            return None
+        new_md = _business(final_md)
+        changed = new_md != _business(receipt.get("metadata") or {})
+        if changed:
+            try:
+                receipt["chunk_manifest"] = self._repoint(receipt["chunk_manifest"], new_md)
+            except Exception as e:  # Metadaten-Update fehlgeschlagen -> regulärer Ingest
+                log.warning("dedup_repoint_failed", extra={"extra_fields": {"docid": docid, "err": str(e)}})
+                return None
+            receipt.update({"metadata": {**new_md, "docid": docid} if "docid" in final_md else new_md,
+                            "confidence": confidence_md, "sources": source_md})
+        receipt["dedup"] = {"requested_docid": requested_docid, "action": "metadata_updated" if changed else "reused"}
+        log.info("dedup_hit", extra={"extra_fields": {
+            "docid": docid, "requested_docid": requested_docid, "metadata_changed": changed
+        }})
+        return receipt
+
+    def _repoint(self, manifest: Dict[str, Any], new_md: Dict[str, Any]) -> Dict[str, Any]:
+        """Fachliche Felder aller Chunks in Chroma überschreiben (kein Embedding) + Manifest-Hashes anpassen.
+        Metadaten wie im Ingest über enrich_chunk_metadata (sanitisiert, technische Felder der Chunks bleiben)."""
+        out = dict(manifest)
+        for kind, ctx in (("children", "child"), ("parents", "parent")):
+            col = (manifest.get("collections") or {}).get(kind)
+            entries = dict(manifest.get(kind) or {})
+            stored = self.chroma.get_metadatas(col, list(entries)) if col and entries else {}
+            # emb_cfg leer: die gespeicherten technischen Felder (embedding_*) bleiben unverändert
+            mds = {i: enrich_chunk_metadata(m, ctx, new_md, {}) for i, m in stored.items()}
+            self.chroma.update_metadata(col, list(mds), list(mds.values()))
+            out[kind] = {i: {"h": e.get("h"), "m": mf.metadata_hash(mds[i]) if i in mds else e.get("m")}
+                         for i, e in entries.items()}
+        return out
+
+    def register(self, receipt: Dict[str, Any]) -> None:
+        key, filehash = receipt.get("dedup_key"), receipt.get("filehash")
+        if key and filehash and receipt.get("chunk_manifest"):
+            self.state.register_dedup(key, receipt["docid"], filehash)
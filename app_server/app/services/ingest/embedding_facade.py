@@ -1,6 +1,7 @@
 # services/ingest/embedding_facade.py
 from typing import Dict, Any, List
 from modules.embeddings_factory import EmbeddingsFactory
+from modules.ingest.embed_ops import PARENT_VECTOR_STRATEGIES, pool_parent_vectors, embed_document_with_fallback
 from modules.logging_setup import get_logger
 
 log = get_logger("embedding_ingest_facade")
@@ -10,12 +11,17 @@ class EmbeddingIngestFacade:
         self.app_cfg = app_cfg
         self.model_reg = model_reg
 
-    def _resolve_embedding_cfg(self, retrieval_cfg: Dict[str, Any]) -> Dict[str, Any]:
-        alias = (
+    def _primary_alias(self, retrieval_cfg: Dict[str, Any]) -> str:
+        return (
             retrieval_cfg.get("embedding_alias_default")
             or retrieval_cfg.get("embedding_alias")
             or "default"
         )
+
+    def _resolve_embedding_cfg(self, retrieval_cfg: Dict[str, Any]) -> Dict[str, Any]:
+        return self._embedding_cfg_for(self._primary_alias(retrieval_cfg))
+
+    def _embedding_cfg_for(self, alias: str) -> Dict[str, Any]:
         cfg = getattr(self.model_reg, "_cfg", {}) or {}
         emb_list = cfg.get("embeddings", []) or []
         emb_cfg = next((e for e in emb_list if e.get("alias") == alias), None)
@@ -30,10 +36,15 @@ class EmbeddingIngestFacade:
         damit Längen mit IDs/Vektoren für den Upsert übereinstimmen.
         Rückgabe liefert zusätzliche technische Metadaten + IDs/Vektoren der Parents.
         """
-        emb_cfg = self._resolve_embedding_cfg(retrieval_cfg)
-
-        # WICHTIG: EmbeddingsFactory erwartet app_cfg, NICHT ModelRegistry
-        fac = EmbeddingsFactory(self.app_cfg, emb_cfg)
+        primary = self._primary_alias(retrieval_cfg)
+        self._embedding_cfg_for(primary)  # fehlender Primär-Alias bleibt ein harter Fehler
+        aliases = [primary] + list(retrieval_cfg.get("embedding_alias_fallbacks") or [])
+        batch_size = int(retrieval_cfg.get("embedding_batch_size", 16))
+        max_in_flight = int(retrieval_cfg.get("embedding_max_in_flight", 4))
+        strategy = str(retrieval_cfg.get("parent_vector_strategy") or "embed").strip().lower()
+        if strategy not in PARENT_VECTOR_STRATEGIES:
+            log.warning("parent_vector_strategy_unknown", extra={"extra_fields": {"strategy": strategy}})
+            strategy = "embed"
 
         # --- Parents vorbereiten ---
         p_docs: List[str] = list(parents.get("documents") or [])
@@ -43,6 +54,8 @@ class EmbeddingIngestFacade:
         kept_docs: List[str] = []
         kept_mds:  List[Dict[str, Any]] = []
         kept_ids:  List[str] = []
+        kept_raw:  List[Dict[str, Any]] = []
+        p_raw: List[Dict[str, Any]] = list(parents.get("raw") or [])
 
         for i, t in enumerate(p_docs):
             txt = (t or "").strip()
@@ -52,24 +65,45 @@ class EmbeddingIngestFacade:
             kept_docs.append(txt)
             kept_mds.append(p_mds[i] if i < len(p_mds) else {})
             kept_ids.append(p_ids[i] if i < len(p_ids) else f"p_{i:04d}")
-
-        # Embeddings für Parents
-        vectors_parent: List[List[float]] = fac.embed_robust(kept_docs) if kept_docs else []
+            kept_raw.append(p_raw[i] if i < len(p_raw) else {})
 
         # Parents in-place angleichen (damit Upsert-Längen stimmen)
         parents["documents"]  = kept_docs
         parents["metadatas"]  = kept_mds
+        parents["raw"]        = kept_raw
         # Hinweis: Upsert nimmt die Parent-IDs aus emb_res["filtered_ids_parent"],
         # daher müssen wir parents["ids"] nicht zwingend überschreiben.
 
-        # --- Children optional (werden bei dir ohne Embeddings upserted) ---
+        # --- Children (Vektoren werden beim Upsert mitgegeben) ---
         c_docs: List[str] = list(children.get("documents") or [])
-        try:
-            children["embeddings"] = fac.embed_robust(c_docs) if c_docs else []
-        except Exception as e:
-            # nicht kritisch für Upsert; nur Loggen
-            log.warning("child_embed_failed", extra={"extra_fields": {"err": str(e)}})
-            children["embeddings"] = []
+
+        # Bei pool_*: nur Children einbetten, Parent-Vektoren daraus poolen (keine Parent-Requests)
+        to_embed = c_docs if strategy != "embed" else kept_docs + c_docs
+        n_p = 0 if strategy != "embed" else len(kept_docs)
+
+        # Parents + Children in EINEM Aufruf: alle Requests teilen sich den Pool (max_in_flight).
+        # Fehlgeschlagene Einträge werden einzeln wiederholt; Alias-Wechsel nur für das ganze Dokument
+        # (retrieval.embedding_alias_switch_ratio), damit alle Vektoren im selben Raum liegen.
+        res = embed_document_with_fallback(self.app_cfg, self._embedding_cfg_for, aliases, to_embed, retrieval_cfg)
+        emb_cfg: Dict[str, Any] = res["emb_cfg"] or self._embedding_cfg_for(primary)
+        fac = res["factory"] or EmbeddingsFactory(self.app_cfg, emb_cfg)
+        vectors_all = res["vectors"]
+        children["embeddings"] = vectors_all[n_p:]
+        if strategy == "embed":
+            vectors_parent: List[List[float]] = vectors_all[:n_p]
+        else:
+            vectors_parent = pool_parent_vectors(
+                kept_raw, children.get("metadatas") or [], c_docs, children["embeddings"],
+                weighted=(strategy == "pool_weighted"), normalize=fac.normalize,
+            )
+        c_ids: List[str] = list(children.get("ids") or [])
+        failed_parent_ids = [kept_ids[i] for i, v in enumerate(vectors_parent) if not v]
+        failed_child_ids = [c_ids[i] for i, v in enumerate(children["embeddings"]) if not v and i < len(c_ids)]
+        if failed_parent_ids or failed_child_ids:
+            log.warning("embeddings_failed_items", extra={"extra_fields": {
+                "parents_failed": len(failed_parent_ids), "children_failed": len(failed_child_ids),
+                "parent_ids": failed_parent_ids[:10], "child_ids": failed_child_ids[:10],
+            }})
 
         log.info(
             "embeddings_built",
@@ -77,6 +111,11 @@ class EmbeddingIngestFacade:
                 "alias": emb_cfg.get("alias"),
                 "parents_docs": len(kept_docs),
                 "children_docs": len(c_docs),
+                "batch_size": batch_size,
+                "max_in_flight": max_in_flight,
+                "parent_vector_strategy": strategy,
+                "aliases_tried": res["tried"],
+                "failure_ratio": round(res["failure_ratio"], 4),
             }}
         )
 
@@ -87,4 +126,8 @@ class EmbeddingIngestFacade:
             "normalize": emb_cfg.get("normalize"),
             "filtered_ids_parent": kept_ids,
             "vectors_parent": vectors_parent,
+            "parent_vector_strategy": strategy,
+            "failed_parent_ids": failed_parent_ids,
+            "failed_child_ids": failed_child_ids,
+            "aliases_tried": res["tried"],
         }
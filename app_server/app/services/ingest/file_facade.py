@@ -1,6 +1,6 @@
 # services/ingest/file_facade.py
 # Verantwortlich für: PDF speichern & hashen, Metadaten-JSON persistieren
-from typing import Dict, Any
+from typing import Dict, Any, Union
 import os
 from modules.logging_setup import get_logger
 from modules.ingest.file_ops import save_upload_and_hash, save_metadata_json
@@ -19,7 +19,7 @@ class FileIngestFacade:
 
     def save(
         self,
-        pdf_bytes: bytes,
+        pdf_source: Union[bytes, str],
         filename: str,
         docid: str,
         final_md: Dict[str, Any],
@@ -27,7 +27,7 @@ class FileIngestFacade:
         source_md: str,
     ) -> Dict[str, Any]:
         pdf_path, filehash = save_upload_and_hash(
-            pdf_bytes=pdf_bytes,
+            pdf_source=pdf_source,
             uploads_dir=self.uploads_dir,
             docid=docid,
             filename=filename,
@@ -0,0 +1,209 @@
+# services/ingest/incremental_facade.py
+# Inkrementeller Re-Ingest über das Chunk-Manifest der vorherigen Quittung (modules/ingest/manifest.py).
+# - Nur wenn Embedding-Kontext (Alias/Modell/Dim/Normalisierung/Parent-Strategie) und Collections
+#   gleich geblieben sind; sonst vollständiger Ingest (run() liefert None)
+# - new: einbetten + upsert; meta: nur Metadaten-Update (kein Embedding); same: nichts; gone: löschen
+# - Einträge aus dem Manifest, die in Chroma fehlen, gelten als new
+# - Parent-Pooling (pool_*): Child-Vektoren unveränderter Chunks werden aus Chroma gelesen
+# - Fehlerquote der neuen Chunks > embedding_alias_switch_ratio -> None (vollständiger Ingest mit
+#   Alias-Fallback, damit das Dokument in einem Vektorraum bleibt)
+# cleanup(): Aufräumen nach vollständigem Ingest (verschwundene IDs, Altbestand mit Positions-IDs,
+# Collections einer geänderten Arbeitsart – drop_moved(), auch vom Streaming-Pfad genutzt)
+
+from typing import Any, Dict, List, Optional
+
+from modules.logging_setup import get_logger
+from app.modules.chroma_client import ChromaWrapper
+from modules.ingest import manifest as mf
+from modules.ingest.embed_ops import (
+    PARENT_VECTOR_STRATEGIES, pool_parent_vectors, embed_document_with_fallback, retry_settings,
+)
+from modules.ingest.metadata_ops import enrich_chunk_metadata
+from modules.ingest.upsert_ops import _drop_empty_vectors, add_upsert_stats
+
+log = get_logger("ingest.incremental_facade")
+
+
+def classify_present(chroma: ChromaWrapper, old_entries: Dict[str, Any], collection: str, ids: List[str],
+                     docs: List[str], mds: List[Dict[str, Any]]) -> List[str]:
+    """mf.classify + Abgleich mit Chroma: laut Manifest bekannte, aber fehlende IDs gelten als new."""
+    cls = mf.classify(old_entries, ids, docs, mds)
+    known = [i for i, c in zip(ids, cls) if c != "new"]
+    present = chroma.existing_ids(collection, known)
+    missing = [i for i in known if i not in present]
+    if missing:
+        log.warning("incremental_manifest_ids_missing", extra={"extra_fields": {
+            "collection": collection, "missing": len(missing)
+        }})
+    return ["new" if (c != "new" and i not in present) else c for i, c in zip(ids, cls)]
+
+
+class IncrementalIngestFacade:
+    def __init__(self, app_cfg: Dict[str, Any], model_reg, chroma: ChromaWrapper):
+        self.app_cfg = app_cfg
+        self.model_reg = model_reg
+        self.chroma = chroma
+
+    def _embedding_cfg_for(self, alias: str) -> Dict[str, Any]:
+        cfg = getattr(self.model_reg, "_cfg", {}) or {}
+        emb_cfg = next((e for e in (cfg.get("embeddings") or []) if e.get("alias") == alias), None)
+        if not emb_cfg:
+            raise ValueError(f"Embedding-Config für Alias '{alias}' nicht gefunden")
+        return emb_cfg
+
+    def run(self, docid: str, final_md: Dict[str, Any], children: Dict[str, Any], parents: Dict[str, Any],
+            retrieval: Dict[str, Any], old_manifest: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Rückgabe None -> vollständiger Ingest nötig; sonst
+        {collections, counts, emb_cfg, parent_vector_strategy, manifest, delta, upsert, failed_parent_ids,
+         failed_child_ids}
+        """
+        strategy = str(retrieval.get("parent_vector_strategy") or "embed").strip().lower()
+        if strategy not in PARENT_VECTOR_STRATEGIES:
+            strategy = "embed"
+        primary = (retrieval.get("embedding_alias_default") or retrieval.get("embedding_alias") or "default")
+        emb_cfg = self._embedding_cfg_for(primary)
+        ctx = mf.embedding_context(emb_cfg, strategy)
+        work_type = final_md["work_type"]
+        cols = {"parents": f"{work_type}_parents", "children": f"{work_type}_chunks"}
+        if not mf.is_compatible(old_manifest, ctx, cols):
+            log.info("incremental_not_applicable", extra={"extra_fields": {
+                "docid": docid, "has_manifest": bool(old_manifest), "context": ctx
+            }})
+            return None
+
+        c_docs: List[str] = list(children.get("documents") or [])
+        c_ids: List[str] = list(children.get("ids") or [])
+        c_mds = [enrich_chunk_metadata(m, "child", final_md, emb_cfg) for m in (children.get("metadatas") or [])]
+        p_keep = [k for k, t in enumerate(parents.get("documents") or []) if (t or "").strip()]
+        p_docs = [(parents["documents"][k] or "").strip() for k in p_keep]
+        p_ids = [parents["ids"][k] for k in p_keep]
+        p_raw = [(parents.get("raw") or [{}] * len(parents["documents"]))[k] for k in p_keep]
+        p_mds = [enrich_chunk_metadata(parents["metadatas"][k], "parent", final_md, emb_cfg) for k in p_keep]
+
+        c_cls = classify_present(self.chroma, old_manifest["children"], cols["children"], c_ids, c_docs, c_mds)
+        p_cls = classify_present(self.chroma, old_manifest["parents"], cols["parents"], p_ids, p_docs, p_mds)
+        new_c = [k for k, c in enumerate(c_cls) if c == "new"]
+        new_p = [k for k, c in enumerate(p_cls) if c == "new"]
+
+        # --- nur neue/geänderte Texte einbetten (fester Alias: ein Vektorraum je Dokument) ---
+        texts = [c_docs[k] for k in new_c] + ([p_docs[k] for k in new_p] if strategy == "embed" else [])
+        vecs: List[List[float]] = []
+        if texts:
+            res = embed_document_with_fallback(self.app_cfg, self._embedding_cfg_for, [primary], texts, retrieval)
+            if res["failure_ratio"] > retry_settings(retrieval)["switch_ratio"]:
+                log.warning("incremental_fallback_full", extra={"extra_fields": {
+                    "docid": docid, "failure_ratio": round(res["failure_ratio"], 4), "texts": len(texts)
+                }})
+                return None
+            vecs = res["vectors"]
+        c_new_vecs = {c_ids[k]: v for k, v in zip(new_c, vecs[:len(new_c)])}
+        if strategy == "embed":
+            p_new_vecs = [v for v in vecs[len(new_c):]]
+        else:
+            need = [i for i in c_ids if i not in c_new_vecs]
+            stored = self.chroma.get_embeddings(cols["children"], need) if new_p else {}
+            all_c_vecs = [c_new_vecs.get(i) or stored.get(i) or [] for i in c_ids]
+            p_new_vecs = pool_parent_vectors(
+                [p_raw[k] for k in new_p], c_mds, c_docs, all_c_vecs,
+                weighted=(strategy == "pool_weighted"), normalize=bool(emb_cfg.get("normalize", True)),
+            )
+
+        # --- Chroma: upsert neu, Metadaten-Update, Löschen ---
+        upsert_stats: Dict[str, Dict[str, Any]] = {"parents": {}, "children": {}}
+        d, i, m, v = _drop_empty_vectors([c_docs[k] for k in new_c], [c_ids[k] for k in new_c],
+                                         [c_mds[k] for k in new_c], [c_new_vecs[c_ids[k]] for k in new_c],
+                                         "children", docid)
+        add_upsert_stats(upsert_stats["children"],
+                         self.chroma.upsert(cols["children"], documents=d, metadatas=m, ids=i, embeddings=v)
+                         if i else None)
+        d, i, m, v = _drop_empty_vectors([p_docs[k] for k in new_p], [p_ids[k] for k in new_p],
+                                         [p_mds[k] for k in new_p], p_new_vecs, "parents", docid)
+        add_upsert_stats(upsert_stats["parents"],
+                         self.chroma.upsert(cols["parents"], documents=d, metadatas=m, ids=i, embeddings=v)
+                         if i else None)
+
+        meta_c = [k for k, c in enumerate(c_cls) if c == "meta"]
+        meta_p = [k for k, c in enumerate(p_cls) if c == "meta"]
+        self.chroma.update_metadata(cols["children"], [c_ids[k] for k in meta_c], [c_mds[k] for k in meta_c])
+        self.chroma.update_metadata(cols["parents"], [p_ids[k] for k in meta_p], [p_mds[k] for k in meta_p])
+
+        failed_c = {c_ids[k] for k in new_c if not c_new_vecs.get(c_ids[k])}
+        failed_p = {p_ids[k] for k, v in zip(new_p, p_new_vecs) if not v}
+        gone_c = mf.vanished(old_manifest["children"], c_ids)
+        gone_p = mf.vanished(old_manifest["parents"], p_ids)
+        self.chroma.delete_ids(cols["children"], gone_c)
+        self.chroma.delete_ids(cols["parents"], gone_p)
+
+        keep = lambda ids, docs, mds, failed: [(a, b, c) for a, b, c in zip(ids, docs, mds) if a not in failed]
+        kc, kp = keep(c_ids, c_docs, c_mds, failed_c), keep(p_ids, p_docs, p_mds, failed_p)
+        manifest = mf.build_manifest(
+            ctx, cols,
+            mf.entries([a for a, _, _ in kc], [b for _, b, _ in kc], [c for _, _, c in kc]),
+            mf.entries([a for a, _, _ in kp], [b for _, b, _ in kp], [c for _, _, c in kp]),
+        )
+        delta = {
+            "mode": "incremental",
+            "embedded": {"children": len(new_c), "parents": len(new_p)},
+            "metadata_updated": {"children": len(meta_c), "parents": len(meta_p)},
+            "unchanged": {"children": c_cls.count("same"), "parents": p_cls.count("same")},
+            "deleted": {"children": len(gone_c), "parents": len(gone_p)},
+        }
+        log.info("incremental_ingest_done", extra={"extra_fields": {"docid": docid, **delta}})
+        return {
+            "collections": cols,
+            "counts": {"parents": len(kp), "children": len(kc)},
+            "emb_cfg": emb_cfg,
+            "parent_vector_strategy": strategy,
+            "manifest": manifest,
+            "delta": delta,
+            "upsert": upsert_stats,
+            "failed_parent_ids": sorted(failed_p),
+            "failed_child_ids": sorted(failed_c),
+        }
+
+    @staticmethod
+    def _previous_collections(prev_receipt: Dict[str, Any]) -> Dict[str, str]:
+        old = prev_receipt.get("chunk_manifest") if isinstance(prev_receipt.get("chunk_manifest"), dict) else {}
+        return old.get("collections") or prev_receipt.get("collections") or {}
+
+    def drop_moved(self, docid: str, prev_receipt: Optional[Dict[str, Any]],
+                   collections: Dict[str, str]) -> Dict[str, int]:
+        """Arbeitsart geändert: alle Einträge der docid aus den bisherigen Collections entfernen."""
+        deleted = {"children": 0, "parents": 0}
+        old_cols = self._previous_collections(prev_receipt or {})
+        for kind in deleted:
+            old_col = old_cols.get(kind)
+            if not old_col or old_col == collections.get(kind):
+                continue
+            try:
+                deleted[kind] = self.chroma.delete_stale(old_col, docid, [])
+            except Exception as e:
+                log.warning("reingest_cleanup_failed", extra={"extra_fields": {
+                    "docid": docid, "collection": old_col, "err": str(e)
+                }})
+        return deleted
+
+    def cleanup(self, docid: str, prev_receipt: Optional[Dict[str, Any]], collections: Dict[str, str],
+                keep_children: List[str], keep_parents: List[str]) -> Dict[str, int]:
+        """Nach vollständigem Ingest: Einträge des vorherigen Ingests entfernen, die nicht mehr erzeugt wurden."""
+        if not prev_receipt:
+            return {"children": 0, "parents": 0}
+        deleted = self.drop_moved(docid, prev_receipt, collections)
+        old = prev_receipt.get("chunk_manifest") if isinstance(prev_receipt.get("chunk_manifest"), dict) else None
+        old_cols = self._previous_collections(prev_receipt)
+        for kind, keep in (("children", keep_children), ("parents", keep_parents)):
+            col = collections.get(kind)
+            try:
+                if old and old_cols.get(kind) == col:
+                    deleted[kind] += self.chroma.delete_ids(col, mf.vanished(old.get(kind) or {}, keep))
+                else:
+                    # Altbestand ohne Manifest (Positions-IDs) bzw. neue Collection: über docid-Filter
+                    deleted[kind] += self.chroma.delete_stale(col, docid, keep)
+            except Exception as e:
+                log.warning("reingest_cleanup_failed", extra={"extra_fields": {
+                    "docid": docid, "collection": col, "err": str(e)
+                }})
+        if any(deleted.values()):
+            log.info("reingest_cleanup_done", extra={"extra_fields": {"docid": docid, "deleted": deleted}})
+        return deleted
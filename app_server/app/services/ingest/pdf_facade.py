@@ -1,16 +1,59 @@
 # services/ingest/pdf_facade.py
-# Verantwortlich für: PDF → Volltext
+# Verantwortlich für: PDF → Volltext (über den geteilten pdf_text_cache, ein pypdf-Durchlauf je Datei)
+# + Text-Store neben dem Upload (<uploads_dir>/<filehash>.text.json.gz): beim Ingest geschrieben,
+#   bei Re-Ingest/Re-Chunking zuerst gelesen (kein erneutes Parsen); im Streaming-Ingest seitenweise
+# Konfiguration (app_config.json): "text_store": {"enabled": true}
+from typing import Any, Dict, Iterator, Optional, Union
+import os
 from modules.logging_setup import get_logger
-from modules.ingest.pdf_ops import read_all_text
+from modules.ingest.file_ops import load_text_store, save_text_store, text_store_path
+from app.modules.pdf_text_cache import get_pdf_text_cache, iter_pages, parsed_pdf, full_text
 
 log = get_logger("ingest.pdf_facade")
 
 class PDFIngestFacade:
     """Kapselt die PDF-Text-Extraktion."""
 
-    def extract(self, pdf_bytes: bytes) -> str:
-        full_text = read_all_text(pdf_bytes)
-        if not full_text:
+    def __init__(self, app_cfg: Optional[Dict[str, Any]] = None) -> None:
+        self.app_cfg = app_cfg or {}
+        self.uploads_dir = (self.app_cfg.get("paths") or {}).get("uploads_dir")
+        self.use_store = bool(self.uploads_dir) and bool((self.app_cfg.get("text_store") or {}).get("enabled", True))
+
+    def stored(self, sha256: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Dokument aus dem Text-Store (und danach im pdf_text_cache) – oder None."""
+        if not (self.use_store and sha256):
+            return None
+        doc = load_text_store(self.uploads_dir, sha256)
+        cache = get_pdf_text_cache(self.app_cfg) if doc is not None else None
+        if cache is not None:
+            cache.put(doc)
+        return doc
+
+    def document(self, pdf_source: Any, sha256: Optional[str] = None) -> Dict[str, Any]:
+        """Seitentexte + Offsets (siehe app/modules/pdf_text_cache.py); pdf_source = PDF-Bytes oder Pfad.
+        Reihenfolge: Text-Store → pdf_text_cache → pypdf; das Ergebnis landet im Text-Store."""
+        doc = self.stored(sha256)
+        if doc is None:
+            doc = parsed_pdf(self.app_cfg, pdf_source, sha256)
+            if self.use_store:
+                save_text_store(self.uploads_dir, doc)
+        return doc
+
+    def pages(self, pdf_path: str, sha256: str) -> Iterator[str]:
+        """Seitentexte für den Streaming-Ingest (Text-Store, sonst seitenweise per pypdf und dabei
+        Seite für Seite in den Text-Store geschrieben – nichts wird über das Dokument gesammelt)."""
+        doc = self.stored(sha256)
+        if doc is not None:
+            yield from doc["pages"]
+            return
+        store = text_store_path(self.uploads_dir, sha256) if (self.use_store and sha256) else None
+        yield from iter_pages(self.app_cfg, pdf_path, sha256, write_to=[store] if store else ())
+        if store and os.path.isfile(store):
+            log.info("text_store_saved", extra={"extra_fields": {"path": store, "streaming": True}})
+
+    def extract(self, pdf_source: Union[bytes, str], sha256: Optional[str] = None) -> str:
+        full = full_text(self.document(pdf_source, sha256))
+        if not full:
             raise ValueError("PDF-Text leer.")
-        log.info("ingest_pdf_read", extra={"extra_fields": {"chars": len(full_text)}})
-        return full_text
+        log.info("ingest_pdf_read", extra={"extra_fields": {"chars": len(full)}})
+        return full
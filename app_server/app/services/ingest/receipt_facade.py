@@ -22,6 +22,7 @@ class ReceiptIngestFacade:
         return {
             "docid": docid,
             "filename": file_info.get("pdf_path"),
+            "filehash": file_info.get("filehash"),
             "work_type": final_md.get("work_type"),
             "collections": collections,
             "counts": counts,
@@ -0,0 +1,284 @@
+# services/ingest/stream_facade.py
+# Streaming-Ingest: Seiten als Generator → inkrementelles Chunking/Parent-Grouping →
+# Embedding + Upsert fensterweise (retrieval.stream_window_children).
+# Die drei Stufen (Extraktion/Chunking, Embedding, Upsert) laufen als StagePipeline überlappend
+# mit begrenzten Queues (retrieval.stream_pipelined, stream_queue_size).
+# Spitzen-Speicher hängt von der Fenstergröße ab, nicht von der Dokumentgröße.
+# Ergebnis (Chunks, IDs, Parents) ist identisch zum Batch-Pfad (ChunkIngestFacade).
+# Alias-Fallback: Entscheidung im ersten Fenster; danach bleibt der Alias fix (ein Vektorraum
+# je Dokument) – überschreitet ein späteres Fenster die Fehlerquote, bricht der Ingest ab.
+# Inhalts-IDs (modules/ingest/manifest.py) wie im Batch-Pfad; mit kompatiblem Manifest des vorherigen
+# Ingests (old_manifest) werden nur neue/geänderte Chunks eingebettet, geänderte Metadaten per Update
+# geschrieben (Alias dann von Beginn an fest).
+
+from typing import Any, Dict, Iterable, List, Optional, Union
+import os
+
+from modules.logging_setup import get_logger
+from app.modules.chroma_client import ChromaWrapper
+from modules.embeddings_factory import EmbeddingsFactory
+from modules.ingest.pdf_ops import iter_page_texts
+from modules.ingest.streaming import IncrementalChunker, IncrementalParentGrouper
+from modules.ingest.pipeline import StagePipeline
+from modules.ingest.chunk_ops import child_metadata, parent_metadata
+from modules.ingest.embed_ops import (
+    PARENT_VECTOR_STRATEGIES, pool_parent_vectors, embed_document_with_fallback, retry_settings,
+)
+from modules.ingest.upsert_ops import _drop_empty_vectors, add_upsert_stats
+from modules.ingest.metadata_ops import enrich_chunk_metadata
+from modules.ingest import manifest as mf
+from services.ingest.incremental_facade import classify_present
+
+log = get_logger("ingest.stream_facade")
+
+MIN_CHILD_CHARS = 20  # wie filter_chunks_minlen im Batch-Pfad
+
+
+class StreamingIngestFacade:
+    def __init__(self, app_cfg: Dict[str, Any], model_reg, chroma: ChromaWrapper):
+        self.app_cfg = app_cfg
+        self.model_reg = model_reg
+        self.chroma = chroma
+
+    def _embedding_cfg_for(self, alias: str) -> Dict[str, Any]:
+        cfg = getattr(self.model_reg, "_cfg", {}) or {}
+        emb_cfg = next((e for e in (cfg.get("embeddings") or []) if e.get("alias") == alias), None)
+        if not emb_cfg:
+            raise ValueError(f"Embedding-Config für Alias '{alias}' nicht gefunden")
+        return emb_cfg
+
+    def run(self, pdf_source: Union[bytes, str, Iterable[str]], docid: str, final_md: Dict[str, Any],
+            source_file: str, retrieval: Dict[str, Any],
+            old_manifest: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Führt Extraktion → Chunking → Embedding → Upsert fensterweise aus.
+        pdf_source: PDF-Bytes, Dateipfad oder bereits ein Iterable von Seitentexten (pdf_text_cache.iter_pages).
+        old_manifest: Chunk-Manifest der vorherigen Quittung (inkrementeller Re-Ingest, falls kompatibel).
+        Rückgabe: {collections, counts, alias_used, model, dim, normalize, parent_vector_strategy,
+                   failed_parent_ids, failed_child_ids, windows, stale_deleted, manifest, reingest}
+        """
+        source_file = os.path.basename(source_file)
+        window = max(1, int(retrieval.get("stream_window_children", 128)))
+        strategy = str(retrieval.get("parent_vector_strategy") or "embed").strip().lower()
+        if strategy not in PARENT_VECTOR_STRATEGIES:
+            strategy = "embed"
+        primary = (retrieval.get("embedding_alias_default") or retrieval.get("embedding_alias") or "default")
+        self._embedding_cfg_for(primary)
+        aliases = [primary] + list(retrieval.get("embedding_alias_fallbacks") or [])
+        rs = retry_settings(retrieval)
+        batch_size = int(retrieval.get("embedding_batch_size", 16))
+        max_in_flight = int(retrieval.get("embedding_max_in_flight", 4))
+
+        work_type = final_md["work_type"]
+        parents_col, chunks_col = f"{work_type}_parents", f"{work_type}_chunks"
+
+        chunker = IncrementalChunker(int(retrieval.get("child_chunk_size", 1200)),
+                                     int(retrieval.get("child_chunk_overlap", 200)))
+        grouper = IncrementalParentGrouper(int(retrieval.get("parent_group_size", 3)),
+                                           int(retrieval.get("parent_group_overlap", 1)))
+
+        st: Dict[str, Any] = {
+            "fac": None, "emb_cfg": None, "alias": None, "tried": [],
+            "vec_cache": {},                               # chunk_index -> (text, vec) für Pooling
+            "ids_c": set(), "ids_p": set(),                # vorhandene IDs (Stale-Löschung)
+            "man_c": {}, "man_p": {},                      # Manifest-Einträge
+            "failed_c": [], "failed_p": [], "windows": 0,
+            "delta": {k: {"children": 0, "parents": 0} for k in ("embedded", "metadata_updated", "unchanged")},
+            "upsert": {"children": {}, "parents": {}},     # Summe der ChromaWrapper.upsert-Ergebnisse
+        }
+
+        # Inkrementell nur mit kompatiblem Manifest: Alias dann von Beginn an fest (Primär-Alias)
+        primary_cfg = self._embedding_cfg_for(primary)
+        incremental = mf.is_compatible(old_manifest, mf.embedding_context(primary_cfg, strategy),
+                                       {"parents": parents_col, "children": chunks_col})
+        if incremental:
+            st.update({"emb_cfg": primary_cfg, "fac": EmbeddingsFactory(self.app_cfg, primary_cfg),
+                       "alias": primary, "tried": [primary]})
+        ids_c, ids_p = mf.ChunkIdAssigner(docid, "c"), mf.ChunkIdAssigner(docid, "p")
+
+        def _describe(w: Dict[str, Any]) -> None:
+            """Metadaten eines Fensters (Alias muss feststehen)."""
+            w["c_mds"] = [enrich_chunk_metadata(child_metadata(docid, final_md, source_file, k["index"], k["id"]),
+                                                "child", final_md, st["emb_cfg"]) for k in w["children"]]
+            w["p_mds"] = [enrich_chunk_metadata(parent_metadata(docid, final_md, source_file, p),
+                                                "parent", final_md, st["emb_cfg"]) for p in w["parents"]]
+
+        def _embed(texts: List[str], wno: int) -> List[List[float]]:
+            if st["fac"] is None:
+                res = embed_document_with_fallback(self.app_cfg, self._embedding_cfg_for, aliases, texts, retrieval)
+                st["emb_cfg"] = res["emb_cfg"] or self._embedding_cfg_for(primary)
+                st["fac"] = res["factory"] or EmbeddingsFactory(self.app_cfg, st["emb_cfg"])
+                st["alias"], st["tried"] = res["alias"], res["tried"]
+                return res["vectors"]
+            vecs = st["fac"].embed_with_retry(texts, batch_size=batch_size, max_in_flight=max_in_flight,
+                                              retries=rs["retries"], backoff_seconds=rs["backoff_seconds"])
+            failed = sum(1 for v in vecs if not v)
+            if texts and failed / len(texts) > rs["switch_ratio"]:
+                raise RuntimeError(
+                    f"Streaming-Ingest abgebrochen: Fehlerquote {failed}/{len(texts)} in Fenster "
+                    f"{wno} (Alias '{st['alias']}'); Alias-Wechsel mitten im Dokument nicht möglich."
+                )
+            return vecs
+
+        # --- Stufe 1 (Quelle): Seiten → Chunks → Parent-Gruppen → Fenster ---
+        def _windows():
+            kids: List[Dict[str, Any]] = []
+            pars: List[Dict[str, Any]] = []
+            wno = 0
+
+            def _cut():
+                nonlocal kids, pars, wno
+                wno += 1
+                # keep: Child-Indizes, die künftige Parents noch zum Pooling brauchen
+                w = {"no": wno, "children": kids, "parents": pars, "keep": set(grouper.pending_indices)}
+                kids, pars = [], []
+                return w
+
+            def _parents(ps: List[Dict[str, Any]]) -> None:
+                for p in ps:
+                    p["id"] = ids_p.next_id(p["text"])
+                    pars.append(p)
+
+            def _on_chunk(c: Dict[str, Any]):
+                if len((c["text"] or "").strip()) < MIN_CHILD_CHARS:
+                    return None
+                c["id"] = ids_c.next_id(c["text"])
+                kids.append(c)
+                _parents(grouper.add({"text": c["text"], "index": c["index"]}))
+                return _cut() if len(kids) >= window else None
+
+            pages = iter_page_texts(pdf_source) if isinstance(pdf_source, (bytes, bytearray, str)) else pdf_source
+            for n, page in enumerate(pages):
+                for c in chunker.feed(page if n == 0 else "\n" + page):
+                    w = _on_chunk(c)
+                    if w:
+                        yield w
+            for c in chunker.finish():
+                w = _on_chunk(c)
+                if w:
+                    yield w
+            _parents(grouper.finish())
+            if kids or pars:
+                yield _cut()
+
+        # --- Stufe 2: Klassifikation (inkrementell) + Embedding (Children + ggf. Parents) bzw. Pooling ---
+        def _embed_stage(w: Dict[str, Any]) -> Dict[str, Any]:
+            kids, pars = w["children"], w["parents"]
+            if incremental:
+                _describe(w)
+                w["c_cls"] = classify_present(self.chroma, old_manifest["children"], chunks_col,
+                                              [k["id"] for k in kids], [k["text"] for k in kids], w["c_mds"])
+                w["p_cls"] = classify_present(self.chroma, old_manifest["parents"], parents_col,
+                                              [p["id"] for p in pars], [p["text"] for p in pars], w["p_mds"])
+            else:
+                w["c_cls"], w["p_cls"] = ["new"] * len(kids), ["new"] * len(pars)
+            new_k = [k for k, c in zip(kids, w["c_cls"]) if c == "new"]
+            new_p = [p for p, c in zip(pars, w["p_cls"]) if c == "new"]
+            texts = [k["text"] for k in new_k] + ([p["text"] for p in new_p] if strategy == "embed" else [])
+            vecs = _embed(texts, w["no"]) if texts else []
+            if not incremental:
+                _describe(w)
+            new_vecs = iter(vecs[:len(new_k)])
+            stored = {}
+            if strategy != "embed" and len(new_k) < len(kids):
+                # unveränderte Children: gespeicherte Vektoren für das Pooling neuer Parents
+                stored = self.chroma.get_embeddings(chunks_col, [k["id"] for k, c in zip(kids, w["c_cls"])
+                                                                 if c != "new"])
+            w["c_vecs"] = [next(new_vecs) if c == "new" else stored.get(k["id"], [])
+                           for k, c in zip(kids, w["c_cls"])]
+            for k, v in zip(kids, w["c_vecs"]):
+                st["vec_cache"][k["index"]] = (k["text"], v)
+            if strategy == "embed":
+                p_new = iter(vecs[len(new_k):])
+            else:
+                idxs = sorted(st["vec_cache"])
+                p_new = iter(pool_parent_vectors(
+                    new_p, [{"chunk_index": i} for i in idxs], [st["vec_cache"][i][0] for i in idxs],
+                    [st["vec_cache"][i][1] for i in idxs],
+                    weighted=(strategy == "pool_weighted"),
+                    normalize=bool(st["fac"] and st["fac"].normalize),
+                ))
+            w["p_vecs"] = [next(p_new) if c == "new" else None for c in w["p_cls"]]
+            # nur Child-Vektoren behalten, die künftige Parents noch brauchen
+            st["vec_cache"] = {ci: tv for ci, tv in st["vec_cache"].items() if ci in w["keep"]}
+            return w
+
+        # --- Stufe 3: Upsert (neu) bzw. Metadaten-Update (geändert) ---
+        def _write(kind: str, col: str, items: List[Dict[str, Any]], mds: List[Dict[str, Any]],
+                   cls: List[str], vecs: List[Any]) -> None:
+            ids = [x["id"] for x in items]
+            failed = st["failed_c"] if kind == "children" else st["failed_p"]
+            present = st["ids_c"] if kind == "children" else st["ids_p"]
+            man = st["man_c"] if kind == "children" else st["man_p"]
+            new = [n for n, c in enumerate(cls) if c == "new"]
+            failed.extend(ids[n] for n in new if not vecs[n])
+            d, i, m, v = _drop_empty_vectors([items[n]["text"] for n in new], [ids[n] for n in new],
+                                             [mds[n] for n in new], [vecs[n] for n in new], kind, docid)
+            add_upsert_stats(st["upsert"][kind],
+                             self.chroma.upsert(col, documents=d, metadatas=m, ids=i, embeddings=v) if i else None)
+            meta = [n for n, c in enumerate(cls) if c == "meta"]
+            self.chroma.update_metadata(col, [ids[n] for n in meta], [mds[n] for n in meta])
+            written = set(i) | {ids[n] for n, c in enumerate(cls) if c != "new"}
+            present.update(written)
+            keep = [n for n in range(len(ids)) if ids[n] in written]
+            man.update(mf.entries([ids[n] for n in keep], [items[n]["text"] for n in keep], [mds[n] for n in keep]))
+            st["delta"]["embedded"][kind] += len(new)
+            st["delta"]["metadata_updated"][kind] += len(meta)
+            st["delta"]["unchanged"][kind] += cls.count("same")
+
+        def _upsert_stage(w: Dict[str, Any]) -> int:
+            _write("children", chunks_col, w["children"], w["c_mds"], w["c_cls"], w["c_vecs"])
+            _write("parents", parents_col, w["parents"], w["p_mds"], w["p_cls"], w["p_vecs"])
+            st["windows"] += 1
+            log.info("stream_window_upserted", extra={"extra_fields": {
+                "docid": docid, "window": w["no"], "children": len(w["children"]), "parents": len(w["parents"]),
+                "children_total": len(st["ids_c"]), "parents_total": len(st["ids_p"]),
+            }})
+            return w["no"]
+
+        pipe = StagePipeline(
+            f"ingest-{docid}",
+            [("embed", _embed_stage), ("upsert", _upsert_stage)],
+            queue_size=int(retrieval.get("stream_queue_size", 2)),
+            parallel=bool(retrieval.get("stream_pipelined", True)),
+        )
+        pipe.run(_windows())
+
+        if not st["ids_c"] and not st["failed_c"]:
+            raise ValueError("Keine Children nach Filterung.")
+
+        # Reste eines früheren (längeren) Ingests derselben docid entfernen
+        stale = {"parents": 0, "children": 0}
+        try:
+            stale["children"] = self.chroma.delete_stale(chunks_col, docid, st["ids_c"])
+            stale["parents"] = self.chroma.delete_stale(parents_col, docid, st["ids_p"])
+        except Exception as e:
+            log.warning("stream_stale_delete_failed", extra={"extra_fields": {"docid": docid, "err": str(e)}})
+
+        emb_cfg = st["emb_cfg"] or {}
+        collections = {"parents": parents_col, "children": chunks_col}
+        manifest = mf.build_manifest(mf.embedding_context(emb_cfg, strategy), collections, st["man_c"], st["man_p"])
+        reingest = {"mode": "incremental" if incremental else "full", **st["delta"], "deleted": stale}
+        out = {
+            "collections": collections,
+            "counts": {"parents": len(st["ids_p"]), "children": len(st["ids_c"])},
+            "alias_used": st["alias"],
+            "aliases_tried": st["tried"],
+            "model": emb_cfg.get("model"),
+            "dim": emb_cfg.get("dim"),
+            "normalize": emb_cfg.get("normalize"),
+            "parent_vector_strategy": strategy,
+            "failed_parent_ids": st["failed_p"],
+            "failed_child_ids": st["failed_c"],
+            "windows": st["windows"],
+            "stale_deleted": stale,
+            "manifest": manifest,
+            "reingest": reingest,
+            "upsert": st["upsert"],
+        }
+        log.info("stream_ingest_done", extra={"extra_fields": {
+            "docid": docid, "counts": out["counts"], "windows": out["windows"], "stale_deleted": stale,
+            "reingest": reingest["mode"], "embedded": reingest["embedded"],
+            "failed_children": len(st["failed_c"]), "failed_parents": len(st["failed_p"]),
+        }})
+        return out
@@ -2,7 +2,7 @@
 # Verantwortlich für: Upsert in Chroma (Parents + Children)
 from typing import Dict, Any, Tuple
 from modules.logging_setup import get_logger
-from modules.chroma_client import ChromaWrapper
+from app.modules.chroma_client import ChromaWrapper
 from modules.ingest.upsert_ops import upsert_parent_child
 
 log = get_logger("ingest.upsert_facade")
@@ -20,8 +20,9 @@ class UpsertIngestFacade:
         parents: Dict[str, Any],
         emb_res: Dict[str, Any],
         children: Dict[str, Any],
-    ) -> Tuple[Dict[str, str], Dict[str, int]]:
-        collections, counts = upsert_parent_child(
+    ) -> Tuple[Dict[str, str], Dict[str, int], Dict[str, Dict[str, Any]]]:
+        """Rückgabe: (collections, counts, upsert_stats) – siehe upsert_ops.upsert_parent_child."""
+        collections, counts, stats = upsert_parent_child(
             chroma=self.chroma,
             work_type=final_md["work_type"],
             docid=docid,
@@ -32,8 +33,9 @@ class UpsertIngestFacade:
             childs_docs=children["documents"],
             childs_ids=children["ids"],
             childs_mds=children["metadatas"],
+            childs_vectors=children.get("embeddings"),
         )
         log.info("ingest_upsert_done", extra={"extra_fields": {
-            "docid": docid, "collections": collections, "counts": counts
+            "docid": docid, "collections": collections, "counts": counts, "upsert": stats
         }})
-        return collections, counts
+        return collections, counts, stats
@@ -1,12 +1,13 @@
 # services/ingest_facade.py
 # Minimalinvasiv modularisiert: Orchestrierung über Sub-Fassaden (services/ingest/*)
 
-from typing import Dict, Any
+from typing import Callable, Dict, Any, Optional, Tuple, Union
 import os
+import time
 
 from modules.logging_setup import get_logger
 from modules.model_registry import ModelRegistry
-from modules.chroma_client import ChromaWrapper
+from app.modules.chroma_client import ChromaWrapper  # prozessweiter Client-/Handle-Cache (wie Suche)
 from services.state_facade import StateFacade
 
 # Sub-Fassaden
@@ -17,17 +18,39 @@ from services.ingest.chunk_facade import ChunkIngestFacade
 from services.ingest.embedding_facade import EmbeddingIngestFacade
 from services.ingest.upsert_facade import UpsertIngestFacade
 from services.ingest.receipt_facade import ReceiptIngestFacade
+from services.ingest.stream_facade import StreamingIngestFacade
+from services.ingest.incremental_facade import IncrementalIngestFacade
+from services.ingest.dedup_facade import DedupIngestFacade, config_fingerprint, dedup_key
 
-# Sanitizing (Chroma erwartet primitive Typen)
-from modules.ingest.metadata_ops import sanitize_metadata
+# Sanitizing (Chroma erwartet primitive Typen) + Chunk-Manifest (inkrementeller Re-Ingest)
+from modules.ingest.metadata_ops import enrich_chunk_metadata
+from modules.ingest import manifest as mf
+from modules.ingest.file_ops import sha256_file, sha256_hex, save_metadata_json
+from app.modules.pdf_text_cache import full_text as doc_full_text
 
 log = get_logger("ingest_facade")
 
+# Stufen für Fortschrittsmeldungen progress(stage, step, total) – z.B. für die Ingest-Job-Queue
+BATCH_STAGES: Tuple[str, ...] = ("metadata", "file", "extract", "chunk", "embed", "upsert", "receipt")
+STREAMING_STAGES: Tuple[str, ...] = ("metadata", "file", "stream", "receipt")
+
+ProgressFn = Callable[[str, int, int], None]
+
+
+def _notify(progress: Optional[ProgressFn], stages: Tuple[str, ...], stage: str) -> None:
+    """Meldet den Beginn einer Stufe; Fehler im Callback brechen den Ingest nie ab."""
+    if progress is None:
+        return
+    try:
+        progress(stage, stages.index(stage) + 1, len(stages))
+    except Exception as e:
+        log.warning("ingest_progress_callback_failed", extra={"extra_fields": {"stage": stage, "err": str(e)}})
+
 class IngestFacade:
     def __init__(self, app_cfg: Dict[str, Any], model_reg: ModelRegistry):
         self.app_cfg = app_cfg
         self.model_reg = model_reg
-        self.chroma = ChromaWrapper(app_cfg["chroma"])  # REST/HTTP Wrapper laut bestehender Architektur
+        self.chroma = ChromaWrapper(app_cfg["chroma"], model_reg.index())  # REST/HTTP Wrapper laut bestehender Architektur
         self.state = StateFacade(app_cfg["paths"]["app_state_dir"])
         os.makedirs(self.app_cfg["paths"]["uploads_dir"], exist_ok=True)
         log.info("ingest_facade_init", extra={"extra_fields": {"uploads_dir": self.app_cfg["paths"]["uploads_dir"]}})
@@ -35,22 +58,44 @@ class IngestFacade:
         # Sub-Fassaden
         self.meta = MetadataIngestFacade()
         self.files = FileIngestFacade(app_cfg)
-        self.pdf = PDFIngestFacade()
+        self.pdf = PDFIngestFacade(app_cfg)
         self.chunk = ChunkIngestFacade()
         self.embed = EmbeddingIngestFacade(app_cfg, model_reg)
         self.upsert = UpsertIngestFacade(self.chroma)
         self.receipt = ReceiptIngestFacade()
+        self.stream = StreamingIngestFacade(app_cfg, model_reg, self.chroma)
+        self.incremental = IncrementalIngestFacade(app_cfg, model_reg, self.chroma)
+        self.dedup = DedupIngestFacade(self.state, self.chroma)
 
-    def ingest(self, pdf_bytes: bytes, filename: str, metadata_in: Dict[str, Any], docid: str) -> Dict[str, Any]:
+    def ingest(self, pdf_source: Union[bytes, str], filename: str, metadata_in: Dict[str, Any], docid: str,
+               progress: Optional[ProgressFn] = None) -> Dict[str, Any]:
         """Transaction Script: PDF→Metadaten→Chunks→Embeddings→Upsert→Receipt/Index.
         Rückgabe bleibt unverändert (Quittungs-Dict).
+        pdf_source: PDF-Bytes oder Dateipfad (Streaming-Modus: Pfad übergeben, dann liegt die PDF
+        nie vollständig im Speicher).
+        progress(stage, step, total): optional, wird zu Beginn jeder Stufe aufgerufen
+        (BATCH_STAGES bzw. STREAMING_STAGES).
         """
+        # Retrieval-Konfiguration (aus model_config.json via ModelRegistry) bestimmt den Modus
+        retrieval = self.model_reg.retrieval() or {}
+        mode = str(retrieval.get("ingest_mode") or "batch").strip().lower()
+        stages = STREAMING_STAGES if mode == "streaming" else BATCH_STAGES
+
         # 1) Metadaten finalisieren (Regex/Heuristik bereits erfolgt; hier Normalisierung/IDs)
+        _notify(progress, stages, "metadata")
         final_md, confidence_md, source_md = self.meta.prepare(metadata_in, docid)
 
+        # 1b) Bekannte PDF mit gleicher Konfiguration: vorhandenen Ingest wiederverwenden
+        filehash = sha256_file(pdf_source) if isinstance(pdf_source, str) else sha256_hex(pdf_source)
+        dup = self.find_duplicate(filehash, retrieval, final_md, confidence_md, source_md, docid)
+        if dup is not None:
+            _notify(progress, stages, "receipt")
+            return dup
+
         # 2) Datei & Metadaten persistieren (Upload-Verzeichnis + JSONs)
+        _notify(progress, stages, "file")
         file_info = self.files.save(
-            pdf_bytes=pdf_bytes,
+            pdf_source=pdf_source,
             filename=filename,
             docid=docid,
             final_md=final_md,
@@ -58,11 +103,7 @@ class IngestFacade:
             source_md=source_md,
         )
 
-        # 3) PDF-Text extrahieren
-        full_text = self.pdf.extract(pdf_bytes)
-
-        # 4) Retrieval-Konfiguration (aus model_config.json via ModelRegistry)
-        retrieval = self.model_reg.retrieval() or {}
+        # 3) Retrieval-Konfiguration protokollieren
         log.info("retrieval_cfg_active", extra={"extra_fields": {
             "child_size": retrieval.get("child_chunk_size"),
             "child_overlap": retrieval.get("child_chunk_overlap"),
@@ -70,9 +111,20 @@ class IngestFacade:
             "parent_overlap": retrieval.get("parent_group_overlap"),
             "emb_alias": retrieval.get("embedding_alias_default"),
             "emb_fallbacks": retrieval.get("embedding_alias_fallbacks"),
+            "ingest_mode": mode,
         }})
 
+        # 3b) Streaming-Modus: Seiten aus der gespeicherten PDF, fensterweise Embedding + Upsert
+        if mode == "streaming":
+            return self._ingest_streaming(docid, final_md, confidence_md, source_md, file_info, retrieval,
+                                          progress)
+
+        # 4) PDF-Text extrahieren
+        _notify(progress, stages, "extract")
+        full_text = self.pdf.extract(file_info["pdf_path"], file_info["filehash"])  # Pfad: parallele Extraktion
+
         # 5) Children/Parents erstellen
+        _notify(progress, stages, "chunk")
         children, parents = self.chunk.build(
             full_text=full_text,
             final_md=final_md,
@@ -84,7 +136,89 @@ class IngestFacade:
             parent_group_overlap=int(retrieval.get("parent_group_overlap", 1)),
         )
 
+        # 6)–9) Embedding, Upsert, Quittung/Index
+        return self.ingest_parsed(docid, final_md, confidence_md, source_md, file_info,
+                                  children, parents, retrieval, progress=progress)
+
+    def rechunk(self, docid: str, progress: Optional[ProgressFn] = None) -> Dict[str, Any]:
+        """Re-Index einer vorhandenen docid mit der aktuellen Chunking-/Embedding-Konfiguration
+        (model_config.json), z.B. nach Änderung von child_chunk_size/parent_group_size.
+        Text aus dem Text-Store neben dem Upload (Fallback: gespeicherte PDF, danach im Store);
+        Metadaten aus der Quittung; Schritte 5–9 wie ingest() (inkrementell über das Chunk-Manifest)."""
+        prev = self.state.get_receipt(docid)
+        if not prev:
+            raise ValueError(f"Keine Quittung für docid '{docid}'.")
+        retrieval = self.model_reg.retrieval() or {}
+        pdf_path = prev.get("filename") or ""
+        filehash = prev.get("filehash")
+
+        _notify(progress, BATCH_STAGES, "extract")
+        t0 = time.monotonic()
+        doc = self.pdf.stored(filehash)
+        text_source = "store"
+        if doc is None:
+            if not os.path.isfile(pdf_path):
+                raise ValueError(f"Weder Text-Store noch PDF für docid '{docid}' vorhanden ({pdf_path}).")
+            if not filehash:  # Quittungen vor Einführung von filehash
+                with open(pdf_path, "rb") as f:
+                    filehash = sha256_hex(f.read())
+            doc = self.pdf.document(pdf_path, filehash)
+            text_source = "pdf"
+        full = doc_full_text(doc)
+        if not full:
+            raise ValueError("PDF-Text leer.")
+        load_s = round(time.monotonic() - t0, 4)
+        log.info("rechunk_text_loaded", extra={"extra_fields": {
+            "docid": docid, "source": text_source, "seconds": load_s, "chars": len(full)
+        }})
+
+        _notify(progress, BATCH_STAGES, "chunk")
+        final_md = prev.get("metadata") or {}
+        children, parents = self.chunk.build(
+            full_text=full,
+            final_md=final_md,
+            docid=docid,
+            source_file=os.path.basename(pdf_path),
+            child_size=int(retrieval.get("child_chunk_size", 1200)),
+            child_overlap=int(retrieval.get("child_chunk_overlap", 200)),
+            parent_group_size=int(retrieval.get("parent_group_size", 3)),
+            parent_group_overlap=int(retrieval.get("parent_group_overlap", 1)),
+        )
+        file_info = {"pdf_path": pdf_path, "filehash": filehash,
+                     "metadata_json": os.path.join(self.app_cfg["paths"]["uploads_dir"], f"{docid}.metadata.json")}
+        return self.ingest_parsed(docid, final_md, prev.get("confidence") or {}, prev.get("sources") or {},
+                                  file_info, children, parents, retrieval,
+                                  receipt_extra={"rechunk": {"text_source": text_source, "load_seconds": load_s}},
+                                  progress=progress)
+
+    def ingest_parsed(self, docid: str, final_md: Dict[str, Any], confidence_md: Dict[str, Any],
+                      source_md: Dict[str, Any], file_info: Dict[str, Any], children: Dict[str, Any],
+                      parents: Dict[str, Any], retrieval: Dict[str, Any],
+                      receipt_extra: Optional[Dict[str, Any]] = None,
+                      progress: Optional[ProgressFn] = None) -> Dict[str, Any]:
+        """Schritte 6–9 für bereits erzeugte Children/Parents (auch vom Bulk-Ingest genutzt).
+        receipt_extra: zusätzliche Felder für die Quittung (z.B. ingest_mode).
+        Re-Ingest einer vorhandenen docid: inkrementell über das Chunk-Manifest der vorherigen
+        Quittung (nur neue/geänderte Chunks einbetten), sonst vollständig + Aufräumen alter IDs."""
+        prev = self.state.get_receipt(docid)
+
         # 6) Embeddings berechnen (liefert auch Modell-Metadaten zurück)
+        _notify(progress, BATCH_STAGES, "embed")
+        inc = None
+        if prev and prev.get("chunk_manifest"):
+            inc = self.incremental.run(docid, final_md, children, parents, retrieval, prev["chunk_manifest"])
+        if inc is not None:
+            _notify(progress, BATCH_STAGES, "upsert")
+            emb_cfg = inc["emb_cfg"]
+            return self._finish_receipt(
+                docid, final_md, confidence_md, source_md, file_info, parents, children,
+                emb_cfg.get("alias"), emb_cfg.get("model"), emb_cfg.get("dim"), emb_cfg.get("normalize"),
+                inc["collections"], inc["counts"],
+                {**(receipt_extra or {}), "chunk_manifest": inc["manifest"], "reingest": inc["delta"],
+                 "upsert": inc["upsert"]},
+                retrieval, progress,
+            )
+
         emb_res = self.embed.build(retrieval_cfg=retrieval, parents=parents, children=children)
         emb_alias_used = emb_res.get("alias_used")
         emb_model = emb_res.get("model")
@@ -92,22 +226,15 @@ class IngestFacade:
         emb_norm = emb_res.get("normalize")
 
         # 7) Chunk-Metadaten sanitisieren + um fachliche/technische Felder anreichern
-        def _enrich(meta: Dict[str, Any], kind: str) -> Dict[str, Any]:
-            m = sanitize_metadata(meta, kind)
-            # technische Metadaten
-            m["embedding_alias"] = emb_alias_used
-            m["embedding_model"] = emb_model
-            m["embedding_dim"] = emb_dim
-            m["embedding_normalize"] = emb_norm
-            # fachliche Metadaten (Student/Titel/etc.)
-            m.update(final_md)
-            return m
-
-        parents["metadatas"] = [_enrich(m, "parent") for m in (parents.get("metadatas") or [])]
-        children["metadatas"] = [_enrich(m, "child") for m in (children.get("metadatas") or [])]
+        emb_cfg = {"alias": emb_alias_used, "model": emb_model, "dim": emb_dim, "normalize": emb_norm}
+        parents["metadatas"] = [enrich_chunk_metadata(m, "parent", final_md, emb_cfg)
+                                for m in (parents.get("metadatas") or [])]
+        children["metadatas"] = [enrich_chunk_metadata(m, "child", final_md, emb_cfg)
+                                 for m in (children.get("metadatas") or [])]
 
         # 8) Upsert nach Chroma
-        collections, counts = self.upsert.run(
+        _notify(progress, BATCH_STAGES, "upsert")
+        collections, counts, upsert_stats = self.upsert.run(
             docid=docid,
             final_md=final_md,
             parents=parents,
@@ -115,7 +242,37 @@ class IngestFacade:
             children=children,
         )
 
+        # 8b) Manifest (nur erfolgreich geschriebene Chunks) + Reste des vorherigen Ingests entfernen
+        failed_c = set(emb_res.get("failed_child_ids") or []) | set(upsert_stats["children"].get("dropped_ids") or [])
+        failed_p = set(emb_res.get("failed_parent_ids") or []) | set(upsert_stats["parents"].get("dropped_ids") or [])
+        kc = [(i, d, m) for i, d, m in zip(children["ids"], children["documents"], children["metadatas"])
+              if i not in failed_c]
+        kp = [(i, d, m) for i, d, m in zip(emb_res["filtered_ids_parent"], parents["documents"], parents["metadatas"])
+              if i not in failed_p]
+        manifest = mf.build_manifest(
+            mf.embedding_context(emb_cfg, emb_res.get("parent_vector_strategy") or "embed"), collections,
+            mf.entries([i for i, _, _ in kc], [d for _, d, _ in kc], [m for _, _, m in kc]),
+            mf.entries([i for i, _, _ in kp], [d for _, d, _ in kp], [m for _, _, m in kp]),
+        )
+        deleted = self.incremental.cleanup(docid, prev, collections, [i for i, _, _ in kc], [i for i, _, _ in kp])
+        reingest = {"mode": "full", "deleted": deleted, "embedded": {
+            "children": len(children["ids"]), "parents": len(emb_res["filtered_ids_parent"])}}
+
+        return self._finish_receipt(
+            docid, final_md, confidence_md, source_md, file_info, parents, children,
+            emb_alias_used, emb_model, emb_dim, emb_norm, collections, counts,
+            {**(receipt_extra or {}), "chunk_manifest": manifest, "reingest": reingest, "upsert": upsert_stats},
+            retrieval, progress,
+        )
+
+    def _finish_receipt(self, docid: str, final_md: Dict[str, Any], confidence_md: Dict[str, Any],
+                        source_md: Dict[str, Any], file_info: Dict[str, Any], parents: Dict[str, Any],
+                        children: Dict[str, Any], emb_alias: Optional[str], emb_model: Optional[str],
+                        emb_dim: Optional[int], emb_norm: Optional[bool], collections: Dict[str, str],
+                        counts: Dict[str, int], receipt_extra: Dict[str, Any], retrieval: Dict[str, Any],
+                        progress: Optional[ProgressFn] = None) -> Dict[str, Any]:
         # 9) Quittung erzeugen + State aktualisieren
+        _notify(progress, BATCH_STAGES, "receipt")
         receipt = self.receipt.build(
             docid=docid,
             final_md=final_md,
@@ -124,14 +281,99 @@ class IngestFacade:
             children=children,
             confidence_md=confidence_md,
             source_md=source_md,
-            embedding_alias=emb_alias_used,
+            embedding_alias=emb_alias,
             embedding_model=emb_model,
             embedding_dim=emb_dim,
             embedding_normalize=emb_norm,
             collections=collections,
             counts=counts,
         )
+        receipt.update(receipt_extra or {})
+        self._set_dedup_key(receipt, retrieval)
+        self.state.save_ingest_receipt(receipt)
+        self.state.update_index_from_receipt(receipt)
+        self.dedup.register(receipt)
+        log.info("ingest_receipt", extra={"extra_fields": {
+            "docid": docid, "collections": collections, "counts": counts,
+            "reingest": (receipt.get("reingest") or {}).get("mode"),
+        }})
+        return receipt
+
+    # --------- Duplikate (Datei-Hash + Konfiguration) ---------
+    @staticmethod
+    def _set_dedup_key(receipt: Dict[str, Any], retrieval: Dict[str, Any]) -> None:
+        """Schlüssel aus dem tatsächlich verwendeten Alias (nach Alias-Fallback passt er nicht zur Suche
+        mit dem Primär-Alias -> kein Wiederverwenden von Vektoren aus einem anderen Raum)."""
+        emb_cfg = {"alias": receipt.get("embedding_alias"), "model": receipt.get("embedding_model"),
+                   "dim": receipt.get("embedding_dim"), "normalize": receipt.get("embedding_normalize")}
+        if receipt.get("filehash"):
+            receipt["dedup_key"] = dedup_key(receipt["filehash"], config_fingerprint(retrieval, emb_cfg))
+
+    def find_duplicate(self, filehash: str, retrieval: Dict[str, Any], final_md: Dict[str, Any],
+                       confidence_md: Dict[str, Any], source_md: Any, docid: str) -> Optional[Dict[str, Any]]:
+        """Quittung eines vorhandenen Ingests derselben PDF (gleiche Chunking-/Embedding-Konfiguration),
+        Metadaten ggf. aktualisiert – oder None (regulärer Ingest). receipt["docid"] ist die vorhandene docid."""
+        if not retrieval.get("ingest_dedup", False):
+            return None
+        primary = retrieval.get("embedding_alias_default") or retrieval.get("embedding_alias") or "default"
+        try:
+            emb_cfg = self.model_reg.embedding_by_alias(primary)
+        except KeyError:
+            return None
+        prev = self.dedup.find(dedup_key(filehash, config_fingerprint(retrieval, emb_cfg)), filehash)
+        receipt = self.dedup.reuse(prev, final_md, confidence_md, source_md, docid) if prev else None
+        if receipt is None:
+            return None
+        if receipt["dedup"]["action"] == "metadata_updated":
+            save_metadata_json(self.app_cfg["paths"]["uploads_dir"], receipt["docid"],
+                               os.path.basename(receipt.get("filename") or ""), filehash,
+                               receipt["metadata"], confidence_md, source_md)
+        self.state.save_ingest_receipt(receipt)
+        self.state.update_index_from_receipt(receipt)
+        log.info("ingest_receipt", extra={"extra_fields": {
+            "docid": receipt["docid"], "collections": receipt.get("collections"), "counts": receipt.get("counts"),
+            "dedup": receipt["dedup"],
+        }})
+        return receipt
+
+    def _ingest_streaming(self, docid: str, final_md: Dict[str, Any], confidence_md: Dict[str, Any],
+                          source_md: Dict[str, Any], file_info: Dict[str, Any],
+                          retrieval: Dict[str, Any], progress: Optional[ProgressFn] = None) -> Dict[str, Any]:
+        """Wie ingest(), aber ohne Volltext/alle Chunks/alle Vektoren gleichzeitig im Speicher."""
+        _notify(progress, STREAMING_STAGES, "stream")
+        prev = self.state.get_receipt(docid)
+        res = self.stream.run(
+            pdf_source=self.pdf.pages(file_info["pdf_path"], file_info["filehash"]),
+            docid=docid,
+            final_md=final_md,
+            source_file=file_info["pdf_path"],
+            retrieval=retrieval,
+            old_manifest=(prev or {}).get("chunk_manifest"),
+        )
+        self.incremental.drop_moved(docid, prev, res["collections"])  # Arbeitsart geändert
+        _notify(progress, STREAMING_STAGES, "receipt")
+        receipt = self.receipt.build(
+            docid=docid,
+            final_md=final_md,
+            file_info=file_info,
+            parents={},
+            children={},
+            confidence_md=confidence_md,
+            source_md=source_md,
+            embedding_alias=res["alias_used"],
+            embedding_model=res["model"],
+            embedding_dim=res["dim"],
+            embedding_normalize=res["normalize"],
+            collections=res["collections"],
+            counts=res["counts"],
+        )
+        receipt.update({"ingest_mode": "streaming", "chunk_manifest": res["manifest"], "reingest": res["reingest"],
+                        "upsert": res["upsert"]})
+        self._set_dedup_key(receipt, retrieval)
         self.state.save_ingest_receipt(receipt)
         self.state.update_index_from_receipt(receipt)
-        log.info("ingest_receipt", extra={"extra_fields": {"docid": docid, "collections": collections, "counts": counts}})
+        self.dedup.register(receipt)
+        log.info("ingest_receipt", extra={"extra_fields": {
+            "docid": docid, "collections": res["collections"], "counts": res["counts"], "mode": "streaming"
+        }})
         return receipt
@@ -0,0 +1,187 @@
+# services/ingest_job_queue.py
+# Ingest-Warteschlange: Uploads werden als Job eingereiht und von Worker-Threads im
+# Server-Prozess abgearbeitet – unabhängig von Browser-Session, Reload oder Websocket-Abbruch.
+# - Job-Datensätze unter app_state/jobs/<job_id>.json (StateFacade): Status, aktuelle Stufe,
+#   Fortschritt (step/total), Dauer je Stufe, Fehler, Kurzfassung der Quittung
+# - PDF + Metadaten werden beim Einreihen gespoolt (app_state/jobs/<job_id>.pdf), damit
+#   ein Neustart des Servers offene Jobs erneut einreihen kann; der Worker übergibt den Spool-Pfad
+#   an IngestFacade.ingest (PDF wird nicht in den Speicher gelesen)
+# - Prozessweit eine Queue je app_state_dir (Streamlit-Reruns teilen sie)
+# Konfiguration (app_config.json): "ingest_jobs": {"workers": 1, "keep_finished": 200}
+
+from typing import Any, Dict, List, Optional
+from datetime import datetime, timezone
+import os
+import queue
+import threading
+import time
+import traceback
+import uuid
+
+from app.modules.logging_setup import get_logger
+from app.modules.model_registry import ModelRegistry
+from app.services.state_facade import StateFacade
+from app.services.ingest_facade import IngestFacade
+
+log = get_logger("ingest_job_queue")
+
+TERMINAL = ("done", "failed")
+
+_DEFAULTS: Dict[str, Any] = {"workers": 1, "keep_finished": 200}
+
+
+def _utcnow() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class IngestJobQueue:
+    def __init__(self, app_cfg: Dict[str, Any]):
+        s = {**_DEFAULTS, **(app_cfg.get("ingest_jobs") or {})}
+        self.app_cfg = app_cfg
+        self.workers = max(1, int(s["workers"]))
+        self.keep_finished = max(1, int(s["keep_finished"]))
+        self.state = StateFacade(app_cfg["paths"]["app_state_dir"])
+        self._q: "queue.Queue[str]" = queue.Queue()
+        self._threads: List[threading.Thread] = []
+        self._recover()
+        for n in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f"ingest-job-{n}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        log.info("ingest_jobs_init", extra={"extra_fields": {
+            "workers": self.workers, "queued": self._q.qsize()
+        }})
+
+    # --------- intern ---------
+    def _spool_path(self, job_id: str) -> str:
+        return os.path.join(self.state.jobs_dir(), f"{job_id}.pdf")
+
+    def _recover(self) -> None:
+        """Nicht abgeschlossene Jobs eines früheren Prozesses erneut einreihen (Ingest ist idempotent)."""
+        for job in reversed(self.state.list_jobs()):
+            if job.get("status") in TERMINAL:
+                continue
+            if os.path.isfile(self._spool_path(job["job_id"])):
+                job.update({"status": "queued", "stage": None, "step": 0, "recovered": True})
+                self.state.save_job(job)
+                self._q.put(job["job_id"])
+            else:
+                job.update({"status": "failed", "error": "Server-Neustart, gespoolte PDF fehlt",
+                            "finished_at": _utcnow()})
+                self.state.save_job(job)
+            log.info("ingest_job_recovered", extra={"extra_fields": {
+                "job_id": job["job_id"], "status": job["status"]
+            }})
+
+    def _prune(self) -> None:
+        done = [j for j in self.state.list_jobs() if j.get("status") in TERMINAL]
+        for job in done[self.keep_finished:]:
+            self.state.delete_job(job["job_id"])
+
+    def _worker(self) -> None:
+        while True:
+            job_id = self._q.get()
+            try:
+                self._run(job_id)
+            except Exception as e:  # Schutz des Worker-Threads
+                log.error("ingest_job_worker_error", extra={"extra_fields": {"job_id": job_id, "err": str(e)}})
+            finally:
+                self._q.task_done()
+
+    def _run(self, job_id: str) -> None:
+        job = self.state.get_job(job_id)
+        if not job or job.get("status") in TERMINAL:
+            return
+        t_start = time.monotonic()
+        marks = {"t": t_start}
+        job.update({"status": "running", "started_at": _utcnow(), "stages": [], "error": None})
+        self.state.save_job(job)
+
+        def _progress(stage: str, step: int, total: int) -> None:
+            now = time.monotonic()
+            if job["stages"]:
+                job["stages"][-1]["seconds"] = round(now - marks["t"], 3)
+            marks["t"] = now
+            job["stages"].append({"name": stage, "seconds": None})
+            job.update({"stage": stage, "step": step, "total_steps": total})
+            self.state.save_job(job)
+
+        spool = self._spool_path(job_id)
+        try:
+            # frische Registry je Job: Änderungen an model_config.json greifen ohne Neustart
+            ingest = IngestFacade(self.app_cfg, ModelRegistry(self.app_cfg["paths"]["config_dir"]))
+            receipt = ingest.ingest(spool, job["filename"], job["metadata"], job["docid"],
+                                    progress=_progress)
+            job.update({"status": "done", "receipt": {
+                "docid": receipt.get("docid"), "collections": receipt.get("collections"),
+                "counts": receipt.get("counts"), "embedding_alias": receipt.get("embedding_alias"),
+                "dedup": receipt.get("dedup"), "reingest": (receipt.get("reingest") or {}).get("mode"),
+            }})
+        except Exception as e:
+            job.update({"status": "failed", "error": str(e)[:1000],
+                        "traceback": traceback.format_exc()[-4000:]})
+            log.error("ingest_job_failed", extra={"extra_fields": {
+                "job_id": job_id, "docid": job.get("docid"), "stage": job.get("stage"), "error": str(e)[:300]
+            }})
+        now = time.monotonic()
+        if job["stages"] and job["stages"][-1]["seconds"] is None:
+            job["stages"][-1]["seconds"] = round(now - marks["t"], 3)
+        job.update({"finished_at": _utcnow(), "total_seconds": round(now - t_start, 3)})
+        if job["status"] == "done":
+            job["step"] = job.get("total_steps") or job.get("step")
+        self.state.save_job(job)
+        try:
+            os.remove(spool)
+        except OSError:
+            pass
+        log.info("ingest_job_finished", extra={"extra_fields": {
+            "job_id": job_id, "docid": job.get("docid"), "status": job["status"],
+            "seconds": job["total_seconds"], "stages": job["stages"],
+        }})
+
+    # --------- API ---------
+    def submit(self, pdf_bytes: bytes, filename: str, metadata_in: Dict[str, Any], docid: str,
+               submitted_by: Optional[str] = None) -> str:
+        """Reiht einen Ingest ein; Rückgabe: job_id (Status über get()/list())."""
+        if not pdf_bytes:
+            raise ValueError("Leere PDF.")
+        job_id = uuid.uuid4().hex[:12]
+        os.makedirs(self.state.jobs_dir(), exist_ok=True)
+        with open(self._spool_path(job_id), "wb") as f:
+            f.write(pdf_bytes)
+        job = {
+            "job_id": job_id, "status": "queued", "docid": docid, "filename": filename,
+            "metadata": metadata_in, "submitted_by": submitted_by, "created_at": _utcnow(),
+            "stage": None, "step": 0, "total_steps": None, "stages": [],
+        }
+        self.state.save_job(job)
+        self._q.put(job_id)
+        log.info("ingest_job_queued", extra={"extra_fields": {
+            "job_id": job_id, "docid": docid, "filename": filename, "queue_size": self._q.qsize()
+        }})
+        self._prune()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.state.get_job(job_id)
+
+    def list(self, limit: int = 20) -> List[Dict[str, Any]]:
+        return self.state.list_jobs(limit=limit)
+
+    def pending(self) -> int:
+        return self._q.qsize()
+
+
+_QUEUES: Dict[str, IngestJobQueue] = {}
+_LOCK = threading.Lock()
+
+
+def get_ingest_job_queue(app_cfg: Dict[str, Any]) -> IngestJobQueue:
+    """Prozessweit eine Queue (samt Worker-Threads) je app_state_dir."""
+    key = os.path.abspath(app_cfg["paths"]["app_state_dir"])
+    with _LOCK:
+        q = _QUEUES.get(key)
+        if q is None:
+            q = IngestJobQueue(app_cfg)
+            _QUEUES[key] = q
+        return q
@@ -9,9 +9,10 @@ from typing import Dict, Any, Tuple, List
 from app.modules.logging_setup import get_logger
 from app.modules.model_registry import ModelRegistry
 from app.modules.extract_metadata import (
-    extract_first_page_text,
+    first_page_text,
     extract_by_regex,
 )
+from app.modules.pdf_text_cache import parsed_pdf
 
 # LLM-Fallback kann in deinem Stand unterschiedlich heißen:
 try:
@@ -85,7 +86,8 @@ class MetadataFacade:
         self.examiners_cfg = examiners_cfg
 
     def preview_metadata(self, pdf_bytes: bytes) -> Dict[str, Any]:
-        head_text = extract_first_page_text(pdf_bytes)
+        # ganzes Dokument einmal parsen (pdf_text_cache) – der anschließende Ingest nutzt denselben Eintrag
+        head_text = first_page_text(parsed_pdf(self.app_cfg, pdf_bytes)["pages"])
 
         # 1) Regex
         md_regex, missing = _norm_regex_result(extract_by_regex(head_text, self.examiners_cfg))
@@ -1,17 +1,28 @@
 # app/services/search_facade.py
 # Fassade für Retrieval + Kontextaufbau (docid-gefiltert). Öffentliche API unverändert.
+# Collection-Auflösung je (work_type, docid) prozessweit gemerkt (gültig bis zur nächsten Änderung der
+# Receipt-Datei); Collection-Handles aus dem Cache in ChromaWrapper -> je Frage nur der Vektor-Query-Round-Trip.
+# Ausgewählte Arbeit: exakte Suche im In-Process-Vektorindex (doc_vector_index), sonst Chroma-Query mit docid-Filter.
+# Score aus der Distanz je nach Distanzraum der Collection (hnsw:space, vector_ops.distance_to_score);
+# l2: normiert nur für Treffer mit embedding_unit_norm (gespeicherte Vektoren), nicht laut aktueller Konfiguration.
 
 from __future__ import annotations
-from typing import Dict, Any, List, Optional
-import os, json
+from typing import Dict, Any, List, Optional, Tuple
+import os, json, threading, time
 
 from app.modules.logging_setup import get_logger
 from app.modules.model_registry import ModelRegistry
 from app.modules.chroma_client import ChromaWrapper
 from app.modules.embeddings_factory import EmbeddingsFactory
+from app.modules import vector_ops, doc_vector_index
 
 log = get_logger("search_facade")
 
+# Prozessweit gemerkte Collection-Auflösung: (app_state_dir, work_type, docid) -> (Token, Collection, Zeitpunkt)
+_RESOLVED: Dict[Tuple[str, str, str], Tuple[Any, str, float]] = {}
+_RESOLVED_LOCK = threading.Lock()
+_FALLBACK_TTL_S = 300.0
+
 
 class SearchFacade:
     def __init__(
@@ -22,7 +33,7 @@ class SearchFacade:
     ) -> None:
         self.app_cfg = app_cfg
         self.model_reg = model_reg
-        self.chroma = ChromaWrapper(app_cfg.get("chroma") or {})
+        self.chroma = ChromaWrapper(app_cfg.get("chroma") or {}, self.model_reg.index())
 
         # Retrieval-Defaults
         try:
@@ -47,6 +58,7 @@ class SearchFacade:
 
         # EmbeddingsFactory erwartet app_cfg + embedding_cfg
         self._emb_fac = EmbeddingsFactory(self.app_cfg, embedding_cfg)
+        self._emb_dim = embedding_cfg.get("dim")
 
         # weitere Retrieval-Parameter
         self._top_k_default = int(retrieval.get("top_k_default", 5))
@@ -77,10 +89,12 @@ class SearchFacade:
             return items
         return []
 
+    def _receipt_path(self, docid: str) -> str:
+        return os.path.join(self._state_dir, f"ingest_doc_{docid}.json")
+
     def _read_receipt(self, docid: str) -> Dict[str, Any]:
         try:
-            p = os.path.join(self._state_dir, f"ingest_doc_{docid}.json")
-            with open(p, "r", encoding="utf-8") as fh:
+            with open(self._receipt_path(docid), "r", encoding="utf-8") as fh:
                 return json.load(fh) or {}
         except Exception:
             return {}
@@ -88,22 +102,24 @@ class SearchFacade:
     def _collection_from_state_or_receipt(self, work_type: str, docid: Optional[str]) -> Optional[str]:
         if not docid:
             return None
-        # 1) StateFacade (aktuelle Arbeit)
+        # 1) Receipt-Datei der docid
+        rec = self._read_receipt(docid)
+        parents = (rec.get("collections") or {}).get("parents")
+        if parents:
+            return parents
+        # 2) StateFacade (aktuelle Arbeit) – nur, wenn sie zur docid gehört
         try:
             from app.services.state_facade import StateFacade
             cur = StateFacade(self._state_dir).get_current() or {}
-            parents = (cur.get("collections") or {}).get("parents")
-            if parents:
-                return parents
+            if cur.get("docid") == docid:
+                return (cur.get("collections") or {}).get("parents") or None
         except Exception:
             pass
-        # 2) Receipt-Datei
-        rec = self._read_receipt(docid)
-        parents = (rec.get("collections") or {}).get("parents")
-        return parents or None
+        return None
 
     def _best_existing_collection(self, work_type: str) -> str:
-        """Fallback-Heuristik: probiert zwei Namensschemata und nimmt die Collection mit der größeren count()."""
+        """Fallback-Heuristik: probiert zwei Namensschemata und nimmt die Collection mit der größeren count()
+        (nicht vorhandene Collections werden dabei nicht angelegt)."""
         wt = (work_type or "default").strip().lower()
         cand1 = f"{self._parent_collection_prefix}_{wt}_{self._parent_collection_suffix}"  # z.B. thesis_bachelor_parents
         cand2 = f"{wt}_parents"  # z.B. bachelor_parents (so erzeugt dein Ingest)
@@ -111,8 +127,7 @@ class SearchFacade:
         best_name, best_cnt = cand1, -1
         for name in dict.fromkeys([cand1, cand2]):  # de-dupe, Reihenfolge bewahren
             try:
-                col = self.chroma.get_or_create_collection(name)
-                cnt = col.count()
+                cnt = self.chroma.count(name) if self.chroma.collection_exists(name) else -1
             except Exception:
                 cnt = -1
             if cnt > best_cnt:
@@ -121,11 +136,40 @@ class SearchFacade:
         log.info("collection_fallback_choice", extra={"extra_fields": {"chosen": best_name, "count": best_cnt}})
         return best_name
 
+    def _resolution_token(self, docid: Optional[str]) -> Any:
+        """Gültigkeit einer gemerkten Auflösung: Änderungszeit der Receipt-Datei (neuer Ingest/Re-Ingest)."""
+        if not docid:
+            return None
+        try:
+            return os.stat(self._receipt_path(docid)).st_mtime_ns
+        except OSError:
+            return None
+
     def _collection_for(self, work_type: str, docid: Optional[str]) -> str:
-        via_state = self._collection_from_state_or_receipt(work_type, docid)
-        if via_state:
-            return via_state
-        return self._best_existing_collection(work_type)
+        """Memoisiert je (work_type, docid); neu aufgelöst bei geänderter Receipt-Datei,
+        Heuristik-Ergebnisse (ohne Receipt) nach _FALLBACK_TTL_S."""
+        key = (self._state_dir, work_type or "", docid or "")
+        token = self._resolution_token(docid)
+        hit = _RESOLVED.get(key)
+        if hit and hit[0] == token and (token is not None or time.monotonic() - hit[2] < _FALLBACK_TTL_S):
+            return hit[1]
+        collection = self._collection_from_state_or_receipt(work_type, docid)
+        if not collection:
+            collection = self._best_existing_collection(work_type)
+        with _RESOLVED_LOCK:
+            _RESOLVED[key] = (token, collection, time.monotonic())
+        return collection
+
+    def _doc_level(self, docid: Optional[str], collection: str):
+        """Geladene Vektoren der Arbeit in dieser Collection (doc_vector_index) oder None -> Chroma-Query."""
+        if not docid:
+            return None
+        try:
+            idx = doc_vector_index.get_doc_index(self.app_cfg, docid, self.chroma)
+        except Exception as e:
+            log.warning("doc_index_unavailable", extra={"extra_fields": {"docid": docid, "err": str(e)}})
+            return None
+        return idx.level(collection) if idx is not None else None
 
     def search(
         self,
@@ -142,14 +186,29 @@ class SearchFacade:
 
         collection = self._collection_for(work_type, docid)
 
-        # 1) Query-Embedding
-        vec = self._emb_fac.embed_robust([q])[0]
-
-        # 2) Chroma: über Collection abfragen (0.6.3 API)
+        # 1) Query-Embedding (Ollama nicht erreichbar/Breaker offen -> leeres Ergebnis statt Seitenfehler)
+        try:
+            vec = self._emb_fac.embed_robust([q])[0]
+        except Exception as e:
+            log.error("query_embedding_failed", extra={"extra_fields": {
+                "err": str(e), "err_type": type(e).__name__, "collection": collection
+            }})
+            return {"context": "", "sources": [], "collection": collection, "top_k": k, "docid": docid or ""}
+        if not vector_ops.validate_dims([vec], self._emb_dim):
+            log.error("query_embedding_invalid", extra={"extra_fields": {
+                "dim": len(vec or []), "expected_dim": self._emb_dim, "collection": collection
+            }})
+            if not vec:
+                return {"context": "", "sources": [], "collection": collection, "top_k": k, "docid": docid or ""}
+
+        # 2) In-Process-Index der Arbeit (exakt), sonst Chroma über Collection (0.6.3 API)
         where = {"docid": docid} if docid else None
-        col = self.chroma.get_or_create_collection(collection)
         try:
-            res = col.query(query_embeddings=[vec], n_results=k, where=where)
+            level = self._doc_level(docid, collection)
+            if level is not None:
+                res, space, via = level.query(vec, k), level.space, "doc_index"
+            else:
+                res, space, via = self.chroma.query(collection, query_embeddings=[vec], n_results=k, where=where), None, "chroma"
         except Exception as e:
             log.error(
                 "chroma_query_failed",
@@ -160,6 +219,11 @@ class SearchFacade:
         docs = self._flatten_first(res.get("documents"))
         metas = self._flatten_first(res.get("metadatas"))
         dists = self._flatten_first(res.get("distances"))
+        if space is None:
+            try:
+                space = self.chroma.space(collection)
+            except Exception:
+                space = "l2"
 
         sources: List[Dict[str, Any]] = []
         for i, text in enumerate(docs):
@@ -168,7 +232,7 @@ class SearchFacade:
             score = None
             if dist is not None:
                 try:
-                    score = 1.0 - float(dist)  # Cosine-Distanz -> Score
+                    score = vector_ops.distance_to_score(dist, space, bool(m.get("embedding_unit_norm")))
                 except Exception:
                     score = None
             sources.append(
@@ -184,6 +248,6 @@ class SearchFacade:
         out = {"context": context, "sources": sources, "collection": collection, "top_k": k, "docid": docid or ""}
         log.info(
             "search_ok",
-            extra={"extra_fields": {"collection": collection, "docid": docid or "", "k": k, "hits": len(sources), "ctx_len": len(context)}},
+            extra={"extra_fields": {"collection": collection, "docid": docid or "", "k": k, "hits": len(sources), "ctx_len": len(context), "via": via}},
         )
         return out
@@ -3,13 +3,16 @@
 # Aufgaben:
 #  - Quittungen (Receipts) speichern/lesen
 #  - Index pflegen (Liste aller Ingests)
-#  - aktuelle Auswahl (current_thesis) setzen/lesen
+#  - aktuelle Auswahl (current_thesis) setzen/lesen (mit app_cfg: In-Process-Vektorindex der Arbeit vorab laden)
+#  - Checkpoints des Bulk-Ingests speichern/lesen
+#  - Ingest-Jobs (Warteschlange) speichern/lesen/auflisten
 #
 # Intensives Logging: alle öffentlichen Methoden loggen Eingaben & Pfade.
 
 from typing import Dict, Any, List, Optional
 from app.modules.logging_setup import get_logger
 from app.modules.state_repo import StateRepo  # <-- absoluter Import ab 'app.'
+from app.modules import doc_vector_index
 
 log = get_logger("state_facade")
 
@@ -43,10 +46,61 @@ class StateFacade:
         log.info("state_index_list", extra={"extra_fields": {"count": len(items)}})
         return items
 
+    # --- Bulk-Ingest-Checkpoints ---
+    def save_bulk_checkpoint(self, run: str, data: Dict[str, Any]) -> str:
+        path = self.repo.write_bulk_checkpoint(run, data)
+        log.debug("state_bulk_checkpoint_saved", extra={"extra_fields": {"run": run, "path": path}})
+        return path
+
+    def load_bulk_checkpoint(self, run: str) -> Optional[Dict[str, Any]]:
+        cp = self.repo.read_bulk_checkpoint(run)
+        log.info("state_bulk_checkpoint_read", extra={"extra_fields": {"run": run, "found": bool(cp)}})
+        return cp
+
+    # --- Ingest-Jobs ---
+    def jobs_dir(self) -> str:
+        return self.repo.jobs_dir()
+
+    def save_job(self, job: Dict[str, Any]) -> str:
+        path = self.repo.write_job(job)
+        log.debug("state_job_saved", extra={"extra_fields": {
+            "job_id": job.get("job_id"), "status": job.get("status"), "stage": job.get("stage")
+        }})
+        return path
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.repo.read_job(job_id)
+
+    def list_jobs(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        jobs = self.repo.list_jobs()
+        return jobs[:limit] if limit else jobs
+
+    def delete_job(self, job_id: str) -> None:
+        self.repo.delete_job(job_id)
+        log.info("state_job_deleted", extra={"extra_fields": {"job_id": job_id}})
+
+    # --- Dedup-Index (Datei-Hash + Konfiguration -> docid) ---
+    def find_dedup(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self.repo.read_dedup_entry(key)
+        log.debug("state_dedup_lookup", extra={"extra_fields": {"key": key[:12], "found": bool(entry)}})
+        return entry
+
+    def register_dedup(self, key: str, docid: str, filehash: str) -> str:
+        path = self.repo.write_dedup_entry(key, {"docid": docid, "filehash": filehash})
+        log.info("state_dedup_registered", extra={"extra_fields": {"key": key[:12], "docid": docid}})
+        return path
+
+    def forget_dedup(self, key: str) -> None:
+        self.repo.delete_dedup_entry(key)
+        log.info("state_dedup_forgotten", extra={"extra_fields": {"key": key[:12]}})
+
     # --- Auswahl (current_thesis) ---
-    def set_current(self, docid: str) -> str:
+    def set_current(self, docid: str, app_cfg: Optional[Dict[str, Any]] = None) -> str:
+        """Setzt die aktuelle Arbeit; mit app_cfg wird ihr Vektorindex (doc_vector_index) im Hintergrund geladen."""
         path = self.repo.set_current(docid)
         log.info("state_current_set", extra={"extra_fields": {"docid": docid, "path": path}})
+        if app_cfg is not None:
+            doc_vector_index.preload(app_cfg, docid)
         return path
 
     def get_current(self) -> Optional[Dict[str, Any]]:
@@ -0,0 +1,94 @@
+# app/tools/bulk_ingest.py
+# Kommandozeile für den Bulk-Ingest (Verzeichnis oder Manifest mit vielen PDFs).
+# Aufruf (im Container, working_dir /code):
+#   python -m app.tools.bulk_ingest --dir /data/inbox
+#   python -m app.tools.bulk_ingest --manifest /data/inbox/manifest.csv --workers 6 --docs-in-flight 2
+# Ein abgebrochener Lauf wird mit demselben Aufruf fortgesetzt (Checkpoint je --run,
+# Default: aus dem Eingabepfad abgeleitet). --restart ignoriert den Checkpoint.
+
+import argparse
+import hashlib
+import logging
+import os
+import sys
+
+from app.services.config_facade import ConfigFacade
+from app.services.ingest_facade import IngestFacade
+from app.services.metadata_facade import MetadataFacade
+from app.services.state_facade import StateFacade
+from app.services.bulk_ingest_facade import BulkIngestFacade
+from app.modules.model_registry import ModelRegistry
+from app.modules.logging_setup import setup_logging
+from app.modules.ingest.bulk_ops import discover_pdfs, load_manifest
+
+
+def _parse_args(argv=None) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(prog="bulk_ingest", description="Bulk-Ingest vieler PDFs mit Checkpoint.")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--dir", help="Verzeichnis mit PDFs (Metadaten aus <name>.json/<name>.metadata.json)")
+    src.add_argument("--manifest", help="Manifest (.csv/.json/.jsonl) mit Spalte file + Metadaten")
+    ap.add_argument("--recursive", action="store_true", help="Unterverzeichnisse einbeziehen (--dir)")
+    ap.add_argument("--run", help="Name des Laufs/Checkpoints (Default: aus dem Eingabepfad)")
+    ap.add_argument("--workers", type=int, default=0, help="Prozesse für Parsen/Chunking (0 = auto)")
+    ap.add_argument("--docs-in-flight", type=int, default=2,
+                    help="Dokumente gleichzeitig im Embedding/Upsert (teilen sich den Embedding-Pool)")
+    ap.add_argument("--no-detect", action="store_true",
+                    help="keine Metadaten-Erkennung (Regex/LLM) für Dateien ohne Metadaten")
+    ap.add_argument("--skip-failed", action="store_true", help="fehlgeschlagene Dateien nicht erneut versuchen")
+    ap.add_argument("--restart", action="store_true", help="Checkpoint ignorieren und von vorn beginnen")
+    ap.add_argument("--log-level", default="WARNING", help="Log-Level der Konsole/Datei (Default WARNING)")
+    return ap.parse_args(argv)
+
+
+def _print_progress(ev) -> None:
+    line = (f"[{ev['position']}/{ev['total']}] {ev['status']:<7} {os.path.basename(ev['path'])}"
+            f" docid={ev.get('docid') or '-'} | {ev['pages_per_s']} S/s, {ev['chunks_per_s']} Chunks/s,"
+            f" {ev['embeddings_per_s']} Emb/s")
+    if ev.get("error"):
+        line += f" | {ev['error'][:160]}"
+    print(line, flush=True)
+
+
+def main(argv=None) -> int:
+    args = _parse_args(argv)
+    cfg_facade = ConfigFacade(os.environ.get("ARANDU_CFG_DIR", "data/config"))
+    app_cfg = cfg_facade.load_app_config()
+    setup_logging(app_cfg["paths"], level=getattr(logging, str(args.log_level).upper(), logging.WARNING))
+
+    source = os.path.abspath(args.dir or args.manifest)
+    entries = discover_pdfs(source, recursive=args.recursive) if args.dir else load_manifest(source)
+    run = args.run or "run_" + hashlib.sha1(source.encode("utf-8")).hexdigest()[:10]
+
+    model_reg = ModelRegistry(app_cfg["paths"]["config_dir"])
+    meta_srv = None
+    if not args.no_detect:
+        try:
+            examiners_cfg = cfg_facade.load_examiners()
+        except Exception:
+            examiners_cfg = {"examiners": []}
+        meta_srv = MetadataFacade(app_cfg, model_reg, examiners_cfg)
+
+    bulk = BulkIngestFacade(IngestFacade(app_cfg, model_reg),
+                            StateFacade(app_cfg["paths"]["app_state_dir"]), meta_srv)
+    print(f"Lauf {run}: {len(entries)} PDF(s) aus {source}", flush=True)
+    try:
+        s = bulk.run(entries, run=run, source=source, workers=args.workers,
+                     docs_in_flight=args.docs_in_flight, restart=args.restart,
+                     retry_failed=not args.skip_failed, progress=_print_progress)
+    except KeyboardInterrupt:
+        print(f"Abgebrochen – Fortsetzen mit demselben Aufruf (--run {run}).", file=sys.stderr)
+        return 130
+    except Exception as e:
+        print(f"Lauf abgebrochen: {e} – Fortsetzen mit demselben Aufruf (--run {run}).", file=sys.stderr)
+        return 2
+
+    print(f"Fertig: {s['done']} ok, {s['failed']} fehlgeschlagen, {s['skipped']} übersprungen "
+          f"in {s['wall_s']} s", flush=True)
+    print(f"Durchsatz: {s['pages_per_s']} Seiten/s ({s['pages']}), {s['chunks_per_s']} Chunks/s "
+          f"({s['chunks']}), {s['embeddings_per_s']} Embeddings/s ({s['embeddings']})", flush=True)
+    print(f"Checkpoint: {s['checkpoint']}", flush=True)
+    return 1 if s["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+# app/tools/index_admin.py
+# Kommandozeile für die Chroma-Index-Profile (model_config.json "index": Distanzraum + HNSW-Parameter).
+# Aufruf (im Container, working_dir /code):
+#   python -m app.tools.index_admin status
+#   python -m app.tools.index_admin migrate --pattern "*_parents" --dry-run
+#   python -m app.tools.index_admin recover
+#   python -m app.tools.index_admin benchmark --collection bachelor_parents --k 10 --queries 200
+# migrate baut Collections mit abweichendem Profil neu auf (Kopie, Abgleich, Umbenennen) –
+# nicht parallel zu laufenden Ingests/Suchen ausführen.
+
+import argparse
+import logging
+import os
+import sys
+
+from app.services.config_facade import ConfigFacade
+from app.services.index_facade import IndexFacade
+from app.modules.chroma_client import ChromaWrapper
+from app.modules.model_registry import ModelRegistry
+from app.modules.logging_setup import setup_logging
+
+
+def _parse_args(argv=None) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(prog="index_admin", description="Chroma-Index-Profile: Status, Migration, Benchmark.")
+    ap.add_argument("--log-level", default="WARNING", help="Log-Level der Konsole/Datei (Default WARNING)")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    st = sub.add_parser("status", help="gespeichertes vs. konfiguriertes Profil je Collection")
+    st.add_argument("--pattern", default="*", help="fnmatch-Muster für Collection-Namen (Default *)")
+
+    mg = sub.add_parser("migrate", help="Collections mit abweichendem Profil neu aufbauen")
+    mg.add_argument("--pattern", default="*_parents", help="fnmatch-Muster (Default *_parents)")
+    mg.add_argument("--dry-run", action="store_true", help="nur anzeigen, was neu aufgebaut würde")
+    mg.add_argument("--force", action="store_true", help="auch Collections ohne Abweichung neu aufbauen")
+    mg.add_argument("--page-size", type=int, default=1000, help="Einträge je Lese-Seite (Default 1000)")
+
+    sub.add_parser("recover", help="Reste abgebrochener Migrationen (<name>__rebuild/__backup) auflösen")
+
+    bm = sub.add_parser("benchmark", help="Recall@k und Latenz je Profil gegen exakte Suche")
+    bm.add_argument("--collection", required=True, help="Quell-Collection (Vektoren werden kopiert)")
+    bm.add_argument("--profile", action="append", help="Profilname (mehrfach möglich; Default: alle)")
+    bm.add_argument("--k", type=int, default=10, help="Treffer je Anfrage (Default 10)")
+    bm.add_argument("--queries", type=int, default=100, help="Anzahl Anfragen (Default 100)")
+    bm.add_argument("--filter-docid", action="store_true", help="Suche mit where={docid} wie in der App")
+    bm.add_argument("--seed", type=int, default=0, help="Zufallsstartwert für die Anfrageauswahl")
+    return ap.parse_args(argv)
+
+
+def _fmt_profile(p) -> str:
+    return ", ".join(f"{k}={v}" for k, v in p.items())
+
+
+def main(argv=None) -> int:
+    args = _parse_args(argv)
+    cfg_facade = ConfigFacade(os.environ.get("ARANDU_CFG_DIR", "data/config"))
+    app_cfg = cfg_facade.load_app_config()
+    setup_logging(app_cfg["paths"], level=getattr(logging, str(args.log_level).upper(), logging.WARNING))
+
+    model_reg = ModelRegistry(app_cfg["paths"]["config_dir"])
+    index = IndexFacade(ChromaWrapper(app_cfg["chroma"], model_reg.index()))
+
+    if args.cmd == "status":
+        for st in index.status(args.pattern):
+            flag = "ABWEICHEND " + ",".join(st["diff"]) if st["diff"] else "ok"
+            print(f"{st['collection']} ({st['count']}) | Profil {st['profile']} | {flag}\n"
+                  f"    gespeichert: {_fmt_profile(st['stored'])}\n    Ziel:        {_fmt_profile(st['target'])}",
+                  flush=True)
+        for name in index.leftovers():
+            print(f"REST EINER MIGRATION: {name} -> 'recover' ausführen", flush=True)
+        return 0
+
+    if args.cmd == "recover":
+        res = index.recover()
+        for r in res:
+            print(f"{r['collection']}: {r['action'] or 'nichts zu tun'}", flush=True)
+        print(f"Fertig: {len(res)} Collection(s)", flush=True)
+        return 0
+
+    if args.cmd == "migrate":
+        try:
+            res = index.migrate(args.pattern, dry_run=args.dry_run, force=args.force, page_size=args.page_size,
+                                progress=lambda _stage, st: print(f"-> {st['collection']} ({st['count']})"
+                                                                  f" auf Profil {st['profile']}", flush=True))
+        except KeyboardInterrupt:
+            print("Abgebrochen.", file=sys.stderr)
+            return 130
+        for r in res:
+            print(f"{'geplant' if r.get('dry_run') else 'neu aufgebaut'}: {r['collection']}"
+                  + ("" if r.get("dry_run") else f" ({r['count']} Einträge, {r['seconds']} s)"), flush=True)
+        print(f"Fertig: {len(res)} Collection(s)", flush=True)
+        return 0
+
+    print(f"Benchmark {args.collection}: k={args.k}, {args.queries} Anfragen"
+          f"{', docid-gefiltert' if args.filter_docid else ''}", flush=True)
+    index.benchmark(args.collection, profiles=args.profile, k=args.k, queries=args.queries,
+                    filter_docid=args.filter_docid, seed=args.seed,
+                    progress=lambda _stage, r: print(
+                        f"{r['profile']:<16} {r.get('space')} M={r.get('M')} ef_c={r.get('construction_ef')}"
+                        f" ef_s={r.get('search_ef')} | Recall@{r['k']} {r['recall_at_k']} | p50 {r['p50_ms']} ms,"
+                        f" p95 {r['p95_ms']} ms | Aufbau {r['build_seconds']} s", flush=True))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
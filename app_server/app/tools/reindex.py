@@ -0,0 +1,65 @@
+# app/tools/reindex.py
+# Kommandozeile für Re-Chunking/Re-Index vorhandener Ingests nach Änderungen an model_config.json
+# (z.B. child_chunk_size, parent_group_size, Embedding-Alias).
+# Aufruf (im Container, working_dir /code):
+#   python -m app.tools.reindex --all
+#   python -m app.tools.reindex --docid ba_2024_001 --docid ma_2023_017
+# Text aus dem Text-Store neben dem Upload (<uploads_dir>/<filehash>.text.json.gz), Fallback: PDF parsen.
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+from app.services.config_facade import ConfigFacade
+from app.services.ingest_facade import IngestFacade
+from app.services.state_facade import StateFacade
+from app.modules.model_registry import ModelRegistry
+from app.modules.logging_setup import setup_logging
+
+
+def _parse_args(argv=None) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(prog="reindex", description="Re-Chunking/Re-Index vorhandener Ingests.")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--all", action="store_true", help="alle Einträge des Ingest-Index")
+    src.add_argument("--docid", action="append", help="docid (mehrfach möglich)")
+    ap.add_argument("--log-level", default="WARNING", help="Log-Level der Konsole/Datei (Default WARNING)")
+    return ap.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = _parse_args(argv)
+    cfg_facade = ConfigFacade(os.environ.get("ARANDU_CFG_DIR", "data/config"))
+    app_cfg = cfg_facade.load_app_config()
+    setup_logging(app_cfg["paths"], level=getattr(logging, str(args.log_level).upper(), logging.WARNING))
+
+    state = StateFacade(app_cfg["paths"]["app_state_dir"])
+    docids = args.docid or [e["docid"] for e in state.list_index() if e.get("docid")]
+    ingest = IngestFacade(app_cfg, ModelRegistry(app_cfg["paths"]["config_dir"]))
+    print(f"Re-Index: {len(docids)} Dokument(e)", flush=True)
+
+    failed = 0
+    for n, docid in enumerate(docids, 1):
+        t0 = time.monotonic()
+        try:
+            receipt = ingest.rechunk(docid)
+        except KeyboardInterrupt:
+            print("Abgebrochen.", file=sys.stderr)
+            return 130
+        except Exception as e:
+            failed += 1
+            print(f"[{n}/{len(docids)}] failed  {docid} | {str(e)[:160]}", flush=True)
+            continue
+        rc = receipt.get("rechunk") or {}
+        ri = receipt.get("reingest") or {}
+        print(f"[{n}/{len(docids)}] done    {docid} | Text: {rc.get('text_source')} in {rc.get('load_seconds')} s,"
+              f" {ri.get('mode')}, eingebettet {ri.get('embedded')}, gesamt {round(time.monotonic() - t0, 2)} s",
+              flush=True)
+
+    print(f"Fertig: {len(docids) - failed} ok, {failed} fehlgeschlagen", flush=True)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,7 +6,7 @@ import streamlit as st
 
 from app.services.config_facade import ConfigFacade
 from app.services.metadata_facade import MetadataFacade
-from app.services.ingest_facade import IngestFacade
+from app.services.ingest_job_queue import get_ingest_job_queue, TERMINAL
 from app.services.state_facade import StateFacade
 from app.modules.model_registry import ModelRegistry
 from app.modules.logging_setup import setup_logging, get_logger
@@ -32,12 +32,14 @@ try:
 except Exception:
     examiners_cfg = {"examiners": []}
 meta_srv = MetadataFacade(app_cfg, model_reg, examiners_cfg)
-ingest = IngestFacade(app_cfg, model_reg)
+jobs = get_ingest_job_queue(app_cfg)  # prozessweit; Worker-Threads überleben Reload/Session-Ende
 state = StateFacade(app_cfg["paths"]["app_state_dir"])
 
 # Session-State
 st.session_state.setdefault("md_preview", None)
 st.session_state.setdefault("last_filename", None)
+st.session_state.setdefault("my_jobs", [])          # in dieser Session eingereichte Job-IDs
+st.session_state.setdefault("jobs_current_set", [])  # Jobs, deren docid bereits als aktuell gesetzt wurde
 
 # --- Upload ---
 pdf_bytes, filename = render_upload_form()
@@ -77,7 +79,7 @@ else:
     ]
 meta_complete = len(missing) == 0
 
-# --- Ingest starten (Texte/Enablement angepasst, Calls unverändert) ---
+# --- Ingest einreihen (läuft im Hintergrund; Status unten) ---
 if st.button(
     "Ingest starten --> Datei verarbeiten und speichern",
     key="btn_ingest_start",
@@ -92,31 +94,86 @@ if st.button(
             # DocID übernehmen oder erzeugen
             docid = (current_md.get("docid") or uuid.uuid4().hex[:8]).strip()
 
-            # -> unveränderter Fassade-Call
-            receipt = ingest.ingest(
+            job_id = jobs.submit(
                 pdf_bytes,
                 st.session_state.last_filename or (filename or "upload.pdf"),
                 current_md,
                 docid
             )
+            st.session_state.my_jobs.insert(0, job_id)
+            st.success(f"Ingest eingereiht (Auftrag {job_id}). Der Fortschritt erscheint unten; "
+                       "die Seite darf neu geladen oder geschlossen werden.")
+            log.info("ingest_job_submitted", extra={"extra_fields": {"docid": docid, "job_id": job_id}})
 
-            # Nach erfolgreichem Ingest: Auswahl für andere Seiten setzen (Header nutzt das)
+            # Reset für nächsten Upload
+            st.session_state.md_preview = None
+            st.session_state.last_filename = None
+
+        except Exception as e:
+            log.error("ingest_submit_failed", extra={"extra_fields": {"error": str(e)}})
+            st.error(f"Ingest konnte nicht eingereiht werden: {e}")
+
+# --- Status der Ingest-Aufträge ---
+STAGE_LABELS = {
+    "metadata": "Metadaten", "file": "Datei speichern", "extract": "Text extrahieren",
+    "chunk": "Chunking", "embed": "Embeddings", "upsert": "Upsert", "receipt": "Quittung",
+    "stream": "Extraktion/Embedding/Upsert (Streaming)",
+}
+STATUS_LABELS = {"queued": "wartet", "running": "läuft", "done": "fertig", "failed": "fehlgeschlagen"}
+
+
+def _render_jobs() -> None:
+    items = jobs.list(limit=10)
+    if not items:
+        st.caption("Noch keine Aufträge.")
+        return
+    for job in items:
+        jid, status = job.get("job_id"), job.get("status")
+        own = jid in st.session_state.my_jobs
+        md = job.get("metadata") or {}
+        # Duplikat: die Quittung verweist auf die bereits vorhandene docid
+        docid = (job.get("receipt") or {}).get("docid") or job.get("docid")
+        title = f"{'★ ' if own else ''}{md.get('student_name') or '-'} · {job.get('filename')} · docid {docid}"
+        step, total = int(job.get("step") or 0), int(job.get("total_steps") or 0)
+        if status == "done":
+            frac = 1.0
+        elif status == "running" and total:
+            frac = max(0.0, (step - 1) / total)
+        else:
+            frac = 0.0
+        stage = STAGE_LABELS.get(job.get("stage") or "", job.get("stage") or "")
+        label = STATUS_LABELS.get(status, status)
+        st.progress(frac, text=f"{title} — {label}" + (f" ({stage}, {step}/{total})" if status == "running" else ""))
+
+        # Eigene, fertige Aufträge: Auswahl für andere Seiten setzen (wie bisher nach dem Ingest)
+        if status == "done" and own and jid not in st.session_state.jobs_current_set:
+            st.session_state.jobs_current_set.append(jid)
             try:
-                state.set_current(docid)
+                state.set_current(docid, app_cfg)
             except Exception as e2:
                 log.warning("state_current_set_failed", extra={"extra_fields": {"err": str(e2), "docid": docid}})
 
-            st.success("Ingest erfolgreich.")
-            with st.expander("Quittung"):
-                st.json(receipt)
-            log.info("ingest_success", extra={"extra_fields": {
-                "docid": docid, "collections": receipt.get("collections", {})
-            }})
+        if status in TERMINAL:
+            with st.expander(f"Details {jid}"):
+                if status == "failed":
+                    st.error(job.get("error") or "Unbekannter Fehler")
+                dedup = (job.get("receipt") or {}).get("dedup")
+                if dedup:
+                    st.info(f"PDF bereits vorhanden (docid {docid}) – kein erneuter Ingest"
+                            + (", Metadaten aktualisiert." if dedup.get("action") == "metadata_updated" else "."))
+                st.json({
+                    "dauer_s": job.get("total_seconds"),
+                    "stufen": {STAGE_LABELS.get(x["name"], x["name"]): x.get("seconds") for x in job.get("stages") or []},
+                    "quittung": job.get("receipt"),
+                })
 
-            # Reset für nächsten Upload
-            st.session_state.md_preview = None
-            st.session_state.last_filename = None
 
-        except Exception as e:
-            log.error("ingest_failed", extra={"extra_fields": {"error": str(e)}})
-            st.error(f"Ingest fehlgeschlagen: {e}")
+st.subheader("Ingest-Aufträge")
+_active = any(j.get("status") not in TERMINAL for j in jobs.list(limit=10))
+_fragment = getattr(st, "fragment", None)
+if _fragment is not None:
+    # Teil-Rerun alle 2 s, solange Aufträge offen sind (Rest der Seite bleibt unberührt)
+    _fragment(run_every=2 if _active else None)(_render_jobs)()
+else:
+    _render_jobs()
+    st.button("Status aktualisieren", key="btn_jobs_refresh")
@@ -9,6 +9,7 @@ from app.modules.logging_setup import setup_logging, get_logger
 from app.ui.components.theme import apply_css_only
 from app.ui.components.topbar import render_topbar
 from app.modules.chroma_client import ChromaWrapper
+from app.modules.model_registry import ModelRegistry
 
 log = get_logger("ui.select_thesis")
 
@@ -73,7 +74,7 @@ else:
         with c2:
             if st.button("Arbeit auswählen", key=f"select_{r_docid}"):
                 try:
-                    state.set_current(r_docid)
+                    state.set_current(r_docid, cfg)
                     st.success(f"Aktuelle Arbeit gesetzt: {r_docid}")
                     _safe_rerun()
                 except Exception as e:
@@ -119,7 +120,7 @@ else:
 
     if btn_check:
         try:
-            chroma = ChromaWrapper(cfg.get("chroma") or {})
+            chroma = ChromaWrapper(cfg.get("chroma") or {}, ModelRegistry(cfg["paths"]["config_dir"]).index())
             col = chroma.get_or_create_collection(parents_col)
             # Count
             try:
@@ -152,7 +152,7 @@ if send:
                 else:
                     fac = EmbeddingsFactory(cfg, emb_cfg)
                     vec = fac.embed_robust([question.strip()])[0]
-                    chroma = ChromaWrapper(cfg.get("chroma") or {})
+                    chroma = ChromaWrapper(cfg.get("chroma") or {}, model_reg.index())
                     col = chroma.get_or_create_collection(collection)
                     raw = col.query(query_embeddings=[vec], n_results=int(top_k), where={"docid": docid})
                     docs = raw.get("documents") or []; metas = raw.get("metadatas") or []
@@ -43,6 +43,8 @@ def _build_retrieval(app_cfg: Dict[str, Any], cfg_dir_abs: str):
         from app.modules.model_registry import ModelRegistry
         from app.modules.embeddings_factory import EmbeddingsFactory
         from app.modules.chroma_client import ChromaWrapper
+        from app.modules.state_repo import StateRepo
+        from app.modules import doc_vector_index
     except Exception as e:
         raise RuntimeError(f"Module konnten nicht importiert werden: {e}")
 
@@ -59,8 +61,13 @@ def _build_retrieval(app_cfg: Dict[str, Any], cfg_dir_abs: str):
 
     # WICHTIG: EmbeddingsFactory braucht app_cfg (wegen ollama.base_url)
     factory = EmbeddingsFactory(app_cfg, emb)
-    chroma = ChromaWrapper(app_cfg.get("chroma") or {})
-    collection = chroma.get_or_create_collection(retr.get("default_collection") or "default")
+    chroma = ChromaWrapper(app_cfg.get("chroma") or {}, reg.index())
+    state_dir = (app_cfg.get("paths") or {}).get("app_state_dir")
+
+    def _parents_collection(doc_id: Optional[str]) -> str:
+        """Parents-Collection der Arbeit laut Receipt (wie SearchFacade); default_collection nur ohne Receipt."""
+        rec = StateRepo(state_dir).read_receipt(doc_id) if (doc_id and state_dir) else None
+        return ((rec or {}).get("collections") or {}).get("parents") or retr.get("default_collection") or "default"
 
     def _retrieval(payload: Dict[str, Any]) -> Dict[str, Any]:
         q = (payload.get("query") or "").strip()
@@ -69,11 +76,22 @@ def _build_retrieval(app_cfg: Dict[str, Any], cfg_dir_abs: str):
         if not q:
             return {"context": "", "metas": []}
         vec = factory.embed([q])[0]
-        raw = collection.query(
-            query_embeddings=[vec],
-            n_results=k,
-            where={"docid": doc_id} if doc_id else None
-        )
+        collection = _parents_collection(doc_id)
+        # ausgewählte Arbeit: exakte Suche im In-Process-Index (Parents), sonst Chroma mit docid-Filter
+        try:
+            idx = doc_vector_index.get_doc_index(app_cfg, doc_id, chroma) if doc_id else None
+        except Exception:
+            idx = None  # Chroma-Query unten
+        level = idx.level(collection) if idx is not None else None
+        if level is not None:
+            raw = level.query(vec, k)
+        else:
+            raw = chroma.query(
+                collection,
+                query_embeddings=[vec],
+                n_results=k,
+                where={"docid": doc_id} if doc_id else None
+            )
         docs = (raw.get("documents") or [[]])[0]
         metas = (raw.get("metadatas") or [[]])[0]
         ctx = "\n\n".join(docs) if isinstance(docs, list) else (docs or "")
@@ -0,0 +1,14 @@
+# tests/conftest.py
+# Gemeinsame pytest-Einrichtung.
+# - Wie sitecustomize.py: /app und /app/app auf sys.path, damit "from app...." und
+#   "from modules|services ..." auch ohne Container funktionieren
+
+import os
+import sys
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+PKG_DIR = os.path.join(BASE_DIR, "app")
+
+for p in (PKG_DIR, BASE_DIR):
+    if p not in sys.path:
+        sys.path.insert(0, p)
@@ -0,0 +1,51 @@
+# tests/test_bulk_ops.py
+# Eingaben für den Bulk-Ingest: Verzeichnis-Scan mit Sidecar-Metadaten und Manifest-Formate.
+
+import json
+import os
+
+import pytest
+
+from modules.ingest import bulk_ops
+
+
+def test_default_docid_is_stable():
+    h = bulk_ops.file_sha256(b"%PDF-1.4")
+    assert bulk_ops.default_docid(h) == h[:8] == bulk_ops.default_docid(bulk_ops.file_sha256(b"%PDF-1.4"))
+
+
+def test_discover_pdfs_with_sidecars(tmp_path):
+    (tmp_path / "b.pdf").write_bytes(b"x")
+    (tmp_path / "a.PDF").write_bytes(b"x")
+    (tmp_path / "a.json").write_text(json.dumps({"docid": "d1", "thesis_title": "T", "filehash": "h", "note": ""}))
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "c.pdf").write_bytes(b"x")
+
+    flat = bulk_ops.discover_pdfs(str(tmp_path))
+    assert [os.path.basename(e["path"]) for e in flat] == ["a.PDF", "b.pdf"]
+    assert flat[0]["docid"] == "d1" and flat[0]["metadata"] == {"thesis_title": "T"}
+    assert flat[1] == {"path": str(tmp_path / "b.pdf"), "docid": None, "metadata": {}}
+    assert len(bulk_ops.discover_pdfs(str(tmp_path), recursive=True)) == 3
+
+
+def test_discover_pdfs_missing_dir(tmp_path):
+    with pytest.raises(ValueError):
+        bulk_ops.discover_pdfs(str(tmp_path / "fehlt"))
+
+
+def test_load_manifest_formats(tmp_path):
+    (tmp_path / "m.csv").write_text("file,docid,thesis_title\nx.pdf,d1,T\n/abs/y.pdf,,U\n", encoding="utf-8")
+    (tmp_path / "m.jsonl").write_text('{"path": "x.pdf", "docid": "d1"}\n\n', encoding="utf-8")
+    (tmp_path / "m.json").write_text(json.dumps({"items": [{"file": "x.pdf", "thesis_title": "T"}]}), encoding="utf-8")
+
+    csv_entries = bulk_ops.load_manifest(str(tmp_path / "m.csv"))
+    assert csv_entries[0] == {"path": str(tmp_path / "x.pdf"), "docid": "d1", "metadata": {"thesis_title": "T"}}
+    assert csv_entries[1]["path"] == "/abs/y.pdf" and csv_entries[1]["docid"] is None
+    assert bulk_ops.load_manifest(str(tmp_path / "m.jsonl"))[0]["docid"] == "d1"
+    assert bulk_ops.load_manifest(str(tmp_path / "m.json"))[0]["metadata"] == {"thesis_title": "T"}
+
+
+def test_load_manifest_rejects_rows_without_file(tmp_path):
+    (tmp_path / "m.json").write_text(json.dumps([{"docid": "d1"}]), encoding="utf-8")
+    with pytest.raises(ValueError, match="'file' fehlt"):
+        bulk_ops.load_manifest(str(tmp_path / "m.json"))
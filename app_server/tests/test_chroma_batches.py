@@ -0,0 +1,61 @@
+# tests/test_chroma_batches.py
+# Upsert-Batching und Index-Profile des ChromaWrapper (reine Funktionen, kein Server nötig).
+
+import pytest
+
+pytest.importorskip("chromadb")
+
+from app.modules import chroma_client  # noqa: E402
+
+
+def _spans_cover(spans, n):
+    return [i for s, e in spans for i in range(s, e)] == list(range(n))
+
+
+def test_batches_respect_max_items():
+    docs = ["x"] * 10
+    spans = chroma_client._batches(docs, [{}] * 10, None, max_items=4, max_bytes=10 ** 9)
+    assert spans == [(0, 4), (4, 8), (8, 10)]
+
+
+def test_batches_respect_max_bytes():
+    docs = ["a" * 1000] * 6
+    one = chroma_client._item_bytes(docs[0], {}, [0.0] * 8)
+    spans = chroma_client._batches(docs, [{}] * 6, [[0.0] * 8] * 6, max_items=100, max_bytes=2 * one)
+    assert spans == [(0, 2), (2, 4), (4, 6)]
+
+
+def test_oversized_item_gets_own_batch():
+    docs = ["klein", "g" * 5000, "klein"]
+    spans = chroma_client._batches(docs, [{}] * 3, None, max_items=100, max_bytes=1000)
+    assert spans == [(0, 1), (1, 2), (2, 3)]
+    assert _spans_cover(spans, 3)
+
+
+def test_batches_empty():
+    assert chroma_client._batches([], [], None, max_items=10, max_bytes=100) == []
+
+
+def test_rebuild_names_fit_chroma_limit():
+    rebuild, backup = chroma_client._rebuild_names("x" * 63)
+    assert len(rebuild) <= 63 and rebuild.endswith("__rebuild")
+    assert len(backup) <= 63 and backup.endswith("__backup")
+    assert chroma_client._rebuild_names("c") == ("c__rebuild", "c__backup")
+
+
+def test_hnsw_metadata_round_trip():
+    md = chroma_client.hnsw_metadata({"space": "COSINE", "M": "32", "unbekannt": 1})
+    assert md["hnsw:space"] == "cosine" and md["hnsw:M"] == 32 and "unbekannt" not in md
+    assert chroma_client.profile_of(md)["space"] == "cosine"
+    assert chroma_client.profile_of(None) == {"space": "l2"}
+    with pytest.raises(ValueError):
+        chroma_client.hnsw_metadata({"space": "manhattan"})
+
+
+def test_resolve_profile():
+    cfg = {"profiles": {"p": {"space": "ip"}}, "collections": {"*_parents": "p"}}
+    assert chroma_client.resolve_profile(cfg, "bachelor_parents")[0] == "p"
+    assert chroma_client.resolve_profile(cfg, "bachelor_parents")[1]["space"] == "ip"
+    assert chroma_client.resolve_profile(cfg, "bachelor_chunks")[0] == "default"
+    with pytest.raises(ValueError):
+        chroma_client.resolve_profile({"collections": {"*": "fehlt"}}, "x")
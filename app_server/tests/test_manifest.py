@@ -0,0 +1,61 @@
+# tests/test_manifest.py
+# Inhalts-IDs und Manifest-Vergleich für den inkrementellen Re-Ingest (reine Funktionen).
+
+from app.modules.ingest import manifest
+
+
+def test_assign_ids_suffixes_duplicates_in_order():
+    ids = manifest.assign_ids("d1", "c", ["a", "b", "a", "a"])
+    h = manifest.content_hash("a")
+    assert ids[0] == f"d1_c_{h}"
+    assert ids[2] == f"d1_c_{h}-2"
+    assert ids[3] == f"d1_c_{h}-3"
+    assert ids[1] == f"d1_c_{manifest.content_hash('b')}"
+
+
+def test_assigner_windowed_matches_assign_ids():
+    texts = ["x", "y", "x", "z", "y"]
+    a = manifest.ChunkIdAssigner("d1", "p")
+    windowed = [a.next_id(t) for t in texts[:2]] + [a.next_id(t) for t in texts[2:]]
+    assert windowed == manifest.assign_ids("d1", "p", texts)
+
+
+def test_ids_stable_when_position_shifts():
+    old = manifest.assign_ids("d1", "c", ["a", "b"])
+    new = manifest.assign_ids("d1", "c", ["neu", "a", "b"])
+    assert new[1:] == old
+
+
+def test_metadata_hash_ignores_key_order():
+    assert manifest.metadata_hash({"a": 1, "b": 2}) == manifest.metadata_hash({"b": 2, "a": 1})
+    assert manifest.metadata_hash({"a": 1}) != manifest.metadata_hash({"a": 2})
+
+
+def test_classify_new_meta_same_and_vanished():
+    docs = ["eins", "zwei", "drei"]
+    mds = [{"t": "A"}, {"t": "A"}, {"t": "A"}]
+    ids = manifest.assign_ids("d1", "c", docs)
+    old = manifest.entries(ids, docs, mds)
+
+    new_docs = ["eins", "zwei", "vier"]
+    new_mds = [{"t": "A"}, {"t": "B"}, {"t": "A"}]
+    new_ids = manifest.assign_ids("d1", "c", new_docs)
+    assert manifest.classify(old, new_ids, new_docs, new_mds) == ["same", "meta", "new"]
+    assert manifest.vanished(old, new_ids) == [ids[2]]
+
+
+def test_classify_content_change_under_same_id_is_new():
+    old = {"d1_c_x": {"h": manifest.content_hash("alt"), "m": manifest.metadata_hash({})}}
+    assert manifest.classify(old, ["d1_c_x"], ["neu"], [{}]) == ["new"]
+
+
+def test_is_compatible():
+    ctx = manifest.embedding_context({"alias": "e", "model": "m", "dim": 8, "normalize": True}, "embed")
+    cols = {"children": "c", "parents": "p"}
+    m = manifest.build_manifest(ctx, cols, {}, {})
+    assert manifest.is_compatible(m, ctx, cols)
+    assert not manifest.is_compatible(m, {**ctx, "dim": 16}, cols)
+    assert not manifest.is_compatible(m, {**ctx, "parent_vector_strategy": "mean"}, cols)
+    assert not manifest.is_compatible(m, ctx, {**cols, "parents": "x"})
+    assert not manifest.is_compatible({**m, "version": 0}, ctx, cols)
+    assert not manifest.is_compatible(None, ctx, cols)
@@ -0,0 +1,75 @@
+# tests/test_pipeline.py
+# StagePipeline: Reihenfolge, None-Filter und Fehlerweitergabe (parallel und sequenziell).
+
+import threading
+
+import pytest
+
+from app.modules.ingest.pipeline import StagePipeline
+
+
+def _stages():
+    return [("double", lambda x: x * 2), ("drop_div3", lambda x: None if x % 3 == 0 else x),
+            ("inc", lambda x: x + 1)]
+
+
+@pytest.mark.parametrize("parallel", [True, False])
+def test_order_and_none_filter(parallel):
+    res = StagePipeline("t", _stages(), queue_size=1, parallel=parallel).run(range(10))
+    assert res == [x * 2 + 1 for x in range(10) if (x * 2) % 3 != 0]
+
+
+@pytest.mark.parametrize("parallel", [True, False])
+def test_stage_error_is_reraised(parallel):
+    def boom(x):
+        if x == 5:
+            raise ValueError("kaputt")
+        return x
+
+    with pytest.raises(ValueError, match="kaputt"):
+        StagePipeline("t", [("a", boom), ("b", lambda x: x)], parallel=parallel).run(range(100))
+
+
+@pytest.mark.parametrize("parallel", [True, False])
+def test_source_error_is_reraised(parallel):
+    def source():
+        yield 1
+        raise RuntimeError("quelle")
+
+    with pytest.raises(RuntimeError, match="quelle"):
+        StagePipeline("t", [("a", lambda x: x)], parallel=parallel).run(source())
+
+
+def test_error_stops_other_stages():
+    seen = []
+
+    def fail(x):
+        raise ValueError("erste Stufe")
+
+    def record(x):
+        seen.append(x)
+        return x
+
+    def endless():
+        i = 0
+        while True:
+            yield i
+            i += 1
+
+    with pytest.raises(ValueError):
+        StagePipeline("t", [("fail", fail), ("record", record)], queue_size=1).run(endless())
+    assert seen == []
+    assert not [t for t in threading.enumerate() if t.name.startswith("t-")]
+
+
+def test_first_error_wins():
+    def a(x):
+        if x == 0:
+            raise KeyError("a")
+        return x
+
+    def b(x):
+        raise IndexError("b")
+
+    with pytest.raises(KeyError):
+        StagePipeline("t", [("a", a), ("b", b)], queue_size=1).run(range(3))
@@ -0,0 +1,50 @@
+# tests/test_streaming.py
+# Streaming-Bausteine müssen exakt dieselben Chunks/Parents liefern wie der Batch-Pfad.
+
+import random
+
+import pytest
+
+from app.modules.chunking import chunk_text
+from app.modules.ingest.streaming import IncrementalChunker, IncrementalParentGrouper
+from app.modules.parent_chunking import make_parents_from_children
+
+
+def _pages(seed: int, n: int):
+    rnd = random.Random(seed)
+    return ["".join(rnd.choice("abc ") for _ in range(rnd.randint(0, 700))) for _ in range(n)]
+
+
+def _stream_chunks(pages, chunk_size, overlap):
+    ch = IncrementalChunker(chunk_size, overlap)
+    out = []
+    for p in pages:
+        out.extend(ch.feed(p))
+    out.extend(ch.finish())
+    return out
+
+
+@pytest.mark.parametrize("chunk_size,overlap", [(100, 20), (100, 0), (7, 3), (1000, 200), (0, 0)])
+@pytest.mark.parametrize("seed", range(5))
+def test_incremental_chunker_matches_chunk_text(chunk_size, overlap, seed):
+    pages = _pages(seed, 8)
+    assert _stream_chunks(pages, chunk_size, overlap) == chunk_text("".join(pages), chunk_size, overlap)
+
+
+@pytest.mark.parametrize("group_size,group_overlap", [(5, 1), (3, 0), (1, 0), (4, 3), (0, 0)])
+@pytest.mark.parametrize("n", [1, 4, 5, 6, 17])
+def test_incremental_grouper_matches_batch(group_size, group_overlap, n):
+    children = [{"text": "" if i % 4 == 3 else f"t{i}", "index": i} for i in range(n)]
+    g = IncrementalParentGrouper(group_size, group_overlap)
+    out = []
+    for c in children:
+        out.extend(g.add(c))
+    out.extend(g.finish())
+    assert out == make_parents_from_children(children, group_size, group_overlap)
+
+
+def test_grouper_pending_indices_bounded():
+    g = IncrementalParentGrouper(5, 1)
+    for i in range(50):
+        list(g.add({"text": f"t{i}", "index": i}))
+        assert len(g.pending_indices) < 5
@@ -0,0 +1,57 @@
+# tests/test_token_splitter.py
+# Token-bewusstes Zerlegen: Satzgrenzen, deutsche Abkürzungen und Budget-Einhaltung.
+
+import pytest
+
+from app.modules import token_splitter as ts
+
+
+def test_split_sentences_keeps_german_abbreviations():
+    text = "Das gilt z.B. hier. Siehe S. 12 und vgl. Kap. 3! Am 3. Mai ging es los? Ja."
+    assert ts.split_sentences(text) == [
+        "Das gilt z.B. hier.",
+        "Siehe S. 12 und vgl. Kap. 3!",
+        "Am 3. Mai ging es los?",
+        "Ja.",
+    ]
+
+
+def test_split_sentences_paragraphs_and_quotes():
+    text = "Er sagte: »Fertig.« Danach\n\nneuer Absatz ohne Punkt\n\n  \n"
+    assert ts.split_sentences(text) == ["Er sagte: »Fertig.«", "Danach", "neuer Absatz ohne Punkt"]
+    assert ts.split_sentences('(Siehe oben.) "Gut!" Ende') == ["(Siehe oben.)", '"Gut!"', "Ende"]
+    assert ts.split_sentences("") == []
+
+
+def test_estimate_counter():
+    count = ts.estimate_counter(4.0)
+    assert count("") == 0 and count("abcd") == 1 and count("abcde") == 2
+    assert ts.estimate_counter(0)("abc") == 1  # ungültig -> Default 3.0
+
+
+def test_get_token_counter_without_tokenizer():
+    assert ts.get_token_counter({"chars_per_token": 2})("abcd") == 2
+    assert ts.get_token_counter({})("abc") == 1
+
+
+def test_text_within_budget_is_unchanged():
+    count = ts.estimate_counter(1.0)
+    assert ts.split_for_embedding("Kurz. Text.", 100, count) == ["Kurz. Text."]
+    assert ts.split_for_embedding("", 10, count) == [""]
+
+
+@pytest.mark.parametrize("max_tokens", [5, 20, 60])
+def test_parts_stay_within_budget(max_tokens):
+    count = ts.estimate_counter(1.0)
+    text = ("Ein normaler Satz mit ein paar Wörtern. " * 5
+            + "Ein sehr langer Satz " + "ohne Ende " * 30 + "und " + "X" * 150 + ". Schluss.")
+    parts = ts.split_for_embedding(text, max_tokens, count)
+    assert len(parts) > 1
+    assert all(count(p) <= max_tokens for p in parts)
+    assert "".join(parts).replace(" ", "") == text.replace(" ", "")
+
+
+def test_sentences_are_packed_greedily():
+    count = ts.estimate_counter(1.0)
+    parts = ts.split_for_embedding("Aa. Bb. Cc. Dd.", 7, count)
+    assert parts == ["Aa. Bb.", "Cc. Dd."]
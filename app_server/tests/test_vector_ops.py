@@ -0,0 +1,63 @@
+# tests/test_vector_ops.py
+# Vektor-Hilfsfunktionen: Pooling, Normalisierung und Distanz -> Score je Distanzraum.
+
+import math
+
+import pytest
+
+from app.modules import vector_ops
+
+
+def test_dim_of_and_validate():
+    assert vector_ops.dim_of([[1, 2], [3, 4]]) == 2
+    assert vector_ops.dim_of([]) == 0
+    assert vector_ops.dim_of([[1, 2], [3]]) == 0
+    assert vector_ops.dim_of([[1], None]) == 0
+    assert vector_ops.validate_dims([[1, 2]], 2)
+    assert not vector_ops.validate_dims([[1, 2]], 3)
+
+
+def test_mean_and_total():
+    assert vector_ops.mean([[1, 2], [3, 4]]) == [2.0, 3.0]
+    assert vector_ops.total([[1, 2], [3, 4]]) == [4.0, 6.0]
+    assert vector_ops.mean([]) == [] and vector_ops.total([[1], [1, 2]]) == []
+
+
+def test_weighted_mean():
+    assert vector_ops.weighted_mean([[0, 0], [4, 8]], [1, 3]) == [3.0, 6.0]
+    # negative Gewichte zählen nicht
+    assert vector_ops.weighted_mean([[0, 0], [4, 8]], [-5, 1]) == [4.0, 8.0]
+    # Summe 0 -> ungewichteter Mittelwert
+    assert vector_ops.weighted_mean([[0, 0], [4, 8]], [0, 0]) == [2.0, 4.0]
+    assert vector_ops.weighted_mean([[1, 2]], [1, 2]) == []
+
+
+def test_l2_normalize():
+    v = vector_ops.l2_normalize([3, 4])
+    assert v == pytest.approx([0.6, 0.8])
+    assert vector_ops.l2_normalize([]) == []
+    assert vector_ops.l2_normalize([0, 0]) == [0.0, 0.0]
+    assert vector_ops.l2_normalize_many([[3, 4], []]) == [pytest.approx([0.6, 0.8]), []]
+
+
+def test_l2_normalize_rows_keeps_zero_rows():
+    import numpy as np
+    out = vector_ops.l2_normalize_rows(np.array([[3.0, 4.0], [0.0, 0.0]]))
+    assert out.dtype == np.float32
+    assert out.tolist() == [pytest.approx([0.6, 0.8]), [0.0, 0.0]]
+
+
+@pytest.mark.parametrize("space", ["cosine", "ip"])
+def test_distance_to_score_cosine_ip(space):
+    assert vector_ops.distance_to_score(0.25, space) == pytest.approx(0.75)
+
+
+def test_distance_to_score_l2():
+    a, b = [0.6, 0.8], [1.0, 0.0]
+    cos = sum(x * y for x, y in zip(a, b))
+    sq = sum((x - y) ** 2 for x, y in zip(a, b))
+    # normalisierte Vektoren: 1 - d/2 entspricht dem Kosinus
+    assert vector_ops.distance_to_score(sq, "l2", normalized=True) == pytest.approx(cos)
+    assert vector_ops.distance_to_score(3.0, "l2", normalized=False) == pytest.approx(0.25)
+    assert vector_ops.distance_to_score(0.0, "l2", normalized=False) == 1.0
+    assert not math.isnan(vector_ops.distance_to_score(1e9, "l2", normalized=False))